@@ -0,0 +1,132 @@
+import random
+import hashlib
+
+# Parti dei nomi delle aziende sintetiche
+NAME_PREFIXES = ['Officine', 'Fonderia', 'Carpenteria', 'Meccanica', 'Nautica', 'Utensileria', 'Idraulica', 'Elettromeccanica', 'Zincheria', 'Automazioni']
+NAME_SURNAMES = ['Rossi', 'Bianchi', 'Colombo', 'Ferrari', 'Galli', 'Brambilla', 'Fontana', 'Conti', 'Moretti', 'Riva', 'Sala', 'Villa', 'Longoni', 'Cattaneo']
+NAME_SUFFIXES = ['S.r.l.', 'S.p.A.', 'S.n.c.', '& Figli', 'S.a.s.']
+CITIES = [('Como', '031'), ('Lecco', '0341'), ('Milano', '02'), ('Bergamo', '035'), ('Varese', '0332'), ('Monza', '039')]
+
+# Testo di riempimento per avvicinare le pagine a quelle reali
+FILLER = (
+    "La nostra azienda opera da oltre trent'anni nel settore con passione e competenza. "
+    "Offriamo lavorazioni su misura, consulenza tecnica e assistenza post vendita ai clienti "
+    "di tutta Italia. Qualità certificata ISO 9001 e attenzione all'ambiente. "
+)
+
+# Tipi di sito e loro frequenza nel corpus
+#   footer: contatti nel footer della home (estrazione locale)
+#   page: contatti solo nella pagina "contatti" (crawler)
+#   obfuscated: contatti scritti in modo non standard (estrazione con LLM)
+#   directory: portale/elenco, non un'azienda (scartato dalla verifica)
+SITE_KINDS = (('footer', 0.5), ('page', 0.25), ('obfuscated', 0.15), ('directory', 0.1))
+
+
+def stable_seed(*parts):
+    """Seme deterministico (indipendente da PYTHONHASHSEED) per una combinazione di valori."""
+    return int(hashlib.sha256("\x00".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:12], 16)
+
+
+class Corpus:
+    """
+    Corpus deterministico di siti aziendali italiani sintetici.
+
+    Args:
+        sites (int): Numero di siti
+        seed (int): Seme per la generazione
+        page_kb (int): Dimensione indicativa della home page in KB
+    """
+
+    def __init__(self, sites=300, seed=1, page_kb=30):
+        self.seed = seed
+        self.page_kb = page_kb
+        rng = random.Random(seed)
+        kinds = [kind for kind, _ in SITE_KINDS]
+        weights = [weight for _, weight in SITE_KINDS]
+        self.sites = []
+        for n in range(sites):
+            kind = rng.choices(kinds, weights)[0]
+            city, prefix = rng.choice(CITIES)
+            surname = rng.choice(NAME_SURNAMES)
+            slug = f"{surname.lower()}-{n}"
+            if kind == 'directory':
+                name = f"Elenco aziende {city} - {rng.choice(NAME_PREFIXES).lower()}"
+            else:
+                name = f"{rng.choice(NAME_PREFIXES)} {surname} {rng.choice(NAME_SUFFIXES)}"
+            self.sites.append({
+                'slug': slug,
+                'kind': kind,
+                'name': name,
+                'city': city,
+                'email': f"info@{slug}.it",
+                'phone': f"{prefix} {rng.randint(100000, 999999)}",
+            })
+        self.by_slug = {site['slug']: site for site in self.sites}
+
+    def search(self, query, start, num, pages, duplicate_rate=0.1):
+        """
+        Risultati organici sintetici per una query, nel formato di SerperDev.
+
+        Ogni query ha pages pagine di risultati; una parte dei risultati ripete
+        siti già comparsi nelle pagine precedenti.
+
+        Args:
+            query (str): La query di ricerca
+            start (int): Offset del primo risultato
+            num (int): Risultati per pagina
+            pages (int): Pagine disponibili per ogni query
+            duplicate_rate (float): Quota di risultati duplicati
+
+        Returns:
+            list: Risultati con 'title', 'link' e 'snippet' (vuota oltre l'ultima pagina)
+        """
+        if start >= pages * num:
+            return []
+        rng = random.Random(stable_seed(self.seed, query))
+        order = rng.sample(range(len(self.sites)), min(len(self.sites), pages * num))
+        results = []
+        for position in range(start, min(start + num, len(order))):
+            index = order[position]
+            page_rng = random.Random(stable_seed(self.seed, query, position))
+            if position >= num and page_rng.random() < duplicate_rate:
+                index = order[page_rng.randrange(0, start)]
+            site = self.sites[index]
+            results.append({
+                'title': site['name'],
+                'link': f"{{base}}/siti/{site['slug']}/",
+                'snippet': f"{site['name']} a {site['city']}: {query.lower()}, lavorazioni e preventivi.",
+            })
+        return results
+
+    def home_page(self, slug):
+        """HTML della home page di un sito."""
+        site = self.by_slug[slug]
+        filler = "".join(f"<p>{FILLER}</p>" for _ in range(max(1, self.page_kb * 1024 // (len(FILLER) + 7))))
+        if site['kind'] == 'footer':
+            footer = (f"<footer><p>{site['name']} - {site['city']}</p>"
+                      f"<p>Email: <a href=\"mailto:{site['email']}\">{site['email']}</a> - "
+                      f"Tel. <a href=\"tel:{site['phone'].replace(' ', '')}\">{site['phone']}</a></p></footer>")
+        elif site['kind'] == 'obfuscated':
+            user, _, domain = site['email'].partition('@')
+            footer = (f"<footer><p>{site['name']} - {site['city']}</p>"
+                      f"<p>Scrivici: {user} [chiocciola] {domain.replace('.', ' [punto] ')}</p></footer>")
+        else:
+            footer = f"<footer><p>{site['name']} - {site['city']}</p></footer>"
+        nav = f"<a href=\"/siti/{slug}/\">Home</a> <a href=\"/siti/{slug}/prodotti\">Prodotti</a>"
+        if self.has_contact_page(slug):
+            nav += f" <a href=\"/siti/{slug}/contatti\">Contatti</a>"
+        return (f"<html><head><title>{site['name']}</title></head><body><nav>{nav}</nav>"
+                f"<main><h1>{site['name']}</h1>{filler}</main>{footer}</body></html>")
+
+    def has_contact_page(self, slug):
+        """I siti con contatti offuscati non hanno una pagina contatti leggibile."""
+        return self.by_slug[slug]['kind'] in ('footer', 'page')
+
+    def contact_page(self, slug):
+        """HTML della pagina contatti di un sito."""
+        site = self.by_slug[slug]
+        return (f"<html><head><title>Contatti - {site['name']}</title></head><body>"
+                f"<main><h1>Contatti</h1><p>{site['name']}, {site['city']}</p>"
+                f"<p>Email: <a href=\"mailto:{site['email']}\">{site['email']}</a></p>"
+                f"<p>Telefono: <a href=\"tel:{site['phone'].replace(' ', '')}\">{site['phone']}</a></p>"
+                f"</main></body></html>")
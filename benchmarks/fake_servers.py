@@ -0,0 +1,298 @@
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+from urllib.parse import urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from benchmarks.corpus import Corpus
+
+EMAIL_RE = re.compile(r'[\w.+-]+@[\w-]+\.[\w.]+')
+OBFUSCATED_EMAIL_RE = re.compile(r'([\w.+-]+) \[chiocciola\] ([\w-]+(?: \[punto\] [\w-]+)+)')
+PHONE_RE = re.compile(r'\b0\d{1,3} \d{5,8}\b')
+EXPLANATION = "Il titolo e la descrizione indicano un'attività commerciale con sede e servizi propri. "
+BATCH_INDEX_RE = re.compile(r'^\[(\d+)\]\nTitolo: (.*)$', re.MULTILINE)
+
+
+class Stats:
+    """Contatori delle richieste ricevute dai server finti."""
+
+    def __init__(self):
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def add(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.counters)
+
+
+def is_company(title):
+    """Verdetto del modello finto: i portali e gli elenchi non sono aziende."""
+    return not title.lower().startswith('elenco')
+
+
+def find_contacts(text):
+    """Email (anche offuscata) e telefono nel testo di una pagina."""
+    email = EMAIL_RE.search(text)
+    obfuscated = OBFUSCATED_EMAIL_RE.search(text)
+    if email:
+        email = email.group(0)
+    elif obfuscated:
+        email = f"{obfuscated.group(1)}@{obfuscated.group(2).replace(' [punto] ', '.')}"
+    phone = PHONE_RE.search(text)
+    return email, phone.group(0) if phone else None
+
+
+def answer_prompt(prompt, explanation_tokens=0):
+    """
+    Risposta del modello finto, in base al tipo di richiesta.
+
+    Args:
+        prompt (str): Testo dei messaggi
+        explanation_tokens (int): Token di spiegazione aggiunti dopo il verdetto delle verifiche singole
+
+    Returns:
+        tuple: (tipo di richiesta, testo della risposta)
+    """
+    if '"risultati"' in prompt and BATCH_INDEX_RE.search(prompt):
+        entries = [{'indice': int(index), 'azienda': 'SI' if is_company(title) else 'NO'}
+                   for index, title in BATCH_INDEX_RE.findall(prompt)]
+        return 'verify_batch', json.dumps({'risultati': entries})
+    if '"is_company"' in prompt:
+        title = re.search(r'Titolo: (.*)', prompt)
+        email, phone = find_contacts(prompt.split('Testo del sito', 1)[-1])
+        company = title is None or is_company(title.group(1))
+        return 'combined', json.dumps({'is_company': company, 'email': email if company else None,
+                                       'phone': phone if company else None, 'confidence': 0.9})
+    if 'Estrai email' in prompt:
+        email, phone = find_contacts(prompt.split('pagina web aziendale:', 1)[-1])
+        return 'extract', json.dumps({'email': email, 'phone': phone})
+    title = re.search(r'Titolo: (.*)', prompt)
+    verdict = 'SI' if title is None or is_company(title.group(1)) else 'NO'
+    content = json.dumps({'azienda': verdict})
+    if explanation_tokens:
+        # Modelli prolissi: una giustificazione dopo il verdetto
+        content += "\n" + (EXPLANATION * (explanation_tokens * 4 // len(EXPLANATION) + 1))[:explanation_tokens * 4]
+    return 'verify', content
+
+
+class FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # I client chiudono la connessione appena letto il footer: non è un errore
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    """
+    Un solo server per tutti i servizi esterni:
+      POST /search                  ricerca in formato SerperDev
+      POST /v1/chat/completions     LLM compatibile OpenAI
+      POST /api/chat                LLM in formato Ollama
+      GET  /siti/<slug>/[contatti]  siti aziendali del corpus
+      GET  /stats                   contatori delle richieste
+    """
+
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeServices/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, body, content_type):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        return len(data)
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == '/stats':
+            self.send_body(200, json.dumps(self.server.stats.snapshot()), 'application/json')
+            return
+        match = re.fullmatch(r'/siti/([\w-]+)/(contatti)?', path)
+        corpus = self.server.corpus
+        if match and match.group(1) in corpus.by_slug and (not match.group(2) or corpus.has_contact_page(match.group(1))):
+            html = corpus.contact_page(match.group(1)) if match.group(2) else corpus.home_page(match.group(1))
+            size = self.send_body(200, html, 'text/html; charset=utf-8')
+            self.server.stats.add('site_pages')
+            self.server.stats.add('site_bytes', size)
+            return
+        self.server.stats.add('not_found')
+        self.send_body(404, 'Non trovato', 'text/plain')
+
+    def send_stream(self, pieces, content_type):
+        """Invia i frammenti al ritmo di token_rate; restituisce quanti ne sono stati inviati."""
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        sent = 0
+        try:
+            for piece in pieces:
+                time.sleep(1 / self.server.config['token_rate'])
+                self.wfile.write(piece.encode('utf-8'))
+                self.wfile.flush()
+                sent += 1
+        except ConnectionError:
+            # Il client ha chiuso lo stream appena letto il verdetto
+            self.server.stats.add('llm_stream_cancelled')
+        return sent
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        payload = self.read_json()
+        if path == '/search':
+            self.server.stats.add('search')
+            self.search(payload)
+        elif path.endswith('/chat/completions'):
+            self.chat(payload, openai_format=True)
+        elif path == '/api/chat':
+            self.chat(payload, openai_format=False)
+        else:
+            self.send_body(404, 'Non trovato', 'text/plain')
+
+    def search(self, payload):
+        config = self.server.config
+        time.sleep(config['search_latency'])
+        host = self.headers.get('Host')
+        results = self.server.corpus.search(payload.get('q', ''), int(payload.get('start', 0)), int(payload.get('num', 10)),
+                                            config['pages'], config['duplicate_rate'])
+        for result in results:
+            result['link'] = result['link'].format(base=f"http://{host}")
+        self.send_body(200, json.dumps({'organic': results}), 'application/json')
+
+    def chat(self, payload, openai_format):
+        config = self.server.config
+        prompt = "\n".join(str(message.get('content', '')) for message in payload.get('messages', []))
+        kind, content = answer_prompt(prompt, config['verify_explanation'])
+        prompt_tokens = len(prompt) // 4
+        self.server.stats.add(f"llm_{kind}")
+        self.server.stats.add('llm_prompt_tokens', prompt_tokens)
+        if payload.get('response_format') or payload.get('format'):
+            self.server.stats.add('llm_structured')
+
+        model = payload.get('model', 'fake')
+        if payload.get('stream'):
+            # Un frammento per token (circa 4 caratteri), dopo la latenza fissa
+            time.sleep(config['llm_latency'])
+            tokens = [content[i:i + 4] for i in range(0, len(content), 4)]
+            if openai_format:
+                pieces = [f"data: {json.dumps({'id': 'chatcmpl-fake', 'object': 'chat.completion.chunk', 'created': int(time.time()), 'model': model, 'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]})}\n\n"
+                          for token in tokens] + ["data: [DONE]\n\n"]
+                content_type = 'text/event-stream'
+            else:
+                pieces = [json.dumps({'model': model, 'message': {'role': 'assistant', 'content': token}, 'done': False}) + "\n"
+                          for token in tokens] + [json.dumps({'model': model, 'message': {'role': 'assistant', 'content': ''}, 'done': True, 'done_reason': 'stop'}) + "\n"]
+                content_type = 'application/x-ndjson'
+            sent = self.send_stream(pieces, content_type)
+            self.server.stats.add('llm_completion_tokens', min(sent, len(tokens)))
+            return
+
+        completion_tokens = max(1, len(content) // 4)
+        self.server.stats.add('llm_completion_tokens', completion_tokens)
+
+        # Latenza fissa più il tempo di generazione dei token
+        time.sleep(config['llm_latency'] + completion_tokens / config['token_rate'])
+
+        if openai_format:
+            body = {
+                'id': 'chatcmpl-fake', 'object': 'chat.completion', 'created': int(time.time()), 'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                          'total_tokens': prompt_tokens + completion_tokens},
+            }
+        else:
+            body = {
+                'model': model, 'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'message': {'role': 'assistant', 'content': content}, 'done': True, 'done_reason': 'stop',
+                'prompt_eval_count': prompt_tokens, 'eval_count': completion_tokens,
+            }
+        self.send_body(200, json.dumps(body), 'application/json')
+
+
+def create_server(port=0, sites=300, seed=1, page_kb=30, pages=5, duplicate_rate=0.1,
+                  search_latency=0.2, llm_latency=0.3, token_rate=50.0, verify_explanation=0):
+    """
+    Crea il server finto (non ancora avviato).
+
+    Args:
+        port (int): Porta di ascolto (0 = scelta dal sistema)
+        sites (int): Siti nel corpus
+        seed (int): Seme del corpus
+        page_kb (int): Dimensione indicativa delle home page in KB
+        pages (int): Pagine di risultati per query
+        duplicate_rate (float): Quota di risultati ripetuti tra le pagine
+        search_latency (float): Latenza della ricerca in secondi
+        llm_latency (float): Latenza fissa delle chiamate LLM in secondi
+        token_rate (float): Token generati al secondo dal modello finto
+        verify_explanation (int): Token di spiegazione dopo il verdetto delle verifiche singole
+
+    Returns:
+        FakeServer: Server con attributi corpus, config e stats
+    """
+    server = FakeServer(('127.0.0.1', port), FakeHandler)
+    server.corpus = Corpus(sites=sites, seed=seed, page_kb=page_kb)
+    server.stats = Stats()
+    server.config = {
+        'pages': pages,
+        'duplicate_rate': duplicate_rate,
+        'search_latency': search_latency,
+        'llm_latency': llm_latency,
+        'token_rate': token_rate,
+        'verify_explanation': verify_explanation,
+    }
+    return server
+
+
+def add_server_arguments(parser):
+    """Aggiunge a un parser le opzioni del server finto."""
+    parser.add_argument("--sites", type=int, default=300, help="siti nel corpus sintetico")
+    parser.add_argument("--seed", type=int, default=1, help="seme del corpus")
+    parser.add_argument("--page-kb", type=int, default=30, help="dimensione indicativa delle home page (KB)")
+    parser.add_argument("--pages", type=int, default=5, help="pagine di risultati per settore")
+    parser.add_argument("--duplicate-rate", type=float, default=0.1, help="quota di risultati ripetuti tra le pagine")
+    parser.add_argument("--search-latency", type=float, default=0.2, help="latenza della ricerca (secondi)")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="latenza fissa delle chiamate LLM (secondi)")
+    parser.add_argument("--token-rate", type=float, default=50.0, help="token generati al secondo dal modello finto")
+    parser.add_argument("--verify-explanation", type=int, default=0, help="token di spiegazione dopo il verdetto delle verifiche singole")
+
+
+def server_options(args):
+    """Estrae dagli argomenti le opzioni di create_server."""
+    return {
+        'sites': args.sites, 'seed': args.seed, 'page_kb': args.page_kb, 'pages': args.pages,
+        'duplicate_rate': args.duplicate_rate, 'search_latency': args.search_latency,
+        'llm_latency': args.llm_latency, 'token_rate': args.token_rate,
+        'verify_explanation': args.verify_explanation,
+    }
+
+
+if __name__ == "__main__":
+    # Avvio separato: python -m benchmarks.fake_servers --port 8900
+    parser = argparse.ArgumentParser(description="Server locale che simula ricerca, LLM e siti aziendali.")
+    parser.add_argument("--port", type=int, default=0, help="porta di ascolto (0 = libera)")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+    server = create_server(port=args.port, **server_options(args))
+    print(f"PORT {server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    sys.exit(0)
@@ -0,0 +1,218 @@
+import os
+import sys
+import json
+import time
+import shutil
+import resource
+import tempfile
+import argparse
+import contextlib
+import subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.fake_servers import add_server_arguments, server_options
+
+# Cartella principale del progetto (per importare contacts_scrapper e avviare il server)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Settori usati come query di ricerca
+SECTORS = [
+    "Ferramenta",
+    "Cantieri nautici",
+    "Officine meccaniche generiche",
+    "Utensilerie",
+    "Carpenterie metalliche",
+    "Fonderie / fusioni",
+    "Stampaggio e deformazione metalli",
+    "Macchine utensili e strumenti di precisione",
+]
+
+
+def percentile(values, fraction):
+    """Percentile (metodo nearest-rank) di una lista di valori."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb():
+    """Memoria residente massima del processo in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux restituisce KB, macOS byte
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start_server(args):
+    """Avvia il server finto in un processo separato e restituisce (processo, URL base)."""
+    command = [sys.executable, "-m", "benchmarks.fake_servers", "--port", "0"]
+    for name, value in server_options(args).items():
+        command += [f"--{name.replace('_', '-')}", str(value)]
+    process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line.startswith("PORT "):
+        process.kill()
+        raise RuntimeError("Il server finto non si è avviato")
+    return process, f"http://127.0.0.1:{int(line.split()[1])}"
+
+
+def configure_environment(args, base_url, workdir):
+    """Imposta le variabili d'ambiente per un'esecuzione isolata contro il server finto."""
+    os.environ.update({
+        "LLM_PROVIDER": args.provider,
+        "SEARCH_PROVIDER": "serper",
+        "SERPER_API_KEY": "benchmark",
+        "SERPER_BASE_URL": base_url,
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": f"{base_url}/v1",
+        "OPENAI_MODEL": "fake",
+        "OLLAMA_BASE_URL": base_url,
+        "OLLAMA_MODEL": "fake",
+        "CACHE_DIR": os.path.join(workdir, "cache"),
+        "LLM_CACHE": "0",
+        "SERP_CACHE": "0",
+        "STORAGE_BACKEND": "sqlite",
+        "STORAGE_DB": os.path.join(workdir, "lista_aziende.db"),
+        "RUN_JOURNAL": os.path.join(workdir, "run_journal.json"),
+        "DEDUP_MODE": "url",
+        "YIELD_MIN": "0",
+        "RATE_LIMITS": "host=1000:64,serper=1000:16,openai=1000:32,ollama=1000:32",
+        "LLM_VERIFY_BATCH": "1" if args.batch else "0",
+    })
+    # Configurazioni da confrontare, es. --env PIPELINE_FETCH_WORKERS=16
+    for entry in args.env:
+        name, _, value = entry.partition("=")
+        os.environ[name] = value
+
+
+def run(args):
+    """
+    Esegue il benchmark e restituisce il report.
+
+    Returns:
+        dict: Configurazione e metriche dell'esecuzione
+    """
+    workdir = tempfile.mkdtemp(prefix="benchmark-")
+    server, base_url = start_server(args)
+    try:
+        configure_environment(args, base_url, workdir)
+        os.chdir(workdir)
+
+        # Import dopo la configurazione: i moduli leggono l'ambiente all'avvio
+        import contacts_scrapper
+        from helpers.dedup_helper import CompanyIndex
+        from helpers.journal_helper import RunJournal
+        from helpers.storage_helper import get_store
+        from helpers.pipeline_helper import stage_timings
+        from scrappers.registry import get_llm_provider, get_search_provider
+        from helpers.classifier_helper import get_classifier
+        provider = get_llm_provider(args.provider)
+        search = get_search_provider("serper")
+
+        excel_filename = contacts_scrapper.create_excel_if_not_exists()
+        company_index = CompanyIndex()
+        journal = RunJournal(None, "serper")
+        sectors = SECTORS[:args.sectors]
+
+        def run_sector(sector):
+            return contacts_scrapper.process_companies_from_search(
+                sector, None, provider.verify_company, provider.extract_contacts, excel_filename, company_index,
+                search['search'], search['organic'], search['api_key_env'], search['label'],
+                verify_batch_func=provider.verify_companies_batch if args.batch else None,
+                journal=journal, show_sector=args.sector_workers > 1, combined_func=provider.verify_and_extract,
+            )
+
+        stage_timings.reset()
+        output = contextlib.nullcontext() if args.verbose else open(os.devnull, "w")
+        started = time.perf_counter()
+        with output as sink, contextlib.redirect_stdout(sink or sys.stdout):
+            with ThreadPoolExecutor(max_workers=args.sector_workers) as executor:
+                processed = sum(executor.map(run_sector, sectors))
+            get_store().flush()
+        elapsed = time.perf_counter() - started
+
+        with urllib.request.urlopen(f"{base_url}/stats") as response:
+            counters = json.load(response)
+        companies = get_store().count()
+        llm_calls = {kind: counters.get(f"llm_{kind}", 0) for kind in ("verify", "verify_batch", "extract", "combined")}
+        total_llm_calls = sum(llm_calls.values())
+
+        stages = {}
+        for name, durations in stage_timings.snapshot().items():
+            stages[name] = {
+                'count': len(durations),
+                'p50_ms': round(percentile(durations, 0.50) * 1000, 1),
+                'p95_ms': round(percentile(durations, 0.95) * 1000, 1),
+            }
+
+        return {
+            'revision': git_revision(),
+            'config': {
+                'provider': args.provider,
+                'batch_verify': args.batch,
+                'mode': os.environ.get("PIPELINE_MODE", "separate"),
+                'sectors': len(sectors),
+                'sector_workers': args.sector_workers,
+                'server': server_options(args),
+                'env': args.env,
+            },
+            'elapsed_s': round(elapsed, 2),
+            'results': processed,
+            'results_per_s': round(processed / elapsed, 2) if elapsed else None,
+            'companies': companies,
+            'serp_calls': counters.get('search', 0),
+            'llm_calls': dict(llm_calls, total=total_llm_calls, structured=counters.get('llm_structured', 0),
+                              stream_cancelled=counters.get('llm_stream_cancelled', 0)),
+            'llm_calls_per_company': round(total_llm_calls / companies, 2) if companies else None,
+            'classifier': {'decisions': dict(get_classifier().decisions), 'audits': dict(get_classifier().audits)},
+            'llm_tokens': {'prompt': counters.get('llm_prompt_tokens', 0), 'completion': counters.get('llm_completion_tokens', 0)},
+            'site_pages': counters.get('site_pages', 0),
+            'site_bytes': counters.get('site_bytes', 0),
+            'stages': stages,
+            'peak_rss_mb': peak_rss_mb(),
+        }
+    finally:
+        server.terminate()
+        server.wait()
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark della pipeline con ricerca, LLM e siti simulati in locale.")
+    parser.add_argument("--provider", choices=("openai", "ollama", "router"), default="openai", help="client LLM da usare contro il server finto (router: failover tra i provider di LLM_ROUTER)")
+    parser.add_argument("--sectors", type=int, default=3, help="settori da elaborare")
+    parser.add_argument("--sector-workers", type=int, default=1, help="settori elaborati in parallelo")
+    parser.add_argument("--no-batch", dest="batch", action="store_false", help="verifica un risultato per chiamata invece che a blocchi")
+    parser.add_argument("--env", action="append", default=[], metavar="NOME=VALORE", help="variabile d'ambiente aggiuntiva (ripetibile)")
+    parser.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "results", "latest.json"), help="file JSON del report")
+    parser.add_argument("--verbose", action="store_true", help="mostra i messaggi della pipeline")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    report = run(args)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as report_file:
+        json.dump(report, report_file, indent=2, ensure_ascii=False)
+
+    print(f"Risultati: {report['results']} in {report['elapsed_s']}s ({report['results_per_s']}/s), aziende salvate: {report['companies']}")
+    print(f"Chiamate LLM: {report['llm_calls']['total']} ({report['llm_calls_per_company']} per azienda), ricerche: {report['serp_calls']}")
+    for name, stage in report['stages'].items():
+        print(f"  {name:8s} n={stage['count']:5d}  p50 {stage['p50_ms']:8.1f} ms  p95 {stage['p95_ms']:8.1f} ms")
+    print(f"Memoria massima: {report['peak_rss_mb']} MB")
+    print(f"Report salvato in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
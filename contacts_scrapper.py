@@ -1,54 +1,73 @@
 import os
 import sys
+import time
+import argparse
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
 # Import helpers
-from helpers.excel_helper import create_excel_if_not_exists, load_existing_companies, add_company_to_excel
+from helpers.excel_helper import create_excel_if_not_exists, iter_existing_companies, count_existing_companies, add_company_to_excel, update_company_sector, flush_companies, get_flush_listeners, export_excel
 from helpers.email_helper import send_email
-from helpers.serpapi_helper import search_google_serpapi, get_organic_results_serpapi, SERPAPI_AVAILABLE
-from helpers.serper_helper import search_google_serper, get_organic_results_serper
+from helpers.pipeline_helper import Pipeline, PagePrefetcher, get_pipeline_config
+from helpers.cache_helper import print_cache_stats
+from helpers.dedup_helper import CompanyIndex
+from helpers.http_helper import fetch_page
+from helpers.crawler_helper import crawl_contact_pages
+from helpers.prefilter_helper import prefilter_reason, get_prefilter_config
+from helpers.classifier_helper import get_classifier
+from helpers.rate_limit_helper import get_scheduler
+from helpers.journal_helper import RunJournal, PageTracker, get_journal_path, hash_results
+from helpers.budget_helper import YieldWindow, bind_sector, get_budget, get_budget_config
+from helpers.telemetry_helper import get_telemetry
+from scrappers.registry import LLM_PROVIDERS, ROUTER, get_llm_provider, get_search_provider, get_model_name, run_checks
 
 def main():
+    parser = argparse.ArgumentParser(description="Cerca aziende per settore e ne salva i contatti.")
+    parser.add_argument("--resume", action="store_true", help="riprende ogni settore dall'ultima pagina completata e salta quelli terminati")
+    parser.add_argument("--sector-workers", type=int, help="settori elaborati in parallelo (default SECTOR_WORKERS o 1)")
+    parser.add_argument("--check", action="store_true", help="verifica in parallelo credenziali ed endpoint di tutti i provider ed esce")
+    args = parser.parse_args()
+
     load_dotenv() # Carica le variabili dal file .env
     llm_provider = os.environ.get("LLM_PROVIDER", "openai").lower()
+    search_provider = os.environ.get("SEARCH_PROVIDER", "serpapi").lower()
 
-    if llm_provider == "openai":
-        from scrappers.openai import verify_company, extract_contacts
-        llm_client = None  # Per ora non usato, ma potrebbe servire per email
-        is_gemini = False
-        print("Utilizzo OpenAI come provider LLM.")
-    elif llm_provider == "gemini":
-        from scrappers.gemini import verify_company, extract_contacts
-        llm_client = None  # Per ora non usato, ma potrebbe servire per email
-        is_gemini = True
-        print("Utilizzo Gemini come provider LLM.")
-    elif llm_provider == "ollama":
-        from scrappers.ollama import verify_company, extract_contacts
-        llm_client = None  # Per ora non usato, ma potrebbe servire per email
-        is_gemini = False
-        print("Utilizzo Ollama come provider LLM.")
-    else:
-        print(f"Provider LLM non valido: {llm_provider}. Usa 'openai', 'gemini' o 'ollama'.")
+    if args.check:
+        sys.exit(0 if run_checks(llm_provider, search_provider) else 1)
+
+    # Il modulo del provider viene importato ora, il client al primo utilizzo
+    try:
+        provider = get_llm_provider(llm_provider)
+    except ValueError as e:
+        print(e)
         sys.exit(1)
+    verify_company = provider.verify_company
+    verify_companies_batch = provider.verify_companies_batch
+    extract_contacts = provider.extract_contacts
+    verify_and_extract = provider.verify_and_extract
+    is_gemini = llm_provider == "gemini"
+    if llm_provider == ROUTER:
+        # Il router sceglie per ogni chiamata il provider più veloce tra quelli disponibili
+        try:
+            print(f"Utilizzo il router LLM su: {provider.get_router().describe()}")
+        except ValueError as e:
+            print(e)
+            sys.exit(1)
+    else:
+        print(f"Utilizzo {LLM_PROVIDERS[llm_provider]['label']} come provider LLM.")
 
     # Scegli il provider di ricerca
-    search_provider = os.environ.get("SEARCH_PROVIDER", "serpapi").lower()
-    if search_provider == "serpapi":
-        search_func = search_google_serpapi
-        get_organic_func = get_organic_results_serpapi
-        api_key_env = "SERPAPI_API_KEY"
-        provider_name = "SerpApi"
-        print("Utilizzo SerpApi come provider di ricerca.")
-    elif search_provider == "serper":
-        search_func = search_google_serper
-        get_organic_func = get_organic_results_serper
-        api_key_env = "SERPER_API_KEY"
-        provider_name = "SerperDev"
-        print("Utilizzo SerperDev come provider di ricerca.")
-    else:
-        print(f"Provider di ricerca non valido: {search_provider}. Usa 'serpapi' o 'serper'.")
+    try:
+        search = get_search_provider(search_provider)
+    except ValueError as e:
+        print(e)
         sys.exit(1)
+    search_func = search['search']
+    get_organic_func = search['organic']
+    api_key_env = search['api_key_env']
+    provider_name = search['label']
+    print(f"Utilizzo {provider_name} come provider di ricerca.")
 
     #sector = input("Inserisci il settore di interesse (es. 'green technology', 'logistica'): ")
     sector = [
@@ -72,61 +91,136 @@ def main():
     print(f"\nLimite:'{limit}'")
 
     # Stampa il modello AI utilizzato
-    if llm_provider == "gemini":
-        model_name = os.environ.get('GEMINI_MODEL', 'gemini-2.5-flash')
-    elif llm_provider == "openai":
-        model_name = os.environ.get('OPENAI_MODEL', 'DuckAi-General')
-    elif llm_provider == "ollama":
-        model_name = os.environ.get('OLLAMA_MODEL', 'llama3.2')
-    else:
-        model_name = "Sconosciuto"
-    print(f"\nModello AI usato: {model_name}")
+    if llm_provider != ROUTER:
+        print(f"\nModello AI usato: {get_model_name(llm_provider)}")
 
     # Verifica o crea il file Excel
     excel_filename = create_excel_if_not_exists()
     
-    # Carica le aziende esistenti
-    existing_companies = load_existing_companies(excel_filename)
-    print(f"Aziende esistenti nel file: {len(existing_companies)}")
+    # Indice dei siti già presenti, per il controllo rapido dei duplicati:
+    # le aziende esistenti vengono lette in streaming, senza tenerle in memoria
+    company_index = CompanyIndex.from_companies(iter_existing_companies(excel_filename))
+    print(f"Aziende esistenti nel file: {company_index.loaded}")
+    print(f"Controllo duplicati per: {'dominio' if company_index.mode == 'domain' else 'URL'}")
+
+    # Diario della paginazione: permette di riprendere con --resume
+    journal = RunJournal(get_journal_path(), search_provider)
+    if args.resume:
+        print(f"Ripresa dall'ultima esecuzione ({journal.path})")
+    else:
+        journal.reset()
 
-    # Elabora i risultati da SerpAPI e salva immediatamente
-    total_processed = 0
-    for current_sector in sector:
+    # Verifica a blocchi: una chiamata LLM per pagina di risultati
+    verify_batch = verify_companies_batch if os.environ.get("LLM_VERIFY_BATCH", "1") == "1" else None
+    if get_pipeline_config()['mode'] == 'combined':
+        print("Modalità combinata: una sola chiamata LLM per verifica ed estrazione contatti")
+
+    # Settori elaborati in parallelo: indice dei duplicati, archivio e diario sono condivisi
+    sector_workers = args.sector_workers or int(os.environ.get("SECTOR_WORKERS", "1"))
+    sector_workers = max(1, min(sector_workers, len(sector)))
+    if sector_workers > 1:
+        print(f"Settori elaborati in parallelo: {sector_workers}")
+
+    def run_sector(current_sector):
         print(f"\n--- Elaborazione settore: {current_sector} ---")
-        processed = process_companies_from_search(current_sector, limit, verify_company, extract_contacts, excel_filename, existing_companies, search_func, get_organic_func, api_key_env, provider_name)
-        total_processed += processed
+        return process_companies_from_search(current_sector, limit, verify_company, extract_contacts, excel_filename, company_index, search_func, get_organic_func, api_key_env, provider_name, verify_batch_func=verify_batch, journal=journal, show_sector=sector_workers > 1, combined_func=verify_and_extract)
+
+    # Elabora i risultati della ricerca e salva immediatamente
+    total_processed = 0
+    sector_results = {}
+    with ThreadPoolExecutor(max_workers=sector_workers) as executor:
+        futures = {executor.submit(run_sector, current_sector): current_sector for current_sector in sector}
+        for future in as_completed(futures):
+            current_sector = futures[future]
+            try:
+                processed = future.result()
+            except Exception as e:
+                print(f"✗ Errore nel settore '{current_sector}': {e}")
+                processed = 0
+            sector_results[current_sector] = processed
+            total_processed += processed
+            print(f"✓ Settore '{current_sector}' terminato: {processed} risultati ({len(sector_results)}/{len(sector)} settori)")
+
+    if sector_workers > 1:
+        print("\nRiepilogo per settore:")
+        for current_sector in sector:
+            print(f"  {sector_results.get(current_sector, 0):5d}  {current_sector}")
+
+    # Statistiche della cache LLM, dei limiti di velocità e delle chiamate consumate
+    print_cache_stats()
+    get_classifier().report()
+    if llm_provider == ROUTER:
+        provider.report()
+    get_scheduler().report()
+    get_budget().report()
+
+    # Riepilogo della telemetria (ed eventuale file per Prometheus)
+    telemetry = get_telemetry()
+    telemetry.report()
+    prometheus_path = telemetry.write_prometheus()
+    if prometheus_path:
+        print(f"Metriche Prometheus salvate in {prometheus_path}")
+    telemetry.close()
+
+    # Crea il file Excel finale dall'archivio
+    export_excel(excel_filename)
 
     # Leggi l'email destinatario dal file .env
     recipient_email = os.environ.get("EMAIL_RECIPIENT", "internship@duckpage.com")
 
-    # Carica tutte le aziende dal file Excel per l'email
-    all_companies = load_existing_companies(excel_filename)
+    # Per l'email basta il numero di aziende, senza ricaricare l'archivio
+    company_count = count_existing_companies(excel_filename)
 
     # Crea una stringa rappresentativa dei settori
     sector_str = ", ".join(sector)
 
     try:
-        send_email(excel_filename, recipient_email, all_companies, sector_str, is_gemini=is_gemini)
+        send_email(excel_filename, recipient_email, company_count, sector_str, is_gemini=is_gemini)
         print(f"File Excel inviato correttamente all'email {recipient_email}")
     except Exception as e:
         print(f"Errore nell'invio dell'email: {e}")
 
 
-def process_companies_from_search(sector, limit, verify_func, extract_func, excel_filename, existing_companies, search_func, get_organic_func, api_key_env, provider_name):
+def process_companies_from_search(sector, limit, verify_func, extract_func, excel_filename, company_index, search_func, get_organic_func, api_key_env, provider_name, pipeline_config=None, verify_batch_func=None, journal=None, show_sector=False, combined_func=None):
     """
     Elabora aziende dalla ricerca Google, verifica duplicati e salva immediatamente in Excel.
 
+    I risultati attraversano una pipeline concorrente (verifica, download,
+    estrazione, salvataggio) collegata da code limitate. Il controllo dei
+    duplicati avviene prima della verifica e il salvataggio resta immediato,
+    un'azienda alla volta. L'avanzamento per pagina viene registrato nel
+    diario, da cui il settore può essere ripreso. La paginazione si ferma
+    quando la resa di aziende nuove delle ultime pagine (escluse quelle già
+    in archivio) scende sotto YIELD_MIN, senza segnare il settore come
+    terminato, o quando si esaurisce il budget di chiamate SERP/LLM; le
+    pagine successive vengono scaricate in anticipo (SERP_PREFETCH) mentre
+    la corrente è in elaborazione, con le stesse condizioni di arresto.
+    Più settori possono essere
+    elaborati in parallelo condividendo lo stesso indice: un'azienda trovata
+    in più settori viene salvata una volta sola con i settori uniti.
+    In modalità combinata (PIPELINE_MODE='combined') il sito viene scaricato
+    prima della verifica e una sola chiamata LLM verifica ed estrae i
+    contatti. I risultati che dal solo URL non sono sicuramente aziende
+    (social, elenchi, enti pubblici, file) vengono scartati prima di ogni
+    download e chiamata LLM; i casi chiari per il classificatore locale non
+    passano dall'LLM, salvo una quota di controllo.
+
     Args:
         sector (str): Il settore di ricerca
         limit (int, optional): Limite sul numero di elementi da processare
         verify_func (function): Funzione per verificare se è un'azienda
         extract_func (function): Funzione per estrarre contatti da HTML
         excel_filename (str): Nome del file Excel
-        existing_companies (list): Lista di aziende già esistenti
+        company_index (CompanyIndex): Indice dei siti già presenti, aggiornato a ogni azienda aggiunta
         search_func (function): Funzione per eseguire la ricerca
         get_organic_func (function): Funzione per estrarre risultati organici
         api_key_env (str): Nome della variabile d'ambiente per la chiave API
         provider_name (str): Nome del provider per i messaggi
+        pipeline_config (dict, optional): Concorrenza per stadio (default da variabili d'ambiente)
+        verify_batch_func (function, optional): Funzione per verificare un'intera pagina di risultati
+        journal (RunJournal, optional): Diario della paginazione (default solo in memoria)
+        show_sector (bool, optional): Indica il settore nei messaggi (utile con più settori in parallelo)
+        combined_func (function, optional): Funzione che verifica ed estrae i contatti in una sola chiamata
 
     Returns:
         int: Numero totale di aziende processate
@@ -141,7 +235,43 @@ def process_companies_from_search(sector, limit, verify_func, extract_func, exce
             print("Ottieni una chiave gratuita su: https://serper.dev/")
         return 0
 
-    all_companies = []
+    if pipeline_config is None:
+        pipeline_config = get_pipeline_config()
+    combined = pipeline_config.get('mode') == 'combined' and combined_func is not None
+    if combined:
+        # Una pagina alla volta non serve: ogni sito ha già la sua chiamata
+        verify_batch_func = None
+    prefilter = get_prefilter_config()
+    classifier = get_classifier()
+
+    # Riprendi dall'ultima pagina completata
+    if journal is None:
+        journal = RunJournal(None, provider_name)
+    state = journal.get(sector)
+    if state['done']:
+        print(f"✓ Settore '{sector}' già completato - saltato")
+        return 0
+    if state['page']:
+        print(f"→ Ripresa del settore '{sector}' dalla pagina {state['page'] + 1}")
+    # Resa delle pagine completate e budget di chiamate, addebitate a questo settore
+    budget = get_budget()
+    budget_config = get_budget_config()
+    yield_window = YieldWindow(budget_config['yield_window'], budget_config['yield_min'])
+    bind_sector(sector)
+    prefetcher = None
+
+    def page_completed(page, saved):
+        # Resa effettiva della pagina e via libera alla ricerca delle successive
+        yield_window.page_completed(page, saved)
+        if prefetcher is not None:
+            prefetcher.advance(page)
+
+    # Il diario avanza solo quando l'archivio ha scritto su disco le aziende delle pagine completate
+    tracker = PageTracker(journal, sector, state['page'] + 1, on_complete=page_completed)
+    flush_listeners = get_flush_listeners(excel_filename)
+    flush_listeners.add(tracker.persisted)
+    telemetry = get_telemetry()
+    sector_started = time.perf_counter()
 
     print("=" * 70)
     print(f"RICERCA AZIENDE NEL SETTORE: {sector}")
@@ -152,11 +282,146 @@ def process_companies_from_search(sector, limit, verify_func, extract_func, exce
     # Ricerca con Google Search
     print(f"Ricerca Google per: '{sector}'...\n")
 
+    def record_audit(item, llm_verdict):
+        # Decisione locale verificata anche dall'LLM: misura dell'accordo
+        if item.get('audit_verdict') is not None:
+            classifier.record_audit(item['audit_verdict'], llm_verdict)
+
+    def verify_stage(item):
+        # Usa LLM per verificare se è un'azienda vera (una pagina intera se a blocchi),
+        # tranne i risultati già decisi dal classificatore locale
+        items = item if isinstance(item, list) else [item]
+        verdicts = [i.get('local_verdict') for i in items]
+        pending = [n for n, verdict in enumerate(verdicts) if verdict is None]
+        if pending:
+            if verify_batch_func is not None:
+                llm_verdicts = verify_batch_func([{'title': items[n]['name'], 'link': items[n]['url'], 'snippet': items[n]['snippet']} for n in pending])
+            else:
+                llm_verdicts = [verify_func(items[n]['name'], items[n]['url'], items[n]['snippet']) for n in pending]
+            for n, verdict in zip(pending, llm_verdicts):
+                verdicts[n] = verdict
+                record_audit(items[n], verdict)
+
+        accepted = []
+        for current, is_company in zip(items, verdicts):
+            if is_company:
+                source = " (classificatore locale)" if current.get('local_verdict') is not None else ""
+                print(f"[{current['idx']}] ✓ Verificato come azienda vera{source}: {current['url']}")
+                accepted.append(current)
+            else:
+                print(f"[{current['idx']}] ✗ Non è un'azienda vera - scartato: {current['url']}")
+                company_index.release(current['url'])
+                tracker.item_done(current['page'])
+        return accepted
+
+    def fetch_stage(item):
+        # Scarica contenuto HTML dall'URL del sito web (sessione condivisa, dimensione limitata)
+        with telemetry.site_download(item['url']):
+            try:
+                item['html'] = fetch_page(item['url'])
+                print(f"[{item['idx']}] ✓ Contenuto scaricato ({len(item['html'])} caratteri)")
+            except requests.RequestException as e:
+                print(f"[{item['idx']}] ✗ Errore scaricamento sito: {str(e)[:100]}")
+                return item
+
+            # Se la home page non ha i contatti, visita le pagine "contatti", "chi siamo", ...
+            try:
+                item['html'] = crawl_contact_pages(item['url'], item['html'])
+            except Exception as e:
+                # Un errore del crawler non fa perdere l'azienda: restano i contatti della home page
+                print(f"[{item['idx']}] ⚠ Ricerca delle pagine contatti fallita: {str(e)[:100]}")
+                telemetry.error("crawl", e)
+        return item
+
+    def print_contacts(item):
+        print(f"[{item['idx']}] {'✓ Email: ' + item['email'] if item['email'] else '• Email non trovata nel sito'}")
+        print(f"[{item['idx']}] {'✓ Telefono: ' + item['phone'] if item['phone'] else '• Telefono non trovato nel sito'}")
+
+    def extract_stage(item):
+        if not item.get('html'):
+            return item
+        try:
+            # Usa LLM per estrarre email e telefono dal contenuto HTML
+            extracted = extract_func(item['html'], url=item['url'])
+            item['email'] = extracted.get('email')
+            item['phone'] = extracted.get('phone')
+            print_contacts(item)
+        except Exception as e:
+            print(f"[{item['idx']}] ✗ Errore estrazione contatti: {str(e)[:100]}")
+            telemetry.error("extract", e)
+        return item
+
+    def combined_stage(item):
+        # Una sola chiamata LLM: verifica dal risultato e contatti dal testo del sito
+        result = combined_func(item['name'], item['url'], item['snippet'], item.get('html'))
+        if result is None:
+            # Risposta non valida: verifica ed estrazione separate
+            is_company = verify_func(item['name'], item['url'], item['snippet'])
+            extracted = extract_func(item['html'], url=item['url']) if is_company and item.get('html') else {}
+            result = {'is_company': is_company, 'email': extracted.get('email'), 'phone': extracted.get('phone'), 'confidence': 1.0}
+        record_audit(item, result['is_company'])
+
+        if not result['is_company'] or result['confidence'] < pipeline_config['min_confidence']:
+            print(f"[{item['idx']}] ✗ Non è un'azienda vera (affidabilità {result['confidence']:.0%}) - scartato: {item['url']}")
+            company_index.release(item['url'])
+            tracker.item_done(item['page'])
+            return None
+
+        print(f"[{item['idx']}] ✓ Verificato come azienda vera: {item['url']}")
+        item['email'] = result['email']
+        item['phone'] = result['phone']
+        if item.get('html'):
+            print_contacts(item)
+        return item
+
+    def persist_stage(item):
+        # Crea l'oggetto azienda
+        company = {
+            'name': item['name'],
+            'url': item['url'],
+            'email': item.get('email'),
+            'phone': item.get('phone')
+        }
+
+        # Aggiungi l'azienda al file Excel immediatamente, con i settori in cui è stata trovata,
+        # e all'indice per evitare duplicati futuri
+        company_index.add(company['url'], sector, save=lambda sectors: add_company_to_excel(excel_filename, company, sectors),
+                          update=lambda url, sectors: update_company_sector(excel_filename, url, sectors))
+
+        print(f"[{item['idx']}] ✓ Azienda aggiunta\n")
+        budget.record_company(sector)
+        tracker.item_done(item['page'], saved=True)
+        return None
+
+    def discard(item):
+        # Un risultato perso per errore conta comunque come uscito dalla pipeline
+        # e libera la prenotazione, così un altro settore può ancora trovarlo
+        for current in (item if isinstance(item, list) else [item]):
+            company_index.release(current['url'])
+            tracker.item_done(current['page'])
+
+    if combined:
+        stages = [
+            ("fetch", fetch_stage, pipeline_config['fetch_workers']),
+            ("combined", combined_stage, pipeline_config['verify_workers']),
+            ("persist", persist_stage, 1),
+        ]
+    else:
+        stages = [
+            ("verify", verify_stage, pipeline_config['verify_workers']),
+            ("fetch", fetch_stage, pipeline_config['fetch_workers']),
+            ("extract", extract_stage, pipeline_config['extract_workers']),
+            ("persist", persist_stage, 1),
+        ]
+    pipeline = Pipeline(stages, queue_size=pipeline_config['queue_size'], on_error=discard, initializer=lambda: bind_sector(sector))
+
+    exhausted = False
+
     try:
-        processed_count = 0
-        start = 0
-        page = 1
         max_per_page = 10  # Massimo risultati per pagina (limite SerpApi)
+        processed_count = state['processed']
+        start = state['page'] * max_per_page
+        page = state['page'] + 1
 
         print(f"  Applicazione filtri intelligenti...\n")
         print("=" * 70)
@@ -164,24 +429,59 @@ def process_companies_from_search(sector, limit, verify_func, extract_func, exce
         print("=" * 70)
         print()
 
+        def stop_message():
+            # Fermati se le ultime pagine non portano più aziende nuove
+            if yield_window.should_stop():
+                # Non segna il settore come terminato: la prossima esecuzione può andare oltre
+                return f"■ Resa delle ultime pagine {yield_window.rolling():.0%} sotto la soglia {yield_window.min_yield:.0%}: settore '{sector}' fermato", False
+            # Fermati se il budget di chiamate è esaurito (con --resume si riprende da qui)
+            limit_reached = budget.exceeded(sector)
+            if limit_reached:
+                return f"■ Raggiunto il {limit_reached}: settore '{sector}' interrotto alla pagina {page}", False
+            return None
+
+        def fetch_results(current_page):
+            # Esegui la ricerca ed estrai i risultati organici
+            results = search_func(sector, api_key, max_per_page, (current_page - 1) * max_per_page)
+            return results, get_organic_func(results) if results else None
+
+        # Le pagine successive vengono scaricate in anticipo mentre la corrente è in elaborazione,
+        # al più SERP_PREFETCH non completate e con le stesse condizioni di arresto (resa e budget)
+        prefetcher = PagePrefetcher(fetch_results, page, lookahead=pipeline_config['serp_prefetch'],
+                                    can_fetch=lambda: stop_message() is None, has_next=lambda fetched: bool(fetched[1]),
+                                    initializer=lambda: bind_sector(sector))
+        pages = iter(prefetcher)
+
         while True:
-            # Esegui la ricerca
-            results = search_func(sector, api_key, max_per_page, start)
+            stop = stop_message()
+            fetched = next(pages, None) if stop is None else None
+            if fetched is None:
+                # Il prefetch si ferma solo per resa o budget: il motivo è lo stesso
+                message, exhausted = stop or stop_message() or (f"■ Settore '{sector}' interrotto alla pagina {page}", False)
+                print(message)
+                break
+            _, (results, organic_results) = fetched
 
             if not results:
                 print(f"✗ Errore nella ricerca per la pagina {page}")
                 break
 
-            # Estrai i risultati organici
-            organic_results = get_organic_func(results)
-
             if not organic_results:
                 print(f"✗ Nessun risultato trovato nella pagina {page}")
+                exhausted = True
                 break
 
             print(f"✓ Trovati {len(organic_results)} risultati da Google Search (pagina {page})")
 
+            # Registra la pagina in corso (e segnala se i risultati sono cambiati dall'interruzione)
+            page_hash = hash_results(organic_results)
+            if state.get('inflight_page') == page and state['inflight'] != page_hash:
+                print(f"  ⚠ I risultati della pagina {page} sono cambiati dall'ultima esecuzione")
+            journal.update(sector, inflight=page_hash, inflight_page=page)
+
             # Processa ogni risultato
+            page_items = []
+            archived = 0
             for idx, result in enumerate(organic_results, 1):
                 global_idx = start + idx
                 try:
@@ -200,86 +500,62 @@ def process_companies_from_search(sector, limit, verify_func, extract_func, exce
                         print()
                         continue
 
-                    # Verifica se già presente nell'Excel
-                    existing_urls = [comp['url'] for comp in existing_companies]
-                    if website in existing_urls:
-                        print(f"  ✓ Azienda già presente in Excel - saltata")
+                    # Scarta senza download né LLM i risultati che dal solo URL non sono aziende
+                    reason = prefilter_reason(website, prefilter)
+                    if reason:
+                        print(f"  ✗ Scartato dal filtro URL ({reason})")
                         print()
+                        telemetry.count('prefilter_rejected_total', reason=reason)
                         continue
 
-                    # Usa LLM per verificare se è un'azienda vera
-                    print(f"  → Verifica se è un'azienda vera...")
-                    if not verify_func(name, website, snippet):
-                        print(f"  ✗ Non è un'azienda vera - scartato")
+                    # Casi chiari decisi dal classificatore locale (una quota va comunque all'LLM)
+                    local_verdict, local_reason = classifier.decide(name, website, snippet)
+                    audit = local_verdict is not None and classifier.should_audit()
+                    if local_verdict is not None:
+                        telemetry.count('classifier_total', decision='company' if local_verdict else 'reject', audit=audit)
+                    if local_verdict is False and not audit:
+                        print(f"  ✗ Scartato dal classificatore locale ({local_reason})")
                         print()
                         continue
-                    else:
-                        print(f"  ✓ Verificato come azienda vera")
-
-                    print(f"  ✓ URL: {website}")
-
-                    # Inizializza variabili
-                    phone = None
-                    email = None
-
-                    # Scarica contenuto HTML dall'URL del sito web
-                    try:
-                        print(f"  → Scarico contenuto dal sito web: {website}")
-
-                        # Aggiungi user-agent per evitare blocchi
-                        headers = {
-                            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                        }
-
-                        # Scarica il contenuto della pagina
-                        response = requests.get(website, headers=headers, timeout=10)
-                        response.raise_for_status()
-                        html_content = response.text
-
-                        print(f"  ✓ Contenuto scaricato ({len(html_content)} caratteri)")
-
-                        # Usa LLM per estrarre email e telefono dal contenuto HTML
-                        extracted = extract_func(html_content)
-
-                        # Estrai email
-                        email = extracted.get('email')
-                        if email:
-                            print(f"  ✓ Email: {email}")
-                        else:
-                            print(f"  • Email non trovata nel sito")
-
-                        # Estrai telefono
-                        phone = extracted.get('phone')
-                        if phone:
-                            print(f"  ✓ Telefono: {phone}")
-                        else:
-                            print(f"  • Telefono non trovato nel sito")
-
-                    except requests.RequestException as e:
-                        print(f"  ✗ Errore scaricamento sito: {str(e)[:100]}")
-                    except Exception as e:
-                        print(f"  ✗ Errore estrazione contatti: {str(e)[:100]}")
-
-                    # Crea l'oggetto azienda
-                    company = {
+
+                    # Verifica se già presente nell'Excel o già in elaborazione (anche da un altro settore)
+                    if not company_index.claim(website, sector):
+                        company_index.merge_sector(website, sector, lambda url, sectors: update_company_sector(excel_filename, url, sectors))
+                        print(f"  ✓ Azienda già presente in Excel - saltata")
+                        print()
+                        # Solo le aziende già in archivio restano fuori dalla resa della pagina
+                        if company_index.in_archive(website):
+                            archived += 1
+                        continue
+
+                    print(f"  → Inviato {'al download' if combined else 'alla verifica'}")
+                    print()
+                    page_items.append({
+                        'idx': f"{sector} #{global_idx}" if show_sector else global_idx,
                         'name': name,
                         'url': website,
-                        'email': email,
-                        'phone': phone
-                    }
-
-                    # Aggiungi l'azienda al file Excel immediatamente
-                    add_company_to_excel(excel_filename, company, sector)
-                    
-                    # Aggiungi anche alla lista esistente per evitare duplicati futuri
-                    existing_companies.append(company)
-                    
-                    print(f"  ✓ Azienda aggiunta\n")
+                        'snippet': snippet,
+                        'page': page,
+                        'local_verdict': None if audit else local_verdict,
+                        'audit_verdict': local_verdict if audit else None,
+                    })
 
                 except Exception as e:
                     print(f"✗ Errore nell'elaborazione del risultato {global_idx}: {e}\n")
                     continue
 
+            # Invia i risultati alla pipeline (verifica, download, estrazione, salvataggio)
+            yield_window.page_submitted(page, len(page_items), len(organic_results), archived)
+            tracker.page_submitted(page, len(page_items), processed_count)
+            if show_sector:
+                print(f"[{sector}] Pagina {page}: {len(page_items)} nuovi risultati inviati ({processed_count} elaborati)")
+            if verify_batch_func is not None:
+                if page_items:
+                    pipeline.submit(page_items)
+            else:
+                for item in page_items:
+                    pipeline.submit(item)
+
             start += max_per_page
             page += 1
 
@@ -294,9 +570,23 @@ def process_companies_from_search(sector, limit, verify_func, extract_func, exce
         else:
             print("\nVerifica su: https://serper.dev/dashboard")
         return 0
+    finally:
+        # Ferma il prefetch e attendi che tutti i risultati inviati siano stati salvati
+        if prefetcher is not None:
+            prefetcher.close()
+        pipeline.close()
+        flush_companies(excel_filename)
+        flush_listeners.remove(tracker.persisted)
+
+    # Settore esaurito: con --resume verrà saltato
+    if exhausted:
+        journal.update(sector, done=True, inflight=None, inflight_page=None)
+
+    telemetry.event('sector', sector=sector, processed=processed_count, exhausted=exhausted,
+                    seconds=round(time.perf_counter() - sector_started, 3))
 
     print("\n" + "=" * 70)
-    print(f"COMPLETATO - Totale aziende processate: {processed_count}")
+    print(f"COMPLETATO{' - ' + sector if show_sector else ''} - Totale aziende processate: {processed_count}")
     print("=" * 70)
     print()
 
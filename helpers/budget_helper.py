@@ -0,0 +1,179 @@
+import os
+import threading
+
+# Categorie dello scheduler e tipo di chiamata a pagamento corrispondente
+CALL_KINDS = {
+    'serper': 'serp',
+    'serpapi': 'serp',
+    'openai': 'llm',
+    'gemini': 'llm',
+    'ollama': 'llm',
+}
+
+_current = threading.local()
+
+
+def get_budget_config():
+    """
+    Legge dalle variabili d'ambiente i limiti di chiamate e la soglia di resa.
+
+    Returns:
+        dict: Limiti globali e per settore (0 = illimitato), finestra e resa minima
+    """
+    return {
+        'serp_calls': int(os.environ.get("BUDGET_SERP_CALLS", "0")),
+        'llm_calls': int(os.environ.get("BUDGET_LLM_CALLS", "0")),
+        'sector_serp_calls': int(os.environ.get("BUDGET_SECTOR_SERP_CALLS", "0")),
+        'sector_llm_calls': int(os.environ.get("BUDGET_SECTOR_LLM_CALLS", "0")),
+        'yield_window': int(os.environ.get("YIELD_WINDOW", "3")),
+        'yield_min': float(os.environ.get("YIELD_MIN", "0.05")),
+    }
+
+
+def bind_sector(sector):
+    """Associa il thread corrente a un settore, a cui verranno addebitate le chiamate."""
+    _current.sector = sector
+
+
+def current_sector():
+    """Restituisce il settore associato al thread corrente (o None)."""
+    return getattr(_current, 'sector', None)
+
+
+class Budget:
+    """
+    Conta le chiamate SERP e LLM effettive (non in cache), globali e per settore.
+
+    I limiti sono controllati prima di ogni pagina di risultati: le chiamate
+    già in corso vengono completate, quindi un limite può essere superato di
+    poco. Tiene anche il conto delle aziende aggiunte per settore.
+    """
+
+    def __init__(self, serp_calls=0, llm_calls=0, sector_serp_calls=0, sector_llm_calls=0):
+        self.limits = {'serp': serp_calls, 'llm': llm_calls}
+        self.sector_limits = {'serp': sector_serp_calls, 'llm': sector_llm_calls}
+        self.totals = {'serp': 0, 'llm': 0}
+        self.sectors = {}
+        self.lock = threading.Lock()
+
+    def _sector(self, sector):
+        return self.sectors.setdefault(sector, {'serp': 0, 'llm': 0, 'companies': 0})
+
+    def record_call(self, category):
+        """Registra una chiamata verso la categoria dello scheduler (es. 'serper', 'gemini')."""
+        kind = CALL_KINDS.get(category)
+        if kind is None:
+            return
+        with self.lock:
+            self.totals[kind] += 1
+            self._sector(current_sector())[kind] += 1
+
+    def record_company(self, sector):
+        """Registra un'azienda aggiunta all'archivio."""
+        with self.lock:
+            self._sector(sector)['companies'] += 1
+
+    def exceeded(self, sector):
+        """
+        Controlla i limiti globali e del settore.
+
+        Returns:
+            str: Descrizione del limite raggiunto, o None se si può proseguire
+        """
+        with self.lock:
+            usage = self._sector(sector)
+            for kind in ('serp', 'llm'):
+                if self.limits[kind] and self.totals[kind] >= self.limits[kind]:
+                    return f"limite globale di chiamate {kind.upper()} ({self.limits[kind]})"
+                if self.sector_limits[kind] and usage[kind] >= self.sector_limits[kind]:
+                    return f"limite di chiamate {kind.upper()} per settore ({self.sector_limits[kind]})"
+        return None
+
+    def report(self):
+        """Stampa le chiamate consumate e le aziende ottenute per ogni settore."""
+        with self.lock:
+            rows = [(sector, dict(usage)) for sector, usage in self.sectors.items() if sector is not None]
+            totals = dict(self.totals)
+        companies = sum(usage['companies'] for _, usage in rows)
+        print("Consumo chiamate per settore (SERP / LLM / aziende aggiunte):")
+        for sector, usage in rows:
+            print(f"  {usage['serp']:5d} / {usage['llm']:5d} / {usage['companies']:5d}  {sector}")
+        calls = totals['serp'] + totals['llm']
+        per_company = f"{calls / companies:.1f} chiamate per azienda" if companies else "nessuna azienda aggiunta"
+        print(f"Totale: {totals['serp']} SERP, {totals['llm']} LLM, {companies} aziende ({per_company})")
+
+
+class YieldWindow:
+    """
+    Resa (aziende nuove / risultati) delle ultime pagine di un settore.
+
+    Per le pagine ancora nella pipeline si usa il massimo possibile (risultati
+    inviati alla verifica), sostituito dalle aziende salvate quando la pagina
+    è completata. Le aziende già in archivio all'avvio non contano nella
+    resa: nelle esecuzioni ripetute le prime pagine, fatte di aziende già
+    note, non fermano il settore e le pagine di sole aziende in archivio
+    restano fuori dalla finestra. I duplicati trovati durante l'esecuzione
+    (in questo o in un altro settore) contano invece come risultati senza
+    resa. Il settore va fermato quando la media delle ultime window pagine
+    scende sotto min_yield; con min_yield 0 il controllo è disattivato.
+    """
+
+    def __init__(self, window=3, min_yield=0.05):
+        self.window = max(1, window)
+        self.min_yield = min_yield
+        self.results = {}
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def page_submitted(self, page, candidates, results, archived=0):
+        """Registra una pagina inviata alla pipeline con la sua resa massima, escluse le aziende in archivio."""
+        results -= archived
+        if results <= 0 and archived:
+            return
+        with self.lock:
+            self.results[page] = results
+            self.values[page] = candidates / results if results else 0.0
+
+    def page_completed(self, page, saved):
+        """Sostituisce la stima con la resa effettiva della pagina completata."""
+        with self.lock:
+            results = self.results.get(page)
+            if results is not None:
+                self.values[page] = saved / results if results else 0.0
+
+    def rolling(self):
+        """Restituisce la resa media delle ultime pagine (None se sono meno di window)."""
+        with self.lock:
+            if len(self.values) < self.window:
+                return None
+            recent = [self.values[page] for page in sorted(self.values)[-self.window:]]
+            return sum(recent) / len(recent)
+
+    def should_stop(self):
+        rolling = self.rolling()
+        return self.min_yield > 0 and rolling is not None and rolling < self.min_yield
+
+
+_budget = None
+_budget_lock = threading.Lock()
+
+
+def get_budget():
+    """
+    Restituisce il contatore di chiamate condiviso da tutti i settori.
+
+    Returns:
+        Budget: Budget configurato da BUDGET_SERP_CALLS, BUDGET_LLM_CALLS,
+                BUDGET_SECTOR_SERP_CALLS e BUDGET_SECTOR_LLM_CALLS
+    """
+    global _budget
+    with _budget_lock:
+        if _budget is None:
+            config = get_budget_config()
+            _budget = Budget(
+                serp_calls=config['serp_calls'],
+                llm_calls=config['llm_calls'],
+                sector_serp_calls=config['sector_serp_calls'],
+                sector_llm_calls=config['sector_llm_calls'],
+            )
+    return _budget
@@ -0,0 +1,331 @@
+import os
+import gzip
+import json
+import time
+import atexit
+import functools
+import sqlite3
+import hashlib
+import threading
+from helpers.llm_helper import PROMPT_VERSION
+
+
+def get_cache_dir():
+    """Restituisce (creandola se serve) la cartella delle cache su disco."""
+    cache_dir = os.environ.get("CACHE_DIR", ".cache")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def hash_text(*parts):
+    """Calcola l'hash SHA-256 di una sequenza di valori."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part if part is not None else "").encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def make_cache_key(provider, model, prompt_version, url, content):
+    """
+    Costruisce la chiave di cache di una chiamata LLM.
+
+    Args:
+        provider (str): Nome del provider LLM
+        model (str): Nome del modello
+        prompt_version (str): Versione del prompt usato
+        url (str): URL del risultato o del sito
+        content (str): Contenuto inviato al modello (ne viene usato solo l'hash)
+
+    Returns:
+        str: Chiave univoca della chiamata
+    """
+    return hash_text(provider, model, prompt_version, url, hash_text(content))
+
+
+def verify_cache_key(provider, model, name, url, snippet):
+    """Chiave di cache per la verifica di un risultato di ricerca."""
+    return make_cache_key(provider, model, PROMPT_VERSION, url, f"{name}\n{snippet}")
+
+
+def extract_cache_key(provider, model, url, page_text):
+    """Chiave di cache per l'estrazione dei contatti dal testo ridotto di una pagina."""
+    return make_cache_key(provider, model, PROMPT_VERSION, url, page_text)
+
+
+def combined_cache_key(provider, model, name, url, snippet, page_text):
+    """Chiave di cache per la verifica con estrazione dei contatti in una sola chiamata."""
+    return make_cache_key(provider, model, PROMPT_VERSION, url, f"{name}\n{snippet}\n{page_text}")
+
+
+# Ultimi accessi tenuti in memoria prima di scriverli (l'ordine LRU tollera il ritardo)
+TOUCH_BATCH = 100
+
+# Oltre max_entries la cache viene ridotta a questa frazione, per non ricontare a ogni inserimento
+EVICT_TARGET = 0.9
+
+_databases = {}
+_databases_lock = threading.Lock()
+
+
+def open_database(path):
+    """
+    Apre un database SQLite delle cache, una sola volta per file.
+
+    Cache LLM e registro dei verdetti stanno nello stesso file e condividono
+    connessione e lock invece di contendersi il file. Come in storage_helper
+    si usano WAL e synchronous=NORMAL: le letture non bloccano le scritture
+    e un commit non attende la sincronizzazione del disco.
+
+    Args:
+        path (str): Percorso del database
+
+    Returns:
+        tuple: Connessione e lock da tenere durante l'uso
+    """
+    path = os.path.abspath(path)
+    with _databases_lock:
+        if path not in _databases:
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            _databases[path] = (conn, threading.Lock())
+        return _databases[path]
+
+
+class LLMCache:
+    """
+    Cache persistente su SQLite per le risposte LLM (verifica ed estrazione).
+
+    Le voci scadono dopo ttl secondi; oltre max_entries vengono eliminate
+    quelle usate meno di recente (LRU). Gli accessi vengono scritti a blocchi
+    di TOUCH_BATCH (o al primo inserimento) e il numero di voci è tenuto in
+    memoria, così una lettura non richiede una scrittura e un inserimento non
+    richiede un conteggio della tabella.
+    """
+
+    def __init__(self, path, ttl, max_entries):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.touched = {}
+        self.conn, self.lock = open_database(path)
+        with self.lock:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (kind, key)
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache (last_access)")
+            self.conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl,))
+            self.conn.commit()
+            self.count = self.conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def get(self, kind, key):
+        """
+        Cerca una risposta in cache.
+
+        Args:
+            kind (str): Tipo di chiamata ('verify', 'extract' o 'combined')
+            key (str): Chiave creata con make_cache_key
+
+        Returns:
+            Il valore salvato, None se assente o scaduto
+        """
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+            if row is None or row[1] < now - self.ttl:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.touched[(kind, key)] = now
+            if len(self.touched) >= TOUCH_BATCH:
+                self.write_touched()
+                self.conn.commit()
+        return json.loads(row[0])
+
+    def set(self, kind, key, value):
+        """Salva una risposta in cache ed elimina le voci in eccesso."""
+        now = time.time()
+        with self.lock:
+            self.write_touched()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (kind, key, value, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (kind, key, json.dumps(value), now, now)
+            )
+            # Conteggio per eccesso (una sostituzione non aggiunge voci): si ricontano solo oltre il limite
+            self.count += 1
+            if self.count > self.max_entries:
+                self.count = self.conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+                if self.count > self.max_entries:
+                    excess = self.count - int(self.max_entries * EVICT_TARGET)
+                    self.conn.execute(
+                        "DELETE FROM llm_cache WHERE rowid IN (SELECT rowid FROM llm_cache ORDER BY last_access LIMIT ?)",
+                        (excess,)
+                    )
+                    self.count -= excess
+            self.conn.commit()
+
+    def write_touched(self):
+        """Scrive gli ultimi accessi in sospeso (da chiamare con il lock, prima di un commit)."""
+        if self.touched:
+            self.conn.executemany(
+                "UPDATE llm_cache SET last_access = ? WHERE kind = ? AND key = ?",
+                [(accessed, kind, key) for (kind, key), accessed in self.touched.items()]
+            )
+            self.touched.clear()
+
+    def flush(self):
+        """Scrive gli ultimi accessi in sospeso."""
+        with self.lock:
+            self.write_touched()
+            self.conn.commit()
+
+
+class DisabledCache:
+    """Cache vuota usata quando LLM_CACHE=0."""
+
+    hits = 0
+    misses = 0
+
+    def get(self, kind, key):
+        return None
+
+    def set(self, kind, key, value):
+        pass
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """
+    Restituisce la cache LLM condivisa da tutti i provider.
+
+    Returns:
+        LLMCache: Cache configurata da LLM_CACHE, LLM_CACHE_TTL_DAYS e LLM_CACHE_MAX_ENTRIES
+    """
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            if os.environ.get("LLM_CACHE", "1") != "1":
+                _llm_cache = DisabledCache()
+            else:
+                _llm_cache = LLMCache(
+                    os.path.join(get_cache_dir(), "llm_cache.sqlite"),
+                    ttl=float(os.environ.get("LLM_CACHE_TTL_DAYS", "30")) * 86400,
+                    max_entries=int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "50000")),
+                )
+                atexit.register(_llm_cache.flush)
+    return _llm_cache
+
+
+def print_cache_stats():
+    """Stampa i contatori di hit e miss della cache LLM."""
+    cache = get_llm_cache()
+    total = cache.hits + cache.misses
+    rate = (cache.hits / total * 100) if total else 0
+    print(f"Cache LLM: {cache.hits} hit, {cache.misses} miss ({rate:.0f}% hit)")
+
+
+class SerpCache:
+    """
+    Cache su disco delle risposte delle API di ricerca, salvate come JSON compresso.
+
+    In modalità offline una chiave assente non genera chiamate all'API.
+    """
+
+    def __init__(self, directory, ttl, offline=False):
+        self.directory = directory
+        self.ttl = ttl
+        self.offline = offline
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.json.gz")
+
+    def get(self, key):
+        """Restituisce la risposta salvata, None se assente o scaduta."""
+        path = self.path(key)
+        try:
+            if os.path.getmtime(path) < time.time() - self.ttl:
+                return None
+            with gzip.open(path, "rt", encoding="utf-8") as cache_file:
+                return json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key, data):
+        """Salva una risposta (scrittura atomica con file temporaneo)."""
+        path = self.path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as cache_file:
+            json.dump(data, cache_file)
+        os.replace(tmp_path, path)
+
+
+_serp_cache = None
+
+
+def get_serp_cache():
+    """
+    Restituisce la cache delle ricerche, None se disattivata.
+
+    Returns:
+        SerpCache: Cache configurata da SERP_CACHE, SERP_CACHE_TTL_HOURS e SERP_OFFLINE
+    """
+    global _serp_cache
+    if _serp_cache is None and os.environ.get("SERP_CACHE", "1") == "1":
+        _serp_cache = SerpCache(
+            os.path.join(get_cache_dir(), "serp"),
+            ttl=float(os.environ.get("SERP_CACHE_TTL_HOURS", "24")) * 3600,
+            offline=os.environ.get("SERP_OFFLINE", "0") == "1",
+        )
+    return _serp_cache
+
+
+def cached_search(provider, gl=None, hl=None):
+    """
+    Decoratore che aggiunge la cache su disco a una funzione di ricerca.
+
+    La funzione decorata deve avere la firma (query, api_key, num=10, start=0).
+    La chiave comprende provider, query, gl/hl, num e start; la chiave API no.
+
+    Args:
+        provider (str): Nome del provider di ricerca
+        gl (str, optional): Paese della ricerca
+        hl (str, optional): Lingua della ricerca
+    """
+    def decorator(search_func):
+        @functools.wraps(search_func)
+        def wrapper(query, api_key, num=10, start=0):
+            cache = get_serp_cache()
+            if cache is None:
+                return search_func(query, api_key, num, start)
+
+            key = hash_text(provider, query, gl, hl, num, start)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+            if cache.offline:
+                print(f"✗ Modalità offline: ricerca '{query}' (start={start}) non presente in cache")
+                return None
+
+            results = search_func(query, api_key, num, start)
+            # Non salvare errori o risposte vuote
+            if results and "error" not in results:
+                cache.set(key, results)
+            return results
+        return wrapper
+    return decorator
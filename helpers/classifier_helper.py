@@ -0,0 +1,494 @@
+import os
+import re
+import json
+import math
+import atexit
+import time
+import zlib
+import random
+import argparse
+import threading
+from urllib.parse import urlsplit
+from helpers.cache_helper import get_cache_dir, hash_text, open_database
+from helpers.dedup_helper import registrable_domain
+
+# Dimensione dello spazio delle feature (hashing trick)
+FEATURE_BITS = 18
+
+# Parole del testo: lettere (anche accentate) e cifre
+WORD_RE = re.compile(r'[a-zà-ÿ0-9]+')
+
+# Quota dei verdetti tenuta da parte per misurare l'accordo con l'LLM
+HOLDOUT_FRACTION = 0.2
+
+# Verdetti tenuti in memoria prima di scriverli con un unico commit
+VERDICT_BATCH = 50
+
+
+def get_classifier_config():
+    """
+    Legge dalle variabili d'ambiente la configurazione del classificatore locale.
+
+    Returns:
+        dict: Attivazione, file del modello, soglie di decisione, quota di controlli
+              con l'LLM, liste di domini e verdetti minimi per addestrare
+    """
+    def domains(name):
+        return tuple(d.strip().lower() for d in os.environ.get(name, "").split(",") if d.strip())
+
+    return {
+        'enabled': os.environ.get("CLASSIFIER", "1") == "1",
+        'model_path': os.environ.get("CLASSIFIER_MODEL") or os.path.join(get_cache_dir(), "classifier.json"),
+        'low': float(os.environ.get("CLASSIFIER_LOW", "0.05")),
+        'high': float(os.environ.get("CLASSIFIER_HIGH", "0.95")),
+        'audit_rate': float(os.environ.get("CLASSIFIER_AUDIT_RATE", "0.05")),
+        'blocklist': domains("CLASSIFIER_BLOCKLIST"),
+        'allowlist': domains("CLASSIFIER_ALLOWLIST"),
+        'min_samples': int(os.environ.get("CLASSIFIER_MIN_SAMPLES", "200")),
+        'domain_min_count': int(os.environ.get("CLASSIFIER_DOMAIN_MIN_COUNT", "3")),
+    }
+
+
+class VerdictLog:
+    """
+    Registro dei verdetti dati dall'LLM, usato per addestrare il classificatore.
+
+    Sta nello stesso database della cache LLM, di cui condivide connessione
+    e lock, ma è indipendente da LLM_CACHE: a differenza della cache
+    conserva titolo, URL e descrizione in chiaro. I verdetti vengono scritti
+    a blocchi di VERDICT_BATCH, con flush() per quelli ancora in memoria.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.pending = {}
+        self.conn, self.lock = open_database(path)
+        with self.lock:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS verdict_log (
+                    key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    title TEXT,
+                    snippet TEXT,
+                    verdict INTEGER NOT NULL,
+                    source TEXT,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self.conn.commit()
+
+    def add(self, name, url, snippet, verdict, source):
+        """
+        Registra il verdetto dell'LLM su un risultato di ricerca.
+
+        Args:
+            name (str): Titolo del risultato
+            url (str): URL del sito
+            snippet (str): Descrizione del risultato
+            verdict (bool): True se l'LLM lo ha giudicato un'azienda
+            source (str): Chiamata che ha prodotto il verdetto ('verify' o 'combined')
+        """
+        key = hash_text(url, name, snippet)
+        with self.lock:
+            self.pending[key] = (key, url, name, snippet, int(bool(verdict)), source, time.time())
+            if len(self.pending) >= VERDICT_BATCH:
+                self.write_pending()
+                self.conn.commit()
+
+    def write_pending(self):
+        """Scrive i verdetti in sospeso (da chiamare con il lock, prima di un commit)."""
+        if self.pending:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO verdict_log (key, url, title, snippet, verdict, source, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                list(self.pending.values())
+            )
+            self.pending.clear()
+
+    def flush(self):
+        """Scrive i verdetti in sospeso."""
+        with self.lock:
+            self.write_pending()
+            self.conn.commit()
+
+    def records(self):
+        """Restituisce tutti i verdetti registrati, dal più vecchio."""
+        with self.lock:
+            self.write_pending()
+            self.conn.commit()
+            rows = self.conn.execute("SELECT url, title, snippet, verdict, created_at FROM verdict_log ORDER BY created_at").fetchall()
+        return [{'url': url, 'title': title or "", 'snippet': snippet or "", 'verdict': bool(verdict), 'created_at': created_at}
+                for url, title, snippet, verdict, created_at in rows]
+
+
+def host_of(url):
+    host = (urlsplit(url if '://' in url else f"http://{url}").hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def extract_features(name, url, snippet):
+    """
+    Estrae le feature testuali di un risultato di ricerca.
+
+    Args:
+        name (str): Titolo del risultato
+        url (str): URL del sito
+        snippet (str): Descrizione del risultato
+
+    Returns:
+        list: Feature con prefisso per origine (t: titolo, s: descrizione, d/h: dominio, p: percorso)
+    """
+    features = []
+    title_words = WORD_RE.findall((name or "").lower())
+    features += [f"t:{word}" for word in title_words]
+    features += [f"tt:{a}_{b}" for a, b in zip(title_words, title_words[1:])]
+    features += [f"s:{word}" for word in WORD_RE.findall((snippet or "").lower())]
+
+    host = host_of(url or "")
+    features.append(f"d:{registrable_domain(url)}" if url else "d:")
+    labels = host.split(".")
+    features.append(f"tld:{labels[-1]}")
+    features += [f"h:{part}" for label in labels[:-1] for part in label.split("-") if part]
+
+    path = urlsplit(url or "").path.lower()
+    segments = [segment for segment in path.split("/") if segment]
+    features.append(f"depth:{min(len(segments), 4)}")
+    features += [f"p:{word}" for segment in segments for word in WORD_RE.findall(segment)]
+    return features
+
+
+def hash_features(features, bits=FEATURE_BITS):
+    """Conta le feature per indice (crc32, stabile tra un'esecuzione e l'altra)."""
+    mask = (1 << bits) - 1
+    counts = {}
+    for feature in features:
+        index = zlib.crc32(feature.encode("utf-8")) & mask
+        counts[index] = counts.get(index, 0) + 1
+    return counts
+
+
+def tfidf_vector(counts, idf):
+    """Vettore TF-IDF sublineare normalizzato (L2); le feature senza IDF vengono ignorate."""
+    vector = {index: (1 + math.log(count)) * idf[index] for index, count in counts.items() if index in idf}
+    norm = math.sqrt(sum(value * value for value in vector.values()))
+    if norm:
+        vector = {index: value / norm for index, value in vector.items()}
+    return vector
+
+
+def sigmoid(z):
+    if z < -30:
+        return 0.0
+    if z > 30:
+        return 1.0
+    return 1 / (1 + math.exp(-z))
+
+
+def is_holdout(record):
+    """Assegna stabilmente un verdetto all'insieme di controllo in base all'URL."""
+    return zlib.crc32(record['url'].encode("utf-8")) % 1000 < HOLDOUT_FRACTION * 1000
+
+
+def learn_domains(records, min_count):
+    """
+    Domini con almeno min_count verdetti tutti concordi.
+
+    Returns:
+        tuple: (domini sempre accettati, domini sempre scartati)
+    """
+    stats = {}
+    for record in records:
+        counts = stats.setdefault(registrable_domain(record['url']), [0, 0])
+        counts[record['verdict']] += 1
+    allowed = sorted(domain for domain, (no, yes) in stats.items() if yes >= min_count and no == 0)
+    blocked = sorted(domain for domain, (no, yes) in stats.items() if no >= min_count and yes == 0)
+    return allowed, blocked
+
+
+def train(records, epochs=10, l2=1e-4, learning_rate=0.5):
+    """
+    Addestra una regressione logistica su feature TF-IDF con hashing.
+
+    La discesa del gradiente stocastica lavora su vettori sparsi; le classi
+    sono bilanciate con pesi inversi alla loro frequenza.
+
+    Args:
+        records (list): Verdetti con 'url', 'title', 'snippet' e 'verdict'
+        epochs (int): Passate sui dati
+        l2 (float): Regolarizzazione
+        learning_rate (float): Passo iniziale
+
+    Returns:
+        dict: Modello con 'idf', 'weights' e 'bias' (indici come stringhe, per il JSON)
+    """
+    documents = [(hash_features(extract_features(r['title'], r['url'], r['snippet'])), r['verdict']) for r in records]
+    frequencies = {}
+    for counts, _ in documents:
+        for index in counts:
+            frequencies[index] = frequencies.get(index, 0) + 1
+    total = len(documents)
+    idf = {index: math.log((1 + total) / (1 + df)) + 1 for index, df in frequencies.items()}
+    samples = [(tfidf_vector(counts, idf), 1.0 if verdict else 0.0) for counts, verdict in documents]
+
+    positives = sum(label for _, label in samples)
+    class_weights = {
+        1.0: total / (2 * positives) if positives else 1.0,
+        0.0: total / (2 * (total - positives)) if total > positives else 1.0,
+    }
+
+    weights = {}
+    bias = 0.0
+    rng = random.Random(0)
+    step = 0
+    for _ in range(epochs):
+        rng.shuffle(samples)
+        for vector, label in samples:
+            step += 1
+            rate = learning_rate / (1 + step * l2 * learning_rate)
+            z = bias + sum(weights.get(index, 0.0) * value for index, value in vector.items())
+            gradient = (sigmoid(z) - label) * class_weights[label]
+            for index, value in vector.items():
+                weights[index] = weights.get(index, 0.0) * (1 - rate * l2) - rate * gradient * value
+            bias -= rate * gradient
+
+    return {
+        'bits': FEATURE_BITS,
+        'idf': {str(index): round(value, 5) for index, value in idf.items()},
+        'weights': {str(index): round(value, 5) for index, value in weights.items() if abs(value) >= 1e-4},
+        'bias': bias,
+    }
+
+
+class LocalClassifier:
+    """
+    Classificatore locale dei risultati di ricerca, davanti alla verifica LLM.
+
+    Decide da solo i casi chiari (domini in lista o probabilità fuori
+    dall'intervallo [low, high]) e lascia all'LLM quelli incerti. Una quota
+    delle decisioni locali (audit_rate) viene comunque verificata dall'LLM
+    per misurare l'accordo durante l'esecuzione.
+    """
+
+    def __init__(self, model=None, config=None):
+        self.config = config or get_classifier_config()
+        self.model = model
+        self.idf = {}
+        self.weights = {}
+        self.allowlist = set(self.config['allowlist'])
+        self.blocklist = set(self.config['blocklist'])
+        if model is not None:
+            self.idf = {int(index): value for index, value in model['idf'].items()}
+            self.weights = {int(index): value for index, value in model['weights'].items()}
+            self.allowlist.update(model.get('allowlist', ()))
+            self.blocklist.update(model.get('blocklist', ()))
+        self.decisions = {}
+        self.audits = {'agree': 0, 'disagree': 0}
+        self.rng = random.Random()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, config=None):
+        """Carica il modello salvato, se esiste (altrimenti valgono solo le liste di domini)."""
+        config = config or get_classifier_config()
+        model = None
+        if os.path.exists(config['model_path']):
+            with open(config['model_path'], encoding="utf-8") as model_file:
+                model = json.load(model_file)
+        return cls(model, config)
+
+    def probability(self, name, url, snippet):
+        """Probabilità che il risultato sia un'azienda, None senza modello."""
+        if self.model is None:
+            return None
+        vector = tfidf_vector(hash_features(extract_features(name, url, snippet), self.model['bits']), self.idf)
+        return sigmoid(self.model['bias'] + sum(self.weights.get(index, 0.0) * value for index, value in vector.items()))
+
+    def decide(self, name, url, snippet):
+        """
+        Decide in locale se il risultato è un'azienda.
+
+        Args:
+            name (str): Titolo del risultato
+            url (str): URL del sito
+            snippet (str): Descrizione del risultato
+
+        Returns:
+            tuple: (verdetto, motivo) - verdetto None se il caso va lasciato all'LLM
+        """
+        if not self.config['enabled']:
+            return None, None
+        domain = registrable_domain(url)
+        if domain in self.allowlist:
+            verdict, reason = True, "dominio in allowlist"
+        elif domain in self.blocklist:
+            verdict, reason = False, "dominio in blocklist"
+        else:
+            probability = self.probability(name, url, snippet)
+            if probability is None or self.config['low'] < probability < self.config['high']:
+                verdict, reason = None, "incerto"
+            else:
+                verdict, reason = probability >= self.config['high'], f"probabilità {probability:.0%}"
+        with self.lock:
+            key = 'llm' if verdict is None else ('company' if verdict else 'reject')
+            self.decisions[key] = self.decisions.get(key, 0) + 1
+        return verdict, reason
+
+    def should_audit(self):
+        """Estrae le decisioni locali da far comunque verificare all'LLM."""
+        with self.lock:
+            return self.rng.random() < self.config['audit_rate']
+
+    def record_audit(self, local_verdict, llm_verdict):
+        """Confronta una decisione locale con il verdetto dell'LLM."""
+        with self.lock:
+            self.audits['agree' if local_verdict == llm_verdict else 'disagree'] += 1
+
+    def report(self):
+        """Stampa le decisioni prese in locale e l'accordo con l'LLM sui controlli."""
+        with self.lock:
+            decisions = dict(self.decisions)
+            audits = dict(self.audits)
+        total = sum(decisions.values())
+        if not total:
+            return
+        local = decisions.get('company', 0) + decisions.get('reject', 0)
+        print(f"Classificatore locale: {local}/{total} decisi senza LLM "
+              f"({decisions.get('company', 0)} aziende, {decisions.get('reject', 0)} scartati)")
+        checked = audits['agree'] + audits['disagree']
+        if checked:
+            print(f"  Accordo con l'LLM sui controlli: {audits['agree']}/{checked} ({audits['agree'] / checked:.0%})")
+
+
+def evaluate(classifier, records):
+    """
+    Misura su dei verdetti LLM quanti casi il classificatore decide e con quale accordo.
+
+    Returns:
+        dict: 'total', 'decided' (copertura), 'agree' e 'agreement' (quota di accordo sui decisi)
+    """
+    decided = agree = 0
+    for record in records:
+        verdict, _ = classifier.decide(record['title'], record['url'], record['snippet'])
+        if verdict is None:
+            continue
+        decided += 1
+        agree += verdict == record['verdict']
+    return {
+        'total': len(records),
+        'decided': decided,
+        'agree': agree,
+        'agreement': round(agree / decided, 4) if decided else None,
+    }
+
+
+def retrain(config=None):
+    """
+    Riaddestra il modello su tutti i verdetti registrati e lo salva.
+
+    Il modello finale usa tutti i verdetti; l'accordo con l'LLM viene misurato
+    su un modello addestrato senza l'insieme di controllo.
+
+    Returns:
+        dict: Il modello salvato, None se i verdetti sono troppo pochi
+    """
+    config = config or get_classifier_config()
+    records = get_verdict_log().records()
+    if len(records) < config['min_samples']:
+        print(f"✗ Verdetti registrati: {len(records)}, ne servono almeno {config['min_samples']} (CLASSIFIER_MIN_SAMPLES)")
+        return None
+
+    training = [record for record in records if not is_holdout(record)]
+    holdout = [record for record in records if is_holdout(record)]
+    allowed, blocked = learn_domains(training, config['domain_min_count'])
+    trial = LocalClassifier(dict(train(training), allowlist=allowed, blocklist=blocked), dict(config, enabled=True))
+    metrics = evaluate(trial, holdout)
+
+    allowed, blocked = learn_domains(records, config['domain_min_count'])
+    model = dict(train(records), allowlist=allowed, blocklist=blocked)
+    model.update({
+        'trained_at': time.time(),
+        'samples': len(records),
+        'positives': sum(record['verdict'] for record in records),
+        'holdout': metrics,
+    })
+    tmp_path = f"{config['model_path']}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as model_file:
+        json.dump(model, model_file)
+    os.replace(tmp_path, config['model_path'])
+
+    print(f"✓ Modello addestrato su {len(records)} verdetti ({model['positives']} aziende) e salvato in {config['model_path']}")
+    print(f"  Domini appresi: {len(allowed)} in allowlist, {len(blocked)} in blocklist")
+    print_metrics("Controllo (modello senza questi verdetti)", metrics)
+    return model
+
+
+def print_metrics(label, metrics):
+    if not metrics['total']:
+        print(f"  {label}: nessun verdetto")
+        return
+    agreement = f"{metrics['agreement']:.1%}" if metrics['agreement'] is not None else "n/d"
+    print(f"  {label}: {metrics['decided']}/{metrics['total']} decisi in locale "
+          f"({metrics['decided'] / metrics['total']:.0%}), accordo con l'LLM {agreement}")
+
+
+def report(config=None):
+    """Stampa lo stato del modello e l'accordo con l'LLM sui verdetti successivi all'addestramento."""
+    config = config or get_classifier_config()
+    records = get_verdict_log().records()
+    print(f"Verdetti registrati: {len(records)} ({sum(r['verdict'] for r in records)} aziende)")
+    classifier = LocalClassifier.load(dict(config, enabled=True))
+    if classifier.model is None:
+        print(f"Nessun modello in {config['model_path']}: esegui 'python -m helpers.classifier_helper retrain'")
+        return
+    model = classifier.model
+    print(f"Modello del {time.strftime('%Y-%m-%d %H:%M', time.localtime(model['trained_at']))}, "
+          f"{model['samples']} verdetti, soglie {config['low']:.2f}/{config['high']:.2f}")
+    print_metrics("Controllo all'addestramento", model['holdout'])
+    newer = [record for record in records if record['created_at'] > model['trained_at']]
+    print_metrics("Verdetti successivi all'addestramento", evaluate(classifier, newer))
+
+
+_verdict_log = None
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def get_verdict_log():
+    """
+    Restituisce il registro dei verdetti condiviso, creandolo al primo uso.
+
+    Returns:
+        VerdictLog: Registro nel database della cache LLM
+    """
+    global _verdict_log
+    with _classifier_lock:
+        if _verdict_log is None:
+            _verdict_log = VerdictLog(os.path.join(get_cache_dir(), "llm_cache.sqlite"))
+            atexit.register(_verdict_log.flush)
+    return _verdict_log
+
+
+def get_classifier():
+    """
+    Restituisce il classificatore locale condiviso, caricandolo al primo uso.
+
+    Returns:
+        LocalClassifier: Classificatore configurato dalle variabili CLASSIFIER_*
+    """
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            _classifier = LocalClassifier.load()
+    return _classifier
+
+
+if __name__ == "__main__":
+    # python -m helpers.classifier_helper retrain | report
+    from dotenv import load_dotenv
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Classificatore locale dei risultati di ricerca.")
+    parser.add_argument("command", choices=("retrain", "report"), help="riaddestra il modello o mostra l'accordo con l'LLM")
+    args = parser.parse_args()
+    if args.command == "retrain":
+        retrain()
+    else:
+        report()
@@ -0,0 +1,208 @@
+import re
+import json
+from urllib.parse import unquote
+from bs4 import BeautifulSoup
+
+# Email in testo libero
+EMAIL_RE = re.compile(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}')
+
+# Numeri italiani: prefisso +39/0039 opzionale, fissi (0xx) e cellulari (3xx);
+# non devono seguire direttamente lettere o cifre (es. "IT01234567890" è una partita IVA)
+PHONE_RE = re.compile(r'(?<![\w+])(?:(?:\+|00)\s*39[\s.\-/]*)?\(?(?:0\d{1,3}|3\d{2})\)?(?:[\s.\-/]*\d){5,8}(?!\d)')
+
+# Email da scartare (immagini, segnaposto, servizi tecnici)
+IGNORED_EMAIL_SUFFIXES = ('.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp')
+IGNORED_EMAIL_DOMAINS = ('example.com', 'example.it', 'domain.com', 'dominio.it', 'sentry.io', 'wixpress.com', 'sentry-next.wixpress.com')
+IGNORED_EMAIL_PREFIXES = ('noreply', 'no-reply', 'donotreply', 'privacy', 'dpo')
+
+# Caselle generiche preferite per il contatto aziendale
+PREFERRED_EMAIL_PREFIXES = ('info', 'commerciale', 'vendite', 'sales', 'contatti', 'segreteria', 'amministrazione', 'ufficio')
+
+# Contesti che indicano un numero non telefonico (o un fax)
+# (la partita IVA può essere scritta con il prefisso IT, es. "P.IVA IT 01234567890")
+NON_PHONE_CONTEXT = re.compile(r'\b(p\.?\s?iva|partita iva|vat|c\.?\s?f\.?|codice fiscale|cod\.?\s?fisc|reg(istro)?\.?\s?imprese|rea|cap\.?\s?soc|capitale sociale|iban)\W*(it\W*)?$', re.IGNORECASE)
+FAX_CONTEXT = re.compile(r'\bfax\W*$', re.IGNORECASE)
+PHONE_CONTEXT = re.compile(r'\b(tel|telefono|phone|cell|mobile|chiama)\W*$', re.IGNORECASE)
+
+# Peso di ogni fonte nella classifica dei candidati
+SOURCE_WEIGHTS = {
+    'jsonld': 5,
+    'link': 3,
+    'text': 1,
+}
+
+
+def normalize_phone(phone):
+    """
+    Riduce un numero di telefono alle sole cifre nazionali (senza +39).
+
+    Args:
+        phone (str): Numero di telefono in qualsiasi formato
+
+    Returns:
+        str: Cifre del numero nazionale, None se non è un numero italiano valido
+    """
+    digits = re.sub(r'\D', '', phone)
+    if digits.startswith('0039'):
+        digits = digits[4:]
+    elif digits.startswith('39') and phone.strip().startswith('+'):
+        digits = digits[2:]
+
+    if digits.startswith('0') and 6 <= len(digits) <= 11:
+        return digits
+    if digits.startswith('3') and 9 <= len(digits) <= 10:
+        return digits
+    return None
+
+
+def is_valid_email(email):
+    """Controlla che un'email non sia un segnaposto, un'immagine o un indirizzo tecnico."""
+    email = email.lower()
+    if email.endswith(IGNORED_EMAIL_SUFFIXES):
+        return False
+    local, _, domain = email.partition('@')
+    if domain in IGNORED_EMAIL_DOMAINS:
+        return False
+    return not local.startswith(IGNORED_EMAIL_PREFIXES)
+
+
+def add_candidate(candidates, key, value, score):
+    """Somma il punteggio di un candidato, conservando la prima forma trovata."""
+    if key in candidates:
+        candidates[key]['score'] += score
+    else:
+        candidates[key] = {'value': value, 'score': score}
+
+
+def walk_jsonld(data):
+    """Restituisce tutti i dizionari contenuti in un blocco JSON-LD."""
+    if isinstance(data, dict):
+        yield data
+        for value in data.values():
+            yield from walk_jsonld(value)
+    elif isinstance(data, list):
+        for value in data:
+            yield from walk_jsonld(value)
+
+
+def find_contact_candidates(html_content):
+    """
+    Cerca email e telefoni nell'HTML senza usare LLM.
+
+    Le fonti considerate sono i blocchi JSON-LD schema.org, i link mailto:/tel:
+    e il testo visibile della pagina.
+
+    Args:
+        html_content (str): Contenuto HTML della pagina web
+
+    Returns:
+        dict: Liste 'email' e 'phone' di coppie (valore, punteggio) ordinate per punteggio
+    """
+    emails = {}
+    phones = {}
+    if not html_content:
+        return {'email': [], 'phone': []}
+
+    soup = BeautifulSoup(html_content, 'html.parser')
+
+    # Dati strutturati schema.org (Organization, LocalBusiness, ...)
+    for script in soup.find_all('script', type='application/ld+json'):
+        try:
+            data = json.loads(script.string or '')
+        except (json.JSONDecodeError, TypeError):
+            continue
+        for node in walk_jsonld(data):
+            email = node.get('email')
+            if isinstance(email, str):
+                email = email.replace('mailto:', '').strip()
+                if EMAIL_RE.fullmatch(email) and is_valid_email(email):
+                    add_candidate(emails, email.lower(), email, SOURCE_WEIGHTS['jsonld'])
+            telephone = node.get('telephone')
+            if isinstance(telephone, str):
+                key = normalize_phone(telephone)
+                if key:
+                    add_candidate(phones, key, telephone.strip(), SOURCE_WEIGHTS['jsonld'])
+
+    # Link mailto: e tel:
+    for link in soup.find_all('a', href=True):
+        href = link['href'].strip()
+        if href.lower().startswith('mailto:'):
+            email = unquote(href[7:].split('?')[0]).strip()
+            if EMAIL_RE.fullmatch(email) and is_valid_email(email):
+                add_candidate(emails, email.lower(), email, SOURCE_WEIGHTS['link'])
+        elif href.lower().startswith('tel:'):
+            telephone = unquote(href[4:]).strip()
+            key = normalize_phone(telephone)
+            if key:
+                add_candidate(phones, key, telephone, SOURCE_WEIGHTS['link'])
+
+    # Testo visibile
+    for tag in soup(['script', 'style', 'noscript', 'svg']):
+        tag.decompose()
+    text = re.sub(r'\s+', ' ', soup.get_text(' '))
+
+    for match in EMAIL_RE.finditer(text):
+        email = match.group(0)
+        if is_valid_email(email):
+            add_candidate(emails, email.lower(), email, SOURCE_WEIGHTS['text'])
+
+    for match in PHONE_RE.finditer(text):
+        context = text[max(0, match.start() - 30):match.start()]
+        if NON_PHONE_CONTEXT.search(context):
+            continue
+        key = normalize_phone(match.group(0))
+        if not key:
+            continue
+        score = SOURCE_WEIGHTS['text']
+        if FAX_CONTEXT.search(context):
+            score -= 2
+        elif PHONE_CONTEXT.search(context):
+            score += 1
+        add_candidate(phones, key, match.group(0).strip(), score)
+
+    # Preferisci le caselle generiche aziendali
+    for key, candidate in emails.items():
+        if key.split('@')[0] in PREFERRED_EMAIL_PREFIXES:
+            candidate['score'] += 1
+
+    return {
+        'email': sorted(((c['value'], c['score']) for c in emails.values()), key=lambda c: -c[1]),
+        'phone': sorted(((c['value'], c['score']) for c in phones.values() if c['score'] > 0), key=lambda c: -c[1]),
+    }
+
+
+def pick_best(candidates):
+    """
+    Sceglie il candidato migliore.
+
+    Returns:
+        tuple: (valore, ambiguo) - valore None se non ci sono candidati,
+               ambiguo True se i primi due candidati hanno lo stesso punteggio
+    """
+    if not candidates:
+        return None, False
+    if len(candidates) > 1 and candidates[0][1] == candidates[1][1]:
+        return None, True
+    return candidates[0][0], False
+
+
+def resolve_local_contacts(html_content):
+    """
+    Estrae email e telefono in locale, prima di ricorrere all'LLM.
+
+    Args:
+        html_content (str): Contenuto HTML della pagina web
+
+    Returns:
+        dict: Dizionario con 'email' e 'phone', oppure None se serve l'LLM
+              (nessun contatto trovato o candidati non distinguibili)
+    """
+    candidates = find_contact_candidates(html_content)
+    email, email_ambiguous = pick_best(candidates['email'])
+    phone, phone_ambiguous = pick_best(candidates['phone'])
+
+    if email_ambiguous or phone_ambiguous:
+        return None
+    if email is None and phone is None:
+        return None
+    return {'email': email, 'phone': phone}
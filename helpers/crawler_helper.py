@@ -0,0 +1,171 @@
+import os
+import re
+import time
+import requests
+from urllib.parse import urljoin, urlsplit
+from bs4 import BeautifulSoup
+from helpers.http_helper import fetch_page, get_timeout
+from helpers.dedup_helper import registrable_domain
+from helpers.contacts_helper import find_contact_candidates
+
+# Parole chiave nei link (testo o percorso) e relativo punteggio
+LINK_KEYWORDS = (
+    ('contatti', 10), ('contattaci', 10), ('contact', 9), ('dove-siamo', 7), ('dove siamo', 7),
+    ('sede', 5), ('chi-siamo', 5), ('chi siamo', 5), ('about', 4), ('azienda', 3), ('info', 2),
+)
+
+# Estensioni di file da non scaricare
+SKIPPED_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.zip', '.doc', '.docx', '.xls', '.xlsx', '.mp4')
+
+SITEMAP_LOC_RE = re.compile(r'<loc>\s*([^<\s]+)\s*</loc>', re.IGNORECASE)
+
+
+def get_crawl_config():
+    """
+    Legge dalle variabili d'ambiente i limiti del crawler delle pagine contatti.
+
+    Returns:
+        dict: Pagine massime per sito e tempo massimo per sito (secondi)
+    """
+    return {
+        'max_pages': int(os.environ.get("CRAWL_MAX_PAGES", "3")),
+        'time_budget': float(os.environ.get("CRAWL_TIME_BUDGET", "15")),
+    }
+
+
+def score_link(text):
+    """Calcola la probabilità (punteggio) che un link porti alla pagina contatti."""
+    text = text.lower()
+    return sum(score for keyword, score in LINK_KEYWORDS if keyword in text)
+
+
+def is_internal_page(base_url, url):
+    """Controlla che un URL sia una pagina HTML dello stesso sito."""
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https'):
+        return False
+    if parts.path.lower().endswith(SKIPPED_EXTENSIONS):
+        return False
+    return registrable_domain(url) == registrable_domain(base_url)
+
+
+def rank_contact_links(base_url, html_content):
+    """
+    Ordina i link interni della pagina per probabilità di contenere i contatti.
+
+    Args:
+        base_url (str): URL della pagina scaricata
+        html_content (str): Contenuto HTML della pagina
+
+    Returns:
+        list: URL con punteggio positivo, dal più promettente
+    """
+    soup = BeautifulSoup(html_content, 'html.parser')
+    scores = {}
+    for link in soup.find_all('a', href=True):
+        try:
+            url = urljoin(base_url, link['href'].strip()).split('#')[0]
+            if url.rstrip('/') == base_url.rstrip('/') or not is_internal_page(base_url, url):
+                continue
+        except ValueError:
+            # Link malformato (es. "http://[broken/contatti"): si salta solo questo
+            continue
+        score = score_link(link.get_text(' ')) + score_link(urlsplit(url).path)
+        if score > 0:
+            scores[url] = max(scores.get(url, 0), score)
+    return sorted(scores, key=lambda url: -scores[url])
+
+
+def rank_sitemap_links(base_url, timeout=None):
+    """Cerca in sitemap.xml le pagine con percorsi da pagina contatti."""
+    try:
+        sitemap = fetch_page(urljoin(base_url, '/sitemap.xml'), allowed_types=('application/xml', 'text/xml', 'text/plain'),
+                             timeout=timeout)
+    except requests.RequestException:
+        return []
+    scores = {}
+    for url in SITEMAP_LOC_RE.findall(sitemap):
+        try:
+            score = score_link(urlsplit(url).path)
+            if score > 0 and is_internal_page(base_url, url):
+                scores[url] = score
+        except ValueError:
+            continue
+    return sorted(scores, key=lambda url: -scores[url])
+
+
+def budget_timeout(deadline):
+    """Timeout (connessione, lettura) di una richiesta ridotto al tempo rimasto per il sito, None se è scaduto."""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        return None
+    return tuple(min(limit, remaining) for limit in get_timeout())
+
+
+def contact_coverage(html_content):
+    """Restituisce (email trovata, telefono trovato) secondo l'estrattore locale."""
+    candidates = find_contact_candidates(html_content)
+    return bool(candidates['email']), bool(candidates['phone'])
+
+
+def crawl_contact_pages(url, html_content, max_pages=None, time_budget=None):
+    """
+    Cerca i contatti nelle pagine interne quando la home page non li contiene.
+
+    Scarica al massimo max_pages documenti (pagine contatti, chi siamo, ...
+    e sitemap.xml, letta solo se i link della home non bastano) entro
+    time_budget secondi: ogni richiesta ha un timeout non superiore al
+    tempo rimasto. Si ferma appena email e telefono sono stati trovati.
+
+    Args:
+        url (str): URL della home page
+        html_content (str): Contenuto HTML della home page
+        max_pages (int, optional): Pagine massime da scaricare (default CRAWL_MAX_PAGES)
+        time_budget (float, optional): Secondi massimi per sito (default CRAWL_TIME_BUDGET)
+
+    Returns:
+        str: HTML della pagina migliore, o delle due pagine che insieme coprono email e telefono
+    """
+    config = get_crawl_config()
+    max_pages = config['max_pages'] if max_pages is None else max_pages
+    time_budget = config['time_budget'] if time_budget is None else time_budget
+
+    has_email, has_phone = contact_coverage(html_content)
+    if (has_email and has_phone) or max_pages <= 0:
+        return html_content
+
+    deadline = time.monotonic() + time_budget
+    links = rank_contact_links(url, html_content)
+    fetched = 0
+    # La sitemap conta come una pagina: serve solo se lascia posto ad almeno un link in più
+    timeout = budget_timeout(deadline)
+    if len(links) < max_pages - 1 and timeout is not None:
+        fetched += 1
+        links += [link for link in rank_sitemap_links(url, timeout=timeout) if link not in links]
+
+    pages = [(has_email, has_phone, html_content)]
+    for link in links:
+        timeout = budget_timeout(deadline)
+        if fetched >= max_pages or timeout is None:
+            break
+        fetched += 1
+        try:
+            page = fetch_page(link, timeout=timeout)
+        except requests.RequestException:
+            continue
+        page_email, page_phone = contact_coverage(page)
+        if page_email and page_phone:
+            return page
+        pages.append((page_email, page_phone, page))
+        has_email = has_email or page_email
+        has_phone = has_phone or page_phone
+        if has_email and has_phone:
+            break
+
+    # Unisci la pagina migliore per l'email con quella migliore per il telefono
+    email_page = next((page for found, _, page in pages if found), None)
+    phone_page = next((page for _, found, page in pages if found), None)
+    best = [page for page in (email_page, phone_page) if page is not None]
+    if not best:
+        return html_content
+    return "\n".join(dict.fromkeys(best))
@@ -0,0 +1,304 @@
+import os
+import ipaddress
+import threading
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+# Parametri di tracciamento da ignorare nel confronto degli URL
+TRACKING_PARAMS = ('gclid', 'fbclid', 'msclkid', 'yclid', 'mc_cid', 'mc_eid', '_ga', 'ref', 'srsltid')
+
+# Suffissi composti: il dominio registrabile ha un'etichetta in più
+MULTI_PART_SUFFIXES = ('co.uk', 'org.uk', 'com.au', 'co.jp', 'com.br', 'com.cn', 'co.za')
+
+# Domini geografici di secondo livello del .it (regioni, province e sigle): "rossi.como.it"
+# è registrato sotto "como.it". Non sono elencati i comuni e le grafie alternative
+# (es. "reggioemilia.it"), per cui si ricade sul dominio di secondo livello
+IT_GEOGRAPHIC_SLDS = frozenset('''
+    abruzzo basilicata calabria campania emilia-romagna friuli-venezia-giulia lazio liguria lombardia
+    marche molise piemonte puglia sardegna sicilia toscana trentino-alto-adige umbria valle-daosta veneto
+    agrigento alessandria ancona aosta arezzo ascoli-piceno asti avellino bari barletta-andria-trani
+    belluno benevento bergamo biella bologna bolzano brescia brindisi cagliari caltanissetta campobasso
+    caserta catania catanzaro chieti como cosenza cremona crotone cuneo enna fermo ferrara firenze foggia
+    forli-cesena frosinone genova gorizia grosseto imperia isernia laquila la-spezia latina lecce lecco
+    livorno lodi lucca macerata mantova massa-carrara matera messina milano modena monza napoli novara
+    nuoro oristano padova palermo parma pavia perugia pesaro-urbino pescara piacenza pisa pistoia
+    pordenone potenza prato ragusa ravenna reggio-calabria reggio-emilia rieti rimini roma rovigo salerno
+    sassari savona siena siracusa sondrio taranto teramo terni torino trapani trento treviso trieste udine
+    varese venezia verbania vercelli verona vibo-valentia vicenza viterbo
+    ag al an ao ap aq ar at av ba bg bi bl bn bo br bs bt bz ca cb ce ch ci cl cn co cr cs ct cz en fc fe
+    fg fi fm fr ge go gr im is kr lc le li lo lt lu mb mc me mi mn mo ms mt na no nu og ol or pa pc pd pe
+    pg pi pn po pr pt pu pv pz ra rc re rg ri rm rn ro sa si so sp sr ss su sv ta te tn to tp tr ts tv ud
+    va vb vc ve vi vr vs vt vv
+'''.split())
+
+# Domini condivisi da molte aziende: anche in modalità 'domain' si confronta l'URL
+SHARED_DOMAINS = (
+    'facebook.com', 'instagram.com', 'linkedin.com', 'youtube.com', 'google.com',
+    'paginegialle.it', 'paginebianche.it', 'kompass.com', 'europages.it', 'wikipedia.org',
+    'blogspot.com', 'wordpress.com', 'wixsite.com', 'altervista.org', 'jimdofree.com',
+)
+
+# Separatore dei settori quando la stessa azienda compare in più ricerche
+SECTOR_SEPARATOR = "; "
+
+
+def canonical_url(url):
+    """
+    Normalizza un URL per il confronto dei duplicati.
+
+    Ignora schema (http/https), "www.", porta predefinita, frammento,
+    slash finale e parametri di tracciamento.
+
+    Args:
+        url (str): URL da normalizzare
+
+    Returns:
+        str: URL canonico nella forma "host/percorso?query"
+    """
+    parts = urlsplit(url.strip() if '://' in url else f"http://{url.strip()}")
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if ':' in host:
+        # IPv6: le parentesi separano l'indirizzo dalla porta
+        host = f"[{host}]"
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path.rstrip('/')
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+    ]
+    canonical = host + path
+    if query:
+        canonical += '?' + urlencode(sorted(query))
+    return canonical
+
+
+def registrable_domain(url):
+    """
+    Restituisce il dominio registrabile di un URL (es. "shop.rossi.it" -> "rossi.it").
+
+    Gli indirizzi IP restano interi, i suffissi composti e i domini
+    geografici del .it (es. "rossi.como.it") contano come un'unica etichetta.
+
+    Args:
+        url (str): URL del sito
+
+    Returns:
+        str: Dominio registrabile
+    """
+    host = canonical_url(url).split('/')[0]
+    if host.startswith('['):
+        # Indirizzo IPv6, con l'eventuale porta dopo la parentesi
+        return host.split(']')[0] + ']'
+    host = host.split(':')[0]
+    try:
+        return str(ipaddress.IPv4Address(host))
+    except ValueError:
+        pass
+    labels = host.split('.')
+    geographic = labels[-1] == 'it' and len(labels) > 2 and labels[-2] in IT_GEOGRAPHIC_SLDS
+    size = 3 if '.'.join(labels[-2:]) in MULTI_PART_SUFFIXES or geographic else 2
+    return '.'.join(labels[-size:])
+
+
+def get_dedup_mode():
+    """Restituisce la modalità di confronto dei duplicati: 'url' o 'domain'."""
+    mode = os.environ.get("DEDUP_MODE", "domain").lower()
+    return mode if mode in ("url", "domain") else "domain"
+
+
+class CompanyIndex:
+    """
+    Indice dei siti già noti, con ricerca in tempo costante.
+
+    In modalità 'url' due risultati sono duplicati se hanno lo stesso URL
+    canonico; in modalità 'domain' se hanno lo stesso dominio registrabile.
+    Gli URL in elaborazione sono "prenotati" per non verificarli due volte.
+    Per ogni sito tiene anche l'elenco dei settori in cui è stato trovato.
+    L'indice è condiviso in sicurezza tra settori elaborati in parallelo:
+    salvataggi e aggiornamenti dei settori avvengono fuori dal lock, con al
+    più una scrittura in corso per sito; i settori aggiunti nel frattempo
+    vengono scritti da chi ha la scrittura in corso appena finisce.
+    """
+
+    def __init__(self, mode=None):
+        self.mode = mode or get_dedup_mode()
+        self.known = {}
+        self.pending = set()
+        self.sectors = {}
+        # Chiavi dei siti già in archivio all'avvio (da from_companies)
+        self.archived = frozenset()
+        # Siti con una scrittura in corso -> aggiornamento da eseguire dopo (None se non serve)
+        self.writing = {}
+        # Aziende lette da from_companies (anche duplicate)
+        self.loaded = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_companies(cls, companies, mode=None):
+        """
+        Crea l'indice a partire dalle aziende esistenti.
+
+        Args:
+            companies (iterable): Aziende esistenti (CompanyRecord), anche lette in streaming
+            mode (str, optional): 'url' o 'domain' (default DEDUP_MODE)
+
+        Returns:
+            CompanyIndex: Indice popolato, con il numero di aziende lette in loaded
+        """
+        index = cls(mode)
+        for company in companies:
+            index.loaded += 1
+            if company.url:
+                for sector in (company.sector or '').split(SECTOR_SEPARATOR):
+                    index.add(company.url, sector or None)
+        index.archived = frozenset(index.known)
+        return index
+
+    def key(self, url):
+        """Calcola la chiave di confronto di un URL secondo la modalità scelta."""
+        if self.mode == "domain":
+            domain = registrable_domain(url)
+            if domain not in SHARED_DOMAINS:
+                return domain
+        return canonical_url(url)
+
+    def __contains__(self, url):
+        key = self.key(url)
+        with self.lock:
+            return key in self.known
+
+    def in_archive(self, url):
+        """Controlla se un sito era già in archivio all'avvio (non trovato durante l'esecuzione)."""
+        return self.key(url) in self.archived
+
+    def __len__(self):
+        return len(self.known)
+
+    def add(self, url, sector=None, save=None, update=None):
+        """
+        Registra un sito come già presente.
+
+        Args:
+            url (str): URL del sito
+            sector (str, optional): Settore in cui è stato trovato
+            save (function, optional): Chiamata con i settori uniti, prima di
+                rendere visibile il sito agli altri settori (per salvarlo)
+            update (function, optional): Chiamata con (URL salvato, settori uniti)
+                se altri settori trovano il sito durante il salvataggio
+        """
+        key = self.key(url)
+        with self.lock:
+            sectors = self.sectors.setdefault(key, [])
+            if sector and sector not in sectors:
+                sectors.append(sector)
+            if save is None:
+                self.known.setdefault(key, url)
+                self.pending.discard(key)
+                return
+            # Il sito resta prenotato: gli altri settori lo vedono come in elaborazione
+            self.writing[key] = None
+            written = SECTOR_SEPARATOR.join(sectors)
+
+        try:
+            save(written)
+        except Exception:
+            with self.lock:
+                self.writing.pop(key, None)
+            raise
+        with self.lock:
+            self.known.setdefault(key, url)
+            self.pending.discard(key)
+            if self.writing[key] is None:
+                self.writing[key] = update
+        self._finish_write(key, written)
+
+    def merge_sector(self, url, sector, update):
+        """
+        Aggiunge un settore a un sito già presente o in elaborazione.
+
+        Args:
+            url (str): URL del risultato duplicato
+            sector (str): Settore della ricerca corrente
+            update (function): Chiamata con (URL salvato, settori uniti) se il
+                sito è già salvato e il settore è nuovo
+        """
+        key = self.key(url)
+        with self.lock:
+            sectors = self.sectors.setdefault(key, [])
+            if sector in sectors:
+                return
+            sectors.append(sector)
+            if key in self.writing:
+                # Scrittura in corso: i settori verranno aggiornati appena finisce
+                self.writing[key] = update
+                return
+            # Se il sito è ancora in elaborazione, i settori verranno uniti al salvataggio
+            if key not in self.known:
+                return
+            self.writing[key] = None
+            saved_url = self.known[key]
+            written = SECTOR_SEPARATOR.join(sectors)
+
+        try:
+            update(saved_url, written)
+        except Exception:
+            with self.lock:
+                self.writing.pop(key, None)
+            raise
+        self._finish_write(key, written)
+
+    def _finish_write(self, key, written):
+        """
+        Conclude la scrittura di un sito, ripetendola finché i settori salvati non sono aggiornati.
+
+        Args:
+            key (str): Chiave del sito
+            written (str): Settori uniti appena scritti
+        """
+        while True:
+            with self.lock:
+                update = self.writing[key]
+                current = SECTOR_SEPARATOR.join(self.sectors[key])
+                if update is None or current == written:
+                    del self.writing[key]
+                    return
+                self.writing[key] = None
+                saved_url = self.known[key]
+            try:
+                update(saved_url, current)
+            except Exception:
+                with self.lock:
+                    self.writing.pop(key, None)
+                raise
+            written = current
+
+    def claim(self, url, sector=None):
+        """
+        Prenota un URL per l'elaborazione.
+
+        Args:
+            url (str): URL del risultato
+            sector (str, optional): Settore della ricerca che lo elabora
+
+        Returns:
+            bool: False se il sito è già presente o già in elaborazione
+        """
+        key = self.key(url)
+        with self.lock:
+            if key in self.known or key in self.pending:
+                return False
+            self.pending.add(key)
+            if sector:
+                self.sectors[key] = [sector]
+            return True
+
+    def release(self, url):
+        """Annulla la prenotazione di un URL scartato."""
+        key = self.key(url)
+        with self.lock:
+            self.pending.discard(key)
+            if key not in self.known:
+                self.sectors.pop(key, None)
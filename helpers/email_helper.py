@@ -5,13 +5,13 @@ from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
 from email import encoders
 
-def generate_email_html(llm_client, companies, sector, is_gemini=False):
+def generate_email_html(llm_client, company_count, sector, is_gemini=False):
     """
     Genera il contenuto HTML dell'email usando il modello LLM specificato.
 
     Args:
         llm_client: Il client LLM (OpenAI o Gemini) - se None, usa fallback
-        companies: Lista delle aziende
+        company_count: Numero di aziende nel file
         sector: Il settore
         is_gemini: True se è Gemini, False se OpenAI
 
@@ -24,7 +24,7 @@ def generate_email_html(llm_client, companies, sector, is_gemini=False):
                 prompt = f"""
                 Crea un messaggio email in formato HTML che semplicemente dà conferma della creazione del file.
                 Non usare codice CSS inline.
-                il messaggio di base deve essere "Ciao! il file con la lista è stato creato! la lista è composta da {len(companies)} aziende che operano nel settore {sector}"
+                il messaggio di base deve essere "Ciao! il file con la lista è stato creato! la lista è composta da {company_count} aziende che operano nel settore {sector}"
                 
                 RESTITUISCI SOLO CODICE HTML
                 """
@@ -35,19 +35,19 @@ def generate_email_html(llm_client, companies, sector, is_gemini=False):
                     model=os.environ.get("OPENAI_MODEL", "DuckAi-General"),
                     messages=[
                         {"role": "system", "content": "Sei un assistente che genera email HTML professionali e concise. Non includere CSS inline."},
-                        {"role": "user", "content": f"Genera una breve email HTML che conferma la creazione del file Excel con {len(companies)} aziende trovate nel settore '{sector}'. Menziona che il file è allegato. Mantieni il messaggio breve e professionale."},
+                        {"role": "user", "content": f"Genera una breve email HTML che conferma la creazione del file Excel con {company_count} aziende trovate nel settore '{sector}'. Menziona che il file è allegato. Mantieni il messaggio breve e professionale."},
                     ]
                 )
                 html_content = completion.choices[0].message.content
         except Exception as e:
             print(f"Errore nella generazione del contenuto HTML: {e}")
-            html_content = generate_fallback_html(companies, sector)
+            html_content = generate_fallback_html(company_count, sector)
     else:
-        html_content = generate_fallback_html(companies, sector)
+        html_content = generate_fallback_html(company_count, sector)
 
     return html_content
 
-def generate_fallback_html(companies, sector):
+def generate_fallback_html(company_count, sector):
     """Genera HTML di fallback quando LLM non è disponibile."""
     return f"""
     <html>
@@ -55,21 +55,21 @@ def generate_fallback_html(companies, sector):
         <h2>Lista Aziende - {sector}</h2>
         <p>Ciao,</p>
         <p>Il file Excel con la lista delle aziende è stato creato con successo!</p>
-        <p><strong>Totale aziende trovate: {len(companies)}</strong></p>
+        <p><strong>Totale aziende trovate: {company_count}</strong></p>
         <p>Trovi i dettagli completi nel file Excel allegato.</p>
         <p>Cordiali saluti</p>
     </body>
     </html>
     """
 
-def send_email(file_path, recipient_email, companies, sector, llm_client=None, is_gemini=False):
+def send_email(file_path, recipient_email, company_count, sector, llm_client=None, is_gemini=False):
     """
     Invia un'email con il file Excel allegato.
 
     Args:
         file_path: Percorso del file Excel
         recipient_email: Email del destinatario
-        companies: Lista delle aziende
+        company_count: Numero di aziende nel file
         sector: Il settore
         llm_client: Il client LLM (opzionale)
         is_gemini: True se è Gemini, False se OpenAI
@@ -88,7 +88,7 @@ def send_email(file_path, recipient_email, companies, sector, llm_client=None, i
     message["To"] = recipient_email
     message["Subject"] = f"Lista Aziende - {sector}"
 
-    html_content = generate_email_html(llm_client, companies, sector, is_gemini)
+    html_content = generate_email_html(llm_client, company_count, sector, is_gemini)
     html_part = MIMEText(html_content, 'html')
     message.attach(html_part)
 
@@ -1,10 +1,20 @@
 import openpyxl
 import os
+import atexit
+import tempfile
+import threading
+from helpers.storage_helper import CompanyRecord, FlushListeners, get_storage_backend, get_store
+
+# Colonne del file Excel
+HEADERS = ['Nome Azienda', 'URL', 'Email', 'Telefono', 'Settore']
 
 def create_excel_if_not_exists():
     """
     Crea un file Excel con la struttura necessaria se non esiste.
 
+    Con l'archivio SQLite, se il database è vuoto vi importa le aziende
+    del file Excel esistente.
+
     Returns:
         str: Il nome del file Excel
     """
@@ -21,58 +31,328 @@ def create_excel_if_not_exists():
         print(f"✓ File Excel creato: {excel_filename}")
     else:
         print(f"✓ File Excel esistente trovato: {excel_filename}")
+
+    if get_storage_backend() == "sqlite" and get_store().count() == 0:
+        imported = import_excel_to_store(excel_filename)
+        if imported:
+            print(f"✓ Importate {imported} aziende da {excel_filename} nel database {get_store().db_path}")
     return excel_filename
 
+def iter_existing_companies(excel_filename):
+    """
+    Scorre le aziende esistenti dall'archivio (database SQLite o file Excel), una alla volta.
+
+    Args:
+        excel_filename (str): Il nome del file Excel
+
+    Returns:
+        iterator: CompanyRecord (name, url, email, phone, sector) per ogni azienda
+    """
+    if get_storage_backend() == "sqlite":
+        return get_store().iter_companies()
+    return iter_companies_from_excel(excel_filename)
+
+def count_existing_companies(excel_filename):
+    """
+    Conta le aziende esistenti senza caricarle.
+
+    Args:
+        excel_filename (str): Il nome del file Excel
+
+    Returns:
+        int: Numero di aziende nell'archivio
+    """
+    if get_storage_backend() == "sqlite":
+        return get_store().count()
+    return sum(1 for _ in iter_excel_rows(excel_filename, max_col=1))
+
 def load_existing_companies(excel_filename):
     """
-    Carica le aziende esistenti dal file Excel.
+    Carica in memoria le aziende esistenti dall'archivio (database SQLite o file Excel).
+
+    Resta per compatibilità: per archivi grandi conviene iter_existing_companies.
+
+    Args:
+        excel_filename (str): Il nome del file Excel
+
+    Returns:
+        list: Lista di aziende esistenti (dizionari con name, url, email, phone e sector)
+    """
+    return [company._asdict() for company in iter_existing_companies(excel_filename)]
+
+def iter_excel_rows(excel_filename, max_col=len(HEADERS)):
+    """
+    Scorre in streaming le righe con un nome di un file Excel, senza l'intestazione.
+
+    Il file viene aperto in sola lettura (modalità read-only di openpyxl):
+    le righe vengono lette dall'XML man mano, senza costruire le celle
+    dell'intero foglio.
 
     Args:
         excel_filename (str): Il nome del file Excel
+        max_col (int, optional): Numero di colonne da leggere (default tutte)
 
     Returns:
-        list: Lista di aziende esistenti
+        iterator: Tuple di max_col valori per ogni riga
     """
     if not os.path.exists(excel_filename):
-        return []
-    
-    wb = openpyxl.load_workbook(excel_filename)
-    ws = wb.active
-    companies = []
-    for row in ws.iter_rows(min_row=2, values_only=True):  # Salta l'intestazione
-        if row[0]:  # Se c'è un nome
-            companies.append({
-                'name': row[0],
-                'url': row[1],
-                'email': row[2],
-                'phone': row[3],
-                'sector': row[4] if len(row) > 4 else None
-            })
-    return companies
+        return
+    wb = openpyxl.load_workbook(excel_filename, read_only=True, data_only=True)
+    try:
+        for row in wb.active.iter_rows(min_row=2, max_col=max_col, values_only=True):  # Salta l'intestazione
+            if row and row[0]:  # Se c'è un nome
+                yield row + (None,) * (max_col - len(row))
+    finally:
+        wb.close()
+
+def iter_companies_from_excel(excel_filename):
+    """
+    Legge in streaming le aziende da un file Excel.
+
+    Args:
+        excel_filename (str): Il nome del file Excel
+
+    Returns:
+        iterator: CompanyRecord per ogni azienda presente nel file
+    """
+    return map(CompanyRecord._make, iter_excel_rows(excel_filename))
+
+def save_workbook_atomic(wb, excel_filename):
+    """
+    Salva la cartella di lavoro su un file temporaneo e poi lo rinomina.
+
+    Args:
+        wb (Workbook): La cartella di lavoro da salvare
+        excel_filename (str): Il nome del file Excel
+    """
+    directory = os.path.dirname(os.path.abspath(excel_filename))
+    fd, tmp_path = tempfile.mkstemp(suffix=".xlsx", dir=directory)
+    os.close(fd)
+    try:
+        wb.save(tmp_path)
+        os.replace(tmp_path, excel_filename)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+class ExcelWriter:
+    """
+    Mantiene aperto il file Excel e salva le righe a blocchi.
+
+    Il salvataggio avviene ogni flush_rows righe oppure ogni flush_seconds
+    secondi, con scrittura atomica: un'interruzione perde al massimo un blocco.
+    Dopo ogni salvataggio vengono avvisate le funzioni registrate in flushed.
+    """
+
+    def __init__(self, excel_filename, flush_rows=20, flush_seconds=30):
+        self.excel_filename = excel_filename
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.wb = openpyxl.load_workbook(excel_filename)
+        self.ws = self.wb.active
+        # Riga di ogni URL, per aggiornare i settori delle aziende già scritte
+        self.rows = {
+            url: row for row, (url,) in enumerate(self.ws.iter_rows(min_row=2, min_col=2, max_col=2, values_only=True), start=2)
+            if url
+        }
+        self.pending = 0
+        self.flushed = FlushListeners()
+        self.lock = threading.Lock()
+        self.closed = threading.Event()
+        self.timer = threading.Thread(target=self._autoflush, daemon=True)
+        self.timer.start()
+
+    def _autoflush(self):
+        while not self.closed.wait(self.flush_seconds):
+            self.flush()
+
+    def append(self, company, sector):
+        """Aggiunge una riga e salva il file se il blocco è pieno."""
+        with self.lock:
+            self.ws.append([company['name'], company['url'], company['email'], company['phone'], sector])
+            self.rows.setdefault(company['url'], self.ws.max_row)
+            self.pending += 1
+            if self.pending >= self.flush_rows:
+                self._save()
+
+    def update_sector(self, url, sector):
+        """Aggiorna la colonna Settore della riga con l'URL indicato."""
+        with self.lock:
+            row = self.rows.get(url)
+            if row is None:
+                return
+            self.ws.cell(row=row, column=5, value=sector)
+            self.pending += 1
+            if self.pending >= self.flush_rows:
+                self._save()
+
+    def flush(self):
+        """Salva su disco le righe ancora in memoria."""
+        with self.lock:
+            if self.pending:
+                self._save()
+            else:
+                self.flushed.notify()
+
+    def _save(self):
+        save_workbook_atomic(self.wb, self.excel_filename)
+        self.pending = 0
+        self.flushed.notify()
+
+    def close(self):
+        """Salva le righe rimanenti e ferma il salvataggio periodico."""
+        self.closed.set()
+        self.flush()
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+def get_excel_writer(excel_filename):
+    """
+    Restituisce lo scrittore condiviso per un file Excel, creandolo al primo uso.
+
+    Args:
+        excel_filename (str): Il nome del file Excel
+
+    Returns:
+        ExcelWriter: Scrittore configurato da EXCEL_FLUSH_ROWS e EXCEL_FLUSH_SECONDS
+    """
+    with _writers_lock:
+        if excel_filename not in _writers:
+            if not _writers:
+                atexit.register(close_excel_writers)
+            _writers[excel_filename] = ExcelWriter(
+                excel_filename,
+                flush_rows=int(os.environ.get("EXCEL_FLUSH_ROWS", "20")),
+                flush_seconds=float(os.environ.get("EXCEL_FLUSH_SECONDS", "30")),
+            )
+        return _writers[excel_filename]
+
+def flush_companies(excel_filename):
+    """
+    Scrive su disco le aziende ancora in memoria (blocco SQLite o righe Excel in sospeso).
+
+    Args:
+        excel_filename (str): Il nome del file Excel
+    """
+    if get_storage_backend() == "sqlite":
+        get_store().flush()
+        return
+    with _writers_lock:
+        writer = _writers.get(excel_filename)
+    if writer is not None:
+        writer.flush()
+
+def get_flush_listeners(excel_filename):
+    """
+    Restituisce le funzioni avvisate dopo ogni scrittura su disco delle aziende.
+
+    Args:
+        excel_filename (str): Il nome del file Excel
+
+    Returns:
+        FlushListeners: Avvisi dell'archivio SQLite o dello scrittore del file Excel
+    """
+    if get_storage_backend() == "sqlite":
+        return get_store().flushed
+    return get_excel_writer(excel_filename).flushed
+
+def close_excel_writers():
+    """Salva e chiude tutti gli scrittori aperti."""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
 
 def add_company_to_excel(excel_filename, company, sector):
     """
-    Aggiunge una singola azienda al file Excel.
+    Aggiunge una singola azienda all'archivio.
+
+    Con l'archivio SQLite la riga va nel database (il file Excel si crea con
+    export_excel); altrimenti viene scritta tramite lo scrittore a blocchi del
+    file, salvato ogni EXCEL_FLUSH_ROWS righe o EXCEL_FLUSH_SECONDS secondi.
 
     Args:
         excel_filename (str): Il nome del file Excel
         company (dict): I dati dell'azienda da aggiungere
         sector (str): Il settore dell'azienda
     """
-    wb = openpyxl.load_workbook(excel_filename)
-    ws = wb.active
-    ws.append([company['name'], company['url'], company['email'], company['phone'], sector])
-    wb.save(excel_filename)
+    if get_storage_backend() == "sqlite":
+        get_store().add_company(company, sector)
+        print(f"✓ Azienda '{company['name']}' aggiunta al database")
+        return
+    get_excel_writer(excel_filename).append(company, sector)
     print(f"✓ Azienda '{company['name']}' aggiunta al file Excel")
 
+def update_company_sector(excel_filename, url, sector):
+    """
+    Aggiorna i settori di un'azienda già salvata, trovata anche in un altro settore.
+
+    Args:
+        excel_filename (str): Il nome del file Excel
+        url (str): L'URL con cui l'azienda è stata salvata
+        sector (str): I settori uniti dell'azienda
+    """
+    if get_storage_backend() == "sqlite":
+        get_store().update_sector(url, sector)
+    else:
+        get_excel_writer(excel_filename).update_sector(url, sector)
+    print(f"✓ Settori aggiornati per {url}: {sector}")
+
+def import_excel_to_store(excel_filename):
+    """
+    Importa nel database SQLite le aziende di un file Excel.
+
+    Args:
+        excel_filename (str): Il nome del file Excel
+
+    Returns:
+        int: Numero di aziende importate
+    """
+    return get_store().add_companies(company._asdict() for company in iter_companies_from_excel(excel_filename))
+
+def export_excel(excel_filename):
+    """
+    Produce il file Excel finale a partire dall'archivio.
+
+    Con l'archivio SQLite scrive il file in streaming (modalità write-only)
+    e lo sostituisce in modo atomico; altrimenti salva le righe in sospeso.
+
+    Args:
+        excel_filename (str): Il nome del file Excel
+
+    Returns:
+        str: Il nome del file Excel
+    """
+    if get_storage_backend() != "sqlite":
+        close_excel_writers()
+        return excel_filename
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(HEADERS)
+    for row in get_store().iter_rows():
+        ws.append(list(row))
+    save_workbook_atomic(wb, excel_filename)
+    print(f"✓ File Excel esportato dal database: {excel_filename}")
+    return excel_filename
+
 def save_excel_file(companies, sector):
     """
     Salva i dati delle aziende in un file Excel.
 
+    Con l'archivio SQLite le aziende vengono aggiunte al database e il file
+    viene esportato per intero.
+
     Args:
         companies (list): Lista di aziende da salvare
         sector (str): Il settore per il quale sono state trovate aziende
     """
+    if get_storage_backend() == "sqlite":
+        get_store().add_companies([dict(company, sector=sector) for company in companies])
+        return export_excel("lista_aziende.xlsx")
+
     # Crea una nuova cartella di lavoro Excel
     wb = openpyxl.Workbook()
     ws = wb.active
@@ -90,4 +370,11 @@ def save_excel_file(companies, sector):
     excel_filename = "lista_aziende.xlsx"
     wb.save(excel_filename)
     print(f"✓ File Excel salvato: {excel_filename}")
-    return excel_filename
\ No newline at end of file
+    return excel_filename
+
+if __name__ == "__main__":
+    # Migrazione: python -m helpers.excel_helper file1.xlsx [file2.xlsx ...]
+    import sys
+    for filename in sys.argv[1:]:
+        imported = import_excel_to_store(filename)
+        print(f"✓ Importate {imported} aziende da {filename} nel database {get_store().db_path}")
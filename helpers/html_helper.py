@@ -0,0 +1,87 @@
+import os
+import re
+from bs4 import BeautifulSoup
+
+# Tag che non contengono mai testo utile
+DROPPED_TAGS = ['script', 'style', 'svg', 'noscript', 'iframe', 'template', 'head']
+
+# Regioni della pagina che di solito contengono i contatti
+CONTACT_REGIONS = 'footer, address, [id*=contat], [class*=contat], [id*=contact], [class*=contact]'
+
+# Righe di testo rilevanti per i contatti
+CONTACT_KEYWORDS = re.compile(r'contatt|contact|\btel\b|telefono|\bcell|\bfax\b|e-?mail|@|\+39|sede|indirizzo|via\s', re.IGNORECASE)
+
+# Stima approssimativa: un token ogni 4 caratteri
+CHARS_PER_TOKEN = 4
+
+
+def get_token_budget():
+    """Restituisce il budget di token per il testo inviato all'LLM."""
+    return int(os.environ.get("LLM_TOKEN_BUDGET", "1500"))
+
+
+def text_lines(element):
+    """Restituisce le righe di testo non vuote di un elemento, con spazi compattati."""
+    lines = []
+    for line in element.get_text('\n').split('\n'):
+        line = re.sub(r'\s+', ' ', line).strip()
+        if line:
+            lines.append(line)
+    return lines
+
+
+def reduce_html(html_content, token_budget=None):
+    """
+    Riduce una pagina HTML al solo testo utile per trovare i contatti.
+
+    Rimuove script, stili, svg e noscript, compatta gli spazi e conserva
+    solo le regioni rilevanti (footer, indirizzi, blocchi "contatti" e righe
+    vicine a "tel", "@", ...), tagliando il risultato al budget di token.
+
+    Args:
+        html_content (str): Contenuto HTML della pagina web
+        token_budget (int, optional): Numero massimo di token (default LLM_TOKEN_BUDGET)
+
+    Returns:
+        str: Testo ridotto della pagina
+    """
+    if not html_content:
+        return ""
+    if token_budget is None:
+        token_budget = get_token_budget()
+
+    soup = BeautifulSoup(html_content, 'html.parser')
+    title = soup.title.get_text(strip=True) if soup.title else None
+
+    # I link mailto:/tel: perdono l'indirizzo quando si estrae il testo
+    links = []
+    for link in soup.find_all('a', href=True):
+        href = link['href'].strip()
+        if href.lower().startswith(('mailto:', 'tel:')):
+            links.append(href)
+
+    for tag in soup(DROPPED_TAGS):
+        tag.decompose()
+
+    selected = []
+    if title:
+        selected.append(title)
+    selected.extend(links)
+
+    # Regioni dedicate ai contatti
+    for region in soup.select(CONTACT_REGIONS):
+        selected.extend(text_lines(region))
+
+    # Righe con parole chiave, con una riga di contesto prima e dopo
+    all_lines = text_lines(soup)
+    for i, line in enumerate(all_lines):
+        if CONTACT_KEYWORDS.search(line):
+            selected.extend(all_lines[max(0, i - 1):i + 2])
+
+    # Nessuna regione rilevante: usa tutto il testo
+    if len(selected) <= (1 if title else 0) + len(links):
+        selected.extend(all_lines)
+
+    # Rimuovi i duplicati mantenendo l'ordine
+    text = '\n'.join(dict.fromkeys(selected))
+    return text[:token_budget * CHARS_PER_TOKEN]
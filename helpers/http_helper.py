@@ -0,0 +1,137 @@
+import os
+import re
+import threading
+import requests
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from helpers.rate_limit_helper import get_scheduler
+from helpers.telemetry_helper import get_telemetry
+
+# User-agent da browser per evitare blocchi
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Tipi di contenuto che vale la pena scaricare (niente PDF, ZIP, immagini, ...)
+ALLOWED_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain')
+
+# Fine del footer: di solito i contatti sono già stati letti
+FOOTER_END = b'</footer>'
+
+CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+
+
+class UnsupportedContentError(requests.RequestException):
+    """Il sito ha risposto con un tipo di contenuto non supportato."""
+
+
+def get_fetch_config():
+    """
+    Legge dalle variabili d'ambiente timeout e limiti dei download.
+
+    Returns:
+        dict: Timeout di connessione e lettura, byte massimi e dimensione del pool
+    """
+    return {
+        'connect_timeout': float(os.environ.get("FETCH_CONNECT_TIMEOUT", "5")),
+        'read_timeout': float(os.environ.get("FETCH_READ_TIMEOUT", "10")),
+        'max_bytes': int(os.environ.get("FETCH_MAX_BYTES", "1000000")),
+        'pool_size': int(os.environ.get("HTTP_POOL_SIZE", "20")),
+    }
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Restituisce la sessione HTTP condivisa, con pool di connessioni riutilizzabili.
+
+    Returns:
+        requests.Session: Sessione usata per i siti e per le API di ricerca
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            pool_size = get_fetch_config()['pool_size']
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            _session = requests.Session()
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+            _session.headers.update(DEFAULT_HEADERS)
+    return _session
+
+
+def get_timeout():
+    """Restituisce la coppia (connessione, lettura) dei timeout configurati."""
+    config = get_fetch_config()
+    return (config['connect_timeout'], config['read_timeout'])
+
+
+def decode_body(body, response):
+    """Decodifica il contenuto usando il charset dell'header, del tag meta o UTF-8."""
+    if 'charset' in response.headers.get('Content-Type', '').lower():
+        encoding = requests.utils.get_encoding_from_headers(response.headers)
+    else:
+        meta = CHARSET_RE.search(body[:4096])
+        encoding = meta.group(1).decode('ascii') if meta else 'utf-8'
+    try:
+        return body.decode(encoding, errors='replace')
+    except LookupError:
+        return body.decode('utf-8', errors='replace')
+
+
+def fetch_page(url, max_bytes=None, allowed_types=ALLOWED_CONTENT_TYPES, timeout=None):
+    """
+    Scarica una pagina web in streaming, con limite di dimensione.
+
+    Il download si interrompe al raggiungimento di max_bytes o appena
+    viene letto un tag </footer> di chiusura. Le richieste verso lo stesso
+    host passano dallo scheduler, che ne limita velocità e concorrenza.
+
+    Args:
+        url (str): URL della pagina
+        max_bytes (int, optional): Byte massimi da leggere (default FETCH_MAX_BYTES)
+        allowed_types (tuple, optional): Tipi di contenuto accettati (default pagine HTML e testo)
+        timeout (tuple, optional): Timeout (connessione, lettura) in secondi (default get_timeout())
+
+    Returns:
+        str: Contenuto HTML (eventualmente troncato)
+
+    Raises:
+        requests.RequestException: Errore di rete, stato HTTP o tipo di contenuto non supportato
+    """
+    if max_bytes is None:
+        max_bytes = get_fetch_config()['max_bytes']
+
+    host = urlsplit(url).hostname or url
+    return get_scheduler().call(f"host:{host}", download_page, url, max_bytes, allowed_types, timeout)
+
+
+def download_page(url, max_bytes, allowed_types, timeout=None):
+    """Esegue il download in streaming di fetch_page, senza limiti di velocità."""
+    with get_session().get(url, stream=True, timeout=timeout or get_timeout()) as response:
+        response.raise_for_status()
+
+        content_type = response.headers.get('Content-Type', 'text/html').split(';')[0].strip().lower()
+        if content_type not in allowed_types:
+            raise UnsupportedContentError(f"Tipo di contenuto non supportato: {content_type}")
+
+        chunks = []
+        size = 0
+        tail = b''
+        for chunk in response.iter_content(chunk_size=16384):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= max_bytes:
+                break
+            # Controlla anche il confine tra due blocchi
+            window = tail + chunk.lower()
+            if FOOTER_END in window:
+                break
+            tail = window[-len(FOOTER_END):]
+
+        body = b''.join(chunks)[:max_bytes]
+        get_telemetry().add_download(len(body))
+        return decode_body(body, response)
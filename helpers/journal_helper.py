@@ -0,0 +1,136 @@
+import os
+import json
+import time
+import threading
+from helpers.cache_helper import get_cache_dir, hash_text
+
+# Stato di un settore mai elaborato
+EMPTY_STATE = {'page': 0, 'processed': 0, 'inflight': None, 'inflight_page': None, 'done': False}
+
+
+def get_journal_path():
+    """Restituisce il percorso del diario di esecuzione (RUN_JOURNAL)."""
+    return os.environ.get("RUN_JOURNAL") or os.path.join(get_cache_dir(), "run_journal.json")
+
+
+def hash_results(results):
+    """Calcola l'hash degli URL di una pagina di risultati."""
+    return hash_text(*[result.get("link") for result in results])[:16]
+
+
+class RunJournal:
+    """
+    Diario persistente dell'avanzamento della paginazione per (provider, settore).
+
+    Per ogni settore registra l'ultima pagina completata, i risultati
+    elaborati, l'hash della pagina in corso e se il settore è terminato.
+    Con path None il diario resta solo in memoria.
+    """
+
+    def __init__(self, path, provider):
+        self.path = path
+        self.provider = provider
+        self.lock = threading.Lock()
+        self.data = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as journal_file:
+                    self.data = json.load(journal_file)
+            except (OSError, ValueError):
+                print(f"⚠ Diario di esecuzione non leggibile, si riparte da zero: {path}")
+                self.data = {}
+
+    def key(self, sector):
+        return f"{self.provider}::{sector}"
+
+    def reset(self):
+        """Cancella lo stato di tutti i settori del provider."""
+        with self.lock:
+            prefix = f"{self.provider}::"
+            self.data = {key: value for key, value in self.data.items() if not key.startswith(prefix)}
+            self._save()
+
+    def get(self, sector):
+        """
+        Restituisce lo stato salvato di un settore.
+
+        Returns:
+            dict: 'page' (ultima pagina completata), 'processed', 'inflight' e
+                  'inflight_page' (hash e numero della pagina in corso), 'done'
+        """
+        with self.lock:
+            return dict(self.data.get(self.key(sector), EMPTY_STATE))
+
+    def update(self, sector, **fields):
+        """Aggiorna lo stato di un settore e salva il diario."""
+        with self.lock:
+            state = self.data.setdefault(self.key(sector), dict(EMPTY_STATE))
+            state.update(fields)
+            state['updated_at'] = time.time()
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as journal_file:
+            json.dump(self.data, journal_file, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+class PageTracker:
+    """
+    Segue i risultati di ogni pagina attraverso la pipeline.
+
+    Una pagina è completata quando tutti i suoi risultati sono stati salvati
+    o scartati; on_complete, se indicato, riceve subito (pagina, aziende
+    salvate). Le aziende salvate possono però restare in memoria fino al
+    prossimo blocco dell'archivio: il diario avanza sulle pagine completate
+    consecutive solo in persisted(), da chiamare dopo ogni scrittura su
+    disco, così dopo un'interruzione una pagina segnata come completata ha
+    tutte le sue aziende nell'archivio.
+    """
+
+    def __init__(self, journal, sector, first_page, on_complete=None):
+        self.journal = journal
+        self.sector = sector
+        self.next_page = first_page
+        self.on_complete = on_complete
+        self.outstanding = {}
+        self.processed = {}
+        self.saved = {}
+        # Ultima pagina completata non ancora registrata nel diario, con i risultati elaborati
+        self.completed = None
+        self.lock = threading.Lock()
+
+    def page_submitted(self, page, count, processed_total):
+        """Registra una pagina inviata alla pipeline con count risultati da seguire."""
+        with self.lock:
+            self.outstanding[page] = self.outstanding.get(page, 0) + count
+            self.processed[page] = processed_total
+            self._advance()
+
+    def item_done(self, page, saved=False):
+        """Segnala che un risultato della pagina è uscito dalla pipeline (salvato o no)."""
+        with self.lock:
+            self.outstanding[page] -= 1
+            if saved:
+                self.saved[page] = self.saved.get(page, 0) + 1
+            self._advance()
+
+    def persisted(self):
+        """Registra nel diario le pagine completate: le loro aziende sono ormai su disco."""
+        with self.lock:
+            if self.completed is not None:
+                page, processed = self.completed
+                self.journal.update(self.sector, page=page, processed=processed)
+                self.completed = None
+
+    def _advance(self):
+        while self.outstanding.get(self.next_page) == 0:
+            page = self.next_page
+            self.completed = (page, self.processed.pop(page))
+            del self.outstanding[page]
+            if self.on_complete is not None:
+                self.on_complete(page, self.saved.pop(page, 0))
+            self.next_page += 1
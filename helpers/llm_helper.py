@@ -0,0 +1,797 @@
+import os
+import re
+import json
+import time
+from helpers.contacts_helper import resolve_local_contacts
+from helpers.html_helper import reduce_html
+
+# Versione dei prompt: va incrementata quando cambiano, per invalidare la cache LLM
+PROMPT_VERSION = "2"
+
+# Istruzioni per la verifica di un singolo risultato di ricerca
+VERIFY_PROMPT = """Sei un assistente esperto che identifica se un risultato di ricerca corrisponde a un'azienda vera e propria.
+
+Analizza il titolo, l'URL e la descrizione del risultato.
+Rispondi ESCLUSIVAMENTE con un oggetto JSON valido nel formato esatto: {"azienda": "SI"} se è un'azienda vera, {"azienda": "NO"} in tutti gli altri casi. Non aggiungere alcun testo, commento o spiegazione prima o dopo il JSON."""
+
+# Istruzioni per la verifica di una pagina intera di risultati in una sola chiamata
+BATCH_VERIFY_PROMPT = """Sei un assistente esperto che identifica se i risultati di una ricerca corrispondono ad aziende vere e proprie.
+
+Analizza il titolo, l'URL e la descrizione di ogni risultato.
+Per ogni risultato usa 'SI' se è un'azienda vera, 'NO' in tutti gli altri casi.
+Rispondi ESCLUSIVAMENTE con un oggetto JSON valido nel formato esatto: {"risultati": [{"indice": 0, "azienda": "SI"}, {"indice": 1, "azienda": "NO"}]}, con un elemento per ogni risultato. Non aggiungere alcun testo, commento o spiegazione prima o dopo il JSON."""
+
+# Istruzioni per l'estrazione dei contatti dal testo di una pagina
+EXTRACT_PROMPT = """Sei un assistente esperto che estrae informazioni di contatto da pagine web aziendali. Analizza il testo fornito, estratto dalle parti della pagina dedicate ai contatti, e trova l'email aziendale principale e il primo numero di telefono aziendale italiano che incontri. Rispondi ESCLUSIVAMENTE con un oggetto JSON valido nel formato esatto: {"email": "email@example.com", "phone": "+39 123 456789"}. Se non trovi l'email, metti null. Se non trovi il telefono, metti null. Non aggiungere alcun testo, commento o spiegazione prima o dopo il JSON."""
+
+# Istruzioni per la verifica e l'estrazione dei contatti in una sola chiamata
+COMBINED_PROMPT = """Sei un assistente esperto che analizza risultati di ricerca e siti web aziendali.
+
+Dal titolo, dall'URL, dalla descrizione del risultato e dal testo del sito stabilisci se il risultato corrisponde a un'azienda vera e propria (non un portale, un elenco di aziende, un social network, un articolo o un ente pubblico). Se è un'azienda, trova nel testo l'email aziendale principale e il primo numero di telefono aziendale italiano che incontri.
+Rispondi ESCLUSIVAMENTE con un oggetto JSON valido nel formato esatto: {"is_company": true, "email": "email@example.com", "phone": "+39 123 456789", "confidence": 0.9}, dove confidence (da 0 a 1) indica quanto sei sicuro del giudizio su is_company. Se non trovi l'email, metti null. Se non trovi il telefono, metti null. Non aggiungere alcun testo, commento o spiegazione prima o dopo il JSON."""
+
+# Schemi JSON delle risposte, usati dalla modalità strutturata dei provider
+VERDICT_SCHEMA = {"type": "string", "enum": ["SI", "NO"]}
+
+VERIFY_SCHEMA = {
+    "type": "object",
+    "properties": {"azienda": VERDICT_SCHEMA},
+    "required": ["azienda"],
+    "additionalProperties": False,
+}
+
+BATCH_VERIFY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "risultati": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"indice": {"type": "integer"}, "azienda": VERDICT_SCHEMA},
+                "required": ["indice", "azienda"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["risultati"],
+    "additionalProperties": False,
+}
+
+EXTRACT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "email": {"type": ["string", "null"]},
+        "phone": {"type": ["string", "null"]},
+    },
+    "required": ["email", "phone"],
+    "additionalProperties": False,
+}
+
+COMBINED_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "is_company": {"type": "boolean"},
+        "email": {"type": ["string", "null"]},
+        "phone": {"type": ["string", "null"]},
+        "confidence": {"type": "number"},
+    },
+    "required": ["is_company", "email", "phone", "confidence"],
+    "additionalProperties": False,
+}
+
+# Schema della risposta per tipo di richiesta
+SCHEMAS = {
+    'verify': VERIFY_SCHEMA,
+    'verify_batch': BATCH_VERIFY_SCHEMA,
+    'extract': EXTRACT_SCHEMA,
+    'combined': COMBINED_SCHEMA,
+}
+
+
+def get_output_config():
+    """
+    Legge dalle variabili d'ambiente la configurazione delle risposte LLM.
+
+    Returns:
+        dict: Modalità strutturata attiva, token massimi di risposta per tipo di richiesta,
+            token aggiuntivi e prefissi dei modelli che ragionano prima di rispondere e verifica in streaming
+    """
+    return {
+        'structured': os.environ.get("LLM_STRUCTURED_OUTPUT", "1") == "1",
+        'verify_tokens': int(os.environ.get("LLM_MAX_TOKENS_VERIFY", "16")),
+        'batch_tokens': int(os.environ.get("LLM_MAX_TOKENS_BATCH_ITEM", "16")),
+        'extract_tokens': int(os.environ.get("LLM_MAX_TOKENS_EXTRACT", "96")),
+        'combined_tokens': int(os.environ.get("LLM_MAX_TOKENS_COMBINED", "112")),
+        # I modelli che ragionano consumano token prima del JSON: il margine vale solo per loro,
+        # gli altri mantengono il limite stretto
+        'reasoning_tokens': int(os.environ.get("LLM_REASONING_TOKENS", "1024")),
+        'reasoning_models': [prefix.strip().lower() for prefix in os.environ.get(
+            "LLM_REASONING_MODELS", "gemini-2.5,gpt-oss,qwen3,qwq,deepseek-r1,o1,o3,o4").split(",") if prefix.strip()],
+        'stream_verify': os.environ.get("LLM_STREAM_VERIFY", "0") == "1",
+    }
+
+
+def is_reasoning_model(model, config=None):
+    """
+    Controlla se un modello ragiona prima di rispondere (prefissi di LLM_REASONING_MODELS).
+
+    Il confronto ignora il percorso del nome, es. "models/gemini-2.5-flash" o "openai/gpt-oss-20b".
+    """
+    config = config or get_output_config()
+    name = (model or "").lower().rsplit("/", 1)[-1]
+    return any(name.startswith(prefix) for prefix in config['reasoning_models'])
+
+
+def get_max_tokens(kind, count=1, model=None):
+    """
+    Token massimi della risposta per un tipo di richiesta.
+
+    Args:
+        kind (str): 'verify', 'verify_batch', 'extract' o 'combined'
+        count (int): Risultati inviati (solo per 'verify_batch')
+        model (str, optional): Modello usato: per i modelli che ragionano si aggiunge LLM_REASONING_TOKENS
+
+    Returns:
+        int: Limite da passare al provider
+    """
+    config = get_output_config()
+    if kind == 'verify_batch':
+        # Apertura e chiusura dell'oggetto più un elemento per risultato
+        tokens = 16 + config['batch_tokens'] * count
+    else:
+        tokens = config[f"{kind}_tokens"]
+    # I token di ragionamento (gemini-2.5, gpt-oss, ...) rientrano nel limite della risposta
+    if is_reasoning_model(model, config):
+        tokens += config['reasoning_tokens']
+    return tokens
+
+
+def get_response_schema(kind):
+    """Schema JSON della risposta, o None se la modalità strutturata è disattivata."""
+    if not get_output_config()['structured']:
+        return None
+    return SCHEMAS[kind]
+
+
+def format_verify_result(name, url, snippet):
+    """Prepara la descrizione di un singolo risultato da verificare."""
+    return f"Analizza questo risultato:\n\nTitolo: {name}\nURL: {url}\nDescrizione: {snippet}\n\nÈ un'azienda vera?"
+
+
+def format_extract_text(page_text):
+    """Prepara la richiesta di estrazione per il testo ridotto di una pagina."""
+    return f"Estrai email e numero di telefono (aiutandoti con i prefissi come .como.it e +39) da questo testo di pagina web aziendale: {page_text}"
+
+
+def format_combined_input(name, url, snippet, page_text):
+    """Prepara risultato di ricerca e testo ridotto del sito per la chiamata combinata."""
+    return (f"Analizza questo risultato:\n\nTitolo: {name}\nURL: {url}\nDescrizione: {snippet}\n\n"
+            f"Testo del sito (parti dedicate ai contatti): {page_text or 'non disponibile'}")
+
+
+class InvalidResponseError(ValueError):
+    """Risposta dell'LLM non interpretabile, sollevata solo nella modalità strict dei provider."""
+
+
+class TruncatedResponseError(InvalidResponseError):
+    """Risposta vuota o interrotta dal limite di token: non va interpretata né messa in cache."""
+
+
+def record_parse(kind, result):
+    """
+    Conta l'esito dell'interpretazione di una risposta.
+
+    Args:
+        kind (str): Tipo di richiesta
+        result (str): 'json' (JSON valido), 'fallback' (recuperata con le regex), 'failed',
+            'truncated' (limite di token raggiunto) o 'empty'
+    """
+    # Import locale: telemetry_helper dipende da cache_helper, che importa questo modulo
+    from helpers.telemetry_helper import get_telemetry
+    get_telemetry().count('llm_parse_total', kind=kind, result=result)
+
+
+def check_response(kind, text, truncated=False):
+    """
+    Scarta le risposte vuote o interrotte dal limite di token.
+
+    Una risposta troncata (finish_reason 'length' o MAX_TOKENS) può
+    contenere solo il ragionamento o un JSON incompleto: invece di leggerla
+    come un "NO" viene contata nella telemetria e segnalata come errore, così
+    da non finire nella cache.
+
+    Args:
+        kind (str): Tipo di richiesta
+        text (str): Testo della risposta
+        truncated (bool): True se il provider ha interrotto la generazione per il limite di token
+
+    Returns:
+        str: Il testo della risposta, se completa
+
+    Raises:
+        TruncatedResponseError: Se la risposta è vuota o troncata
+    """
+    if truncated:
+        record_parse(kind, 'truncated')
+        raise TruncatedResponseError("risposta troncata dal limite di token (aumentare LLM_REASONING_TOKENS "
+                                     "o aggiungere il modello a LLM_REASONING_MODELS)")
+    if not (text or "").strip():
+        record_parse(kind, 'empty')
+        raise TruncatedResponseError("risposta vuota")
+    return text
+
+
+def log_verdict(name, url, snippet, verdict, source):
+    """
+    Registra un verdetto dell'LLM per l'addestramento del classificatore locale.
+
+    Args:
+        name (str): Titolo del risultato
+        url (str): URL del sito
+        snippet (str): Descrizione del risultato
+        verdict (bool): True se è un'azienda
+        source (str): 'verify' o 'combined'
+    """
+    # Import locale, come per la telemetria
+    from helpers.classifier_helper import get_verdict_log
+    get_verdict_log().add(name, url, snippet, verdict, source)
+
+
+def load_json(text):
+    """Decodifica il testo come JSON, None se non è valido."""
+    try:
+        return json.loads(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_verdict(text):
+    """
+    Interpreta la risposta della verifica di un singolo risultato.
+
+    Legge l'oggetto {"azienda": "SI"|"NO"}; se il modello risponde in testo
+    libero ripiega sulla prima parola SI/NO.
+
+    Args:
+        text (str): Risposta testuale del modello
+
+    Returns:
+        bool: True se è un'azienda, False se no, None se la risposta non è interpretabile
+    """
+    data = load_json(text.strip()) if text else None
+    if isinstance(data, dict) and isinstance(data.get('azienda'), str):
+        verdict = data['azienda'].strip().upper()
+        if verdict in ("SI", "SÌ", "NO"):
+            record_parse('verify', 'json')
+            return verdict != "NO"
+
+    match = re.search(r'\b(SI|SÌ|NO)\b', text.upper()) if text else None
+    if match:
+        record_parse('verify', 'fallback')
+        return match.group(1) != "NO"
+    record_parse('verify', 'failed')
+    return None
+
+
+# Verdetto certo durante lo streaming: chiave JSON completa o SI/NO come prima parola
+STREAM_JSON_VERDICT_RE = re.compile(r'"azienda"\s*:\s*"\s*(SI|SÌ|NO)\s*"', re.IGNORECASE)
+STREAM_LEADING_VERDICT_RE = re.compile(r'^\W*(SI|SÌ|NO)\b(?=\W)', re.IGNORECASE)
+
+
+def read_streamed_verdict(chunks, provider, started):
+    """
+    Legge una risposta di verifica in streaming fermandosi al verdetto.
+
+    Il verdetto è certo appena compare {"azienda": "SI"|"NO"} con le
+    virgolette chiuse, o quando la risposta inizia con SI/NO seguito da un
+    separatore; altrimenti si legge tutta la risposta e la si interpreta
+    con parse_verdict. Chi chiama chiude lo stream per annullare il resto
+    della generazione.
+
+    Args:
+        chunks (iterable): Frammenti di testo nell'ordine di arrivo
+        provider (str): Provider LLM, per la telemetria
+        started (float): Istante (perf_counter) di invio della richiesta
+
+    Returns:
+        bool: True se è un'azienda, False se no, None se la risposta non è interpretabile
+    """
+    from helpers.telemetry_helper import get_telemetry
+    text = ""
+    verdict = None
+    early = False
+    for chunk in chunks:
+        if not chunk:
+            continue
+        text += chunk
+        match = STREAM_JSON_VERDICT_RE.search(text)
+        result = 'json'
+        if not match:
+            match = STREAM_LEADING_VERDICT_RE.search(text)
+            result = 'fallback'
+        if match:
+            record_parse('verify', result)
+            verdict = match.group(1).upper() != "NO"
+            early = True
+            break
+    if not early:
+        verdict = parse_verdict(text)
+
+    seconds = time.perf_counter() - started
+    telemetry = get_telemetry()
+    telemetry.observe('llm_verdict_seconds', seconds, provider=provider, early=early)
+    telemetry.count('llm_stream_total', provider=provider, result='early' if early else 'complete')
+    telemetry.event('llm_verdict', provider=provider, seconds=round(seconds, 3), early=early, chars=len(text))
+    return verdict
+
+
+def read_verdict_stream(stream, chunk_text, provider, started):
+    """
+    Legge uno stream di verifica fino al verdetto e annulla il resto della generazione.
+
+    Lo stream viene letto mentre lo scheduler tiene occupato il posto del
+    provider. Se il verdetto non è certo e la risposta è stata interrotta
+    dal limite di token, non vale come "NO" ma solleva TruncatedResponseError.
+    Alla fine lo stream viene annullato con cancel() o close(); se non
+    espone nessuno dei due (es. google.generativeai) smettere di leggerlo
+    non ferma la generazione sul server, e lo stream interrotto viene
+    contato in llm_stream_total con esito 'not_cancelled'.
+
+    Args:
+        stream (iterable): Frammenti della risposta del provider
+        chunk_text (callable): Restituisce (testo, troncato) di un frammento;
+            il testo può essere None se il frammento ne è privo
+        provider (str): Provider LLM, per la telemetria
+        started (float): Istante (perf_counter) di invio della richiesta
+
+    Returns:
+        bool: True se è un'azienda, False se no, None se la risposta non è interpretabile
+
+    Raises:
+        TruncatedResponseError: Se la risposta, letta fino in fondo, è stata troncata
+    """
+    from helpers.telemetry_helper import get_telemetry
+    truncated = False
+    exhausted = False
+
+    def texts():
+        nonlocal truncated, exhausted
+        for chunk in stream:
+            text, chunk_truncated = chunk_text(chunk)
+            yield text
+            # Registrato solo se il lettore chiede altro testo, cioè senza un verdetto certo
+            truncated = truncated or chunk_truncated
+        exhausted = True
+    try:
+        verdict = read_streamed_verdict(texts(), provider, started)
+        if truncated:
+            check_response('verify', None, truncated=True)
+        return verdict
+    finally:
+        stop = getattr(stream, 'cancel', None) or getattr(stream, 'close', None)
+        if stop is not None:
+            stop()
+        elif not exhausted:
+            get_telemetry().count('llm_stream_total', provider=provider, result='not_cancelled')
+
+
+def parse_contacts(text):
+    """
+    Interpreta la risposta dell'estrazione contatti.
+
+    Args:
+        text (str): Risposta testuale del modello
+
+    Returns:
+        dict: Dizionario con 'email' e 'phone', None se la risposta non è interpretabile
+    """
+    text = (text or "").strip()
+    data = load_json(text)
+    result = 'json'
+    if not isinstance(data, dict):
+        # Cerca un pattern JSON nella risposta
+        json_match = re.search(r'\{[^}]*"email"\s*:\s*[^}]*"phone"\s*:\s*[^}]*\}', text)
+        if not json_match:
+            # Prova pattern più semplice
+            json_match = re.search(r'\{[^}]*\}', text)
+        data = load_json(json_match.group(0)) if json_match else None
+        result = 'fallback'
+    if not isinstance(data, dict):
+        record_parse('extract', 'failed')
+        return None
+
+    record_parse('extract', result)
+    email = data.get('email')
+    phone = data.get('phone')
+    return {
+        'email': email if email and email not in ["null", "None"] else None,
+        'phone': phone if phone and phone not in ["null", "None"] else None
+    }
+
+
+def parse_combined(text):
+    """
+    Interpreta la risposta della chiamata combinata di verifica ed estrazione.
+
+    Args:
+        text (str): Risposta testuale del modello
+
+    Returns:
+        dict: 'is_company' (bool), 'email', 'phone' e 'confidence' (da 0 a 1),
+              None se la risposta non è interpretabile
+    """
+    text = (text or "").strip()
+    data = load_json(text)
+    result = 'json'
+    if not isinstance(data, dict):
+        json_match = re.search(r'\{.*\}', text, re.DOTALL)
+        data = load_json(json_match.group(0)) if json_match else None
+        result = 'fallback'
+
+    is_company = data.get('is_company') if isinstance(data, dict) else None
+    if isinstance(is_company, str):
+        is_company = {'SI': True, 'SÌ': True, 'TRUE': True, 'NO': False, 'FALSE': False}.get(is_company.strip().upper())
+    if not isinstance(is_company, bool):
+        record_parse('combined', 'failed')
+        return None
+
+    record_parse('combined', result)
+    try:
+        confidence = min(1.0, max(0.0, float(data.get('confidence', 1.0))))
+    except (TypeError, ValueError):
+        confidence = 1.0
+    email = data.get('email')
+    phone = data.get('phone')
+    return {
+        'is_company': is_company,
+        'email': email if email and email not in ["null", "None"] else None,
+        'phone': phone if phone and phone not in ["null", "None"] else None,
+        'confidence': confidence,
+    }
+
+
+def format_batch_results(results):
+    """
+    Prepara l'elenco numerato dei risultati da verificare.
+
+    Args:
+        results (list): Lista di dizionari con 'title', 'link' e 'snippet'
+
+    Returns:
+        str: Testo con un blocco per ogni risultato, numerato da 0
+    """
+    blocks = []
+    for index, result in enumerate(results):
+        blocks.append(
+            f"[{index}]\nTitolo: {result.get('title', 'N/D')}\nURL: {result.get('link')}\nDescrizione: {result.get('snippet', 'N/D')}"
+        )
+    return "Analizza questi risultati:\n\n" + "\n\n".join(blocks) + "\n\nQuali sono aziende vere?"
+
+
+def parse_batch_verdicts(text, count):
+    """
+    Interpreta la risposta della verifica a blocchi.
+
+    Args:
+        text (str): Risposta testuale del modello
+        count (int): Numero di risultati inviati
+
+    Returns:
+        list: Un booleano per ogni indice, None se la risposta non è valida o incompleta
+    """
+    verdicts = read_batch_verdicts(text, count)
+    if verdicts is None:
+        record_parse('verify_batch', 'failed')
+    return verdicts
+
+
+def read_batch_verdicts(text, count):
+    """Decodifica i verdetti a blocchi (vedi parse_batch_verdicts) contando JSON e regex."""
+    if not text:
+        return None
+
+    data = load_json(text.strip())
+    result = 'json'
+    if data is None:
+        json_match = re.search(r'[\[{].*[\]}]', text, re.DOTALL)
+        if not json_match:
+            return None
+        data = load_json(json_match.group(0))
+        result = 'fallback'
+        if data is None:
+            return None
+
+    if isinstance(data, dict):
+        data = data.get('risultati')
+    if not isinstance(data, list):
+        return None
+
+    verdicts = [None] * count
+    for entry in data:
+        if not isinstance(entry, dict):
+            return None
+        index = entry.get('indice')
+        verdict = entry.get('azienda')
+        if not isinstance(index, int) or not 0 <= index < count:
+            return None
+        if isinstance(verdict, str):
+            verdict = verdict.strip().upper() in ("SI", "SÌ")
+        elif not isinstance(verdict, bool):
+            return None
+        verdicts[index] = verdict
+
+    if None in verdicts:
+        return None
+    record_parse('verify_batch', result)
+    return verdicts
+
+
+class LLMProvider:
+    """
+    Logica comune ai provider LLM, indipendente dal client usato.
+
+    Cache delle risposte, estrazione locale dei contatti, ripiego dalla
+    verifica a blocchi a quella singola, modalità strict e registro dei
+    verdetti sono gli stessi per tutti i provider; ogni modulo in scrappers/
+    fornisce solo la chiamata al modello con complete(kind, messages,
+    max_tokens, schema, reader), che restituisce il testo della risposta
+    (o, in streaming, il valore di reader(stream, chunk_text, started), dove
+    chunk_text restituisce testo e troncamento di un frammento).
+    """
+
+    def __init__(self, name, model, complete, ready=None):
+        """
+        Args:
+            name (str): Nome del provider ('openai', 'gemini', 'ollama')
+            model (str): Modello usato, parte delle chiavi di cache
+            complete (callable): Chiamata al modello del provider
+            ready (callable, optional): Restituisce False se il client non è utilizzabile
+        """
+        self.name = name
+        self.model = model
+        self.complete = complete
+        self.ready = ready
+
+    def check_ready(self, strict):
+        """Controlla che il client sia utilizzabile; con strict solleva un errore se non lo è."""
+        if self.ready is None or self.ready():
+            return True
+        if strict:
+            raise RuntimeError(f"modello {self.model} non disponibile")
+        return False
+
+    def read_verdict(self, stream, chunk_text, started):
+        """Legge una verifica in streaming fino al verdetto (vedi read_verdict_stream)."""
+        return read_verdict_stream(stream, chunk_text, self.name, started)
+
+    def verify_company(self, name, url, snippet, strict=False):
+        """
+        Verifica se un risultato di ricerca corrisponde a un'azienda vera.
+
+        Args:
+            name (str): Nome del risultato
+            url (str): URL del sito
+            snippet (str): Descrizione del risultato
+            strict (bool): Se True gli errori vengono propagati invece di restituire False
+
+        Returns:
+            bool: True se è un'azienda, False altrimenti
+
+        Raises:
+            Exception: Solo con strict, se la chiamata fallisce o la risposta non è valida
+        """
+        # Import locale: cache_helper importa questo modulo
+        from helpers.cache_helper import get_llm_cache, verify_cache_key
+
+        # Verdetto già in cache?
+        llm_cache = get_llm_cache()
+        cache_key = verify_cache_key(self.name, self.model, name, url, snippet)
+        cached = llm_cache.get('verify', cache_key)
+        if cached is not None:
+            return cached
+        if not self.check_ready(strict):
+            return False
+
+        try:
+            messages = [
+                {"role": "system", "content": VERIFY_PROMPT},
+                {"role": "user", "content": format_verify_result(name, url, snippet)},
+            ]
+            options = {'max_tokens': get_max_tokens('verify', model=self.model), 'schema': get_response_schema('verify')}
+            if get_output_config()['stream_verify']:
+                # Streaming: la generazione si interrompe appena il verdetto è certo
+                verdict = self.complete('verify', messages, reader=self.read_verdict, **options)
+            else:
+                verdict = parse_verdict(self.complete('verify', messages, **options))
+            if verdict is None:
+                if strict:
+                    raise InvalidResponseError("verdetto non interpretabile")
+                return False
+            llm_cache.set('verify', cache_key, verdict)
+            log_verdict(name, url, snippet, verdict, 'verify')
+            return verdict
+        except Exception as e:
+            if strict:
+                raise
+            print(f"  ⚠ Verifica LLM fallita: {str(e)[:80]}")
+            return False
+
+    def verify_companies_batch(self, results, strict=False):
+        """
+        Verifica un'intera pagina di risultati di ricerca con una sola chiamata.
+
+        Se la risposta non è valida o incompleta, ripiega sulla verifica singola
+        di ogni risultato con verify_company.
+
+        Args:
+            results (list): Lista di dizionari con 'title', 'link' e 'snippet'
+            strict (bool): Se True gli errori della chiamata vengono propagati
+
+        Returns:
+            list: Un booleano per ogni risultato, nello stesso ordine
+        """
+        from helpers.cache_helper import get_llm_cache, verify_cache_key
+
+        if not results:
+            return []
+
+        # Usa i verdetti in cache e chiedi all'LLM solo i risultati mancanti
+        llm_cache = get_llm_cache()
+        cache_keys = [verify_cache_key(self.name, self.model, r.get('title', 'N/D'), r.get('link'), r.get('snippet', 'N/D')) for r in results]
+        cached = [llm_cache.get('verify', key) for key in cache_keys]
+        missing = [i for i, verdict in enumerate(cached) if verdict is None]
+        if not missing:
+            return cached
+        if not self.check_ready(strict):
+            return [verdict or False for verdict in cached]
+        pending = [results[i] for i in missing]
+
+        verdicts = None
+        try:
+            text = self.complete(
+                'verify_batch',
+                [
+                    {"role": "system", "content": BATCH_VERIFY_PROMPT},
+                    {"role": "user", "content": format_batch_results(pending)},
+                ],
+                max_tokens=get_max_tokens('verify_batch', len(pending), self.model),
+                schema=get_response_schema('verify_batch'),
+            )
+            verdicts = parse_batch_verdicts(text, len(pending))
+        except Exception as e:
+            if strict:
+                raise
+            print(f"  ⚠ Verifica LLM a blocchi fallita: {str(e)[:80]}")
+
+        if verdicts is None:
+            print("  ⚠ Risposta a blocchi non valida - verifica dei singoli risultati")
+            verdicts = [self.verify_company(r.get('title', 'N/D'), r.get('link'), r.get('snippet', 'N/D'), strict=strict) for r in pending]
+        else:
+            for i, verdict in zip(missing, verdicts):
+                llm_cache.set('verify', cache_keys[i], verdict)
+                log_verdict(results[i].get('title', 'N/D'), results[i].get('link'), results[i].get('snippet', 'N/D'), verdict, 'verify')
+
+        for i, verdict in zip(missing, verdicts):
+            cached[i] = verdict
+        return cached
+
+    def extract_contacts(self, html_content, url=None, strict=False):
+        """
+        Estrae email e telefono da contenuto HTML, in locale o con l'LLM.
+
+        Args:
+            html_content (str): Contenuto HTML della pagina web
+            url (str, optional): URL della pagina, usato come chiave di cache
+            strict (bool): Se True gli errori vengono propagati invece di restituire contatti vuoti
+
+        Returns:
+            dict: Dizionario con 'email' e 'phone', None se non trovati
+        """
+        from helpers.cache_helper import get_llm_cache, extract_cache_key
+
+        # Prova prima l'estrazione locale (JSON-LD, link mailto:/tel:, testo)
+        local_contacts = resolve_local_contacts(html_content)
+        if local_contacts is not None:
+            return local_contacts
+
+        if not html_content:
+            return {'email': None, 'phone': None}
+
+        # Riduci l'HTML al solo testo rilevante per i contatti
+        page_text = reduce_html(html_content)
+
+        # Contatti già estratti da questo testo?
+        llm_cache = get_llm_cache()
+        cache_key = extract_cache_key(self.name, self.model, url, page_text)
+        cached = llm_cache.get('extract', cache_key)
+        if cached is not None:
+            return cached
+        if not self.check_ready(strict):
+            return {'email': None, 'phone': None}
+
+        try:
+            text = self.complete(
+                'extract',
+                [
+                    {"role": "system", "content": EXTRACT_PROMPT},
+                    {"role": "user", "content": format_extract_text(page_text)},
+                ],
+                max_tokens=get_max_tokens('extract', model=self.model),
+                schema=get_response_schema('extract'),
+            )
+
+            contacts = parse_contacts(text)
+            if contacts is None:
+                if strict:
+                    raise InvalidResponseError("contatti non interpretabili")
+                return {'email': None, 'phone': None}
+            llm_cache.set('extract', cache_key, contacts)
+            return contacts
+        except Exception as e:
+            if strict:
+                raise
+            print(f"  ✗ Errore estrazione contatti: {str(e)[:100]}")
+            return {'email': None, 'phone': None}
+
+    def verify_and_extract(self, name, url, snippet, html_content=None, strict=False):
+        """
+        Verifica un risultato ed estrae i contatti del sito con una sola chiamata.
+
+        Il modello riceve titolo, URL, descrizione e testo ridotto della pagina
+        (già scaricata) e risponde con {is_company, email, phone, confidence}.
+        I contatti trovati in locale (JSON-LD, link mailto:/tel:) hanno la
+        precedenza su quelli del modello; se sono già completi basta la
+        verifica breve di verify_company.
+
+        Args:
+            name (str): Nome del risultato
+            url (str): URL del sito
+            snippet (str): Descrizione del risultato
+            html_content (str, optional): Contenuto HTML del sito, None se il download è fallito
+            strict (bool): Se True gli errori vengono propagati invece di restituire None
+
+        Returns:
+            dict: 'is_company', 'email', 'phone' e 'confidence', None se la chiamata fallisce
+        """
+        from helpers.cache_helper import get_llm_cache, combined_cache_key
+
+        # Contatti certi trovati in locale e testo della pagina per il modello
+        local_contacts = resolve_local_contacts(html_content) if html_content else None
+        if local_contacts is not None and local_contacts['email'] and local_contacts['phone']:
+            # Contatti già completi: basta la verifica breve del risultato di ricerca
+            return dict(local_contacts, is_company=self.verify_company(name, url, snippet, strict=strict), confidence=1.0)
+        page_text = reduce_html(html_content) if html_content else ""
+
+        # Risposta già in cache?
+        llm_cache = get_llm_cache()
+        cache_key = combined_cache_key(self.name, self.model, name, url, snippet, page_text)
+        result = llm_cache.get('combined', cache_key)
+        if result is None:
+            if not self.check_ready(strict):
+                return None
+            try:
+                text = self.complete(
+                    'combined',
+                    [
+                        {"role": "system", "content": COMBINED_PROMPT},
+                        {"role": "user", "content": format_combined_input(name, url, snippet, page_text)},
+                    ],
+                    max_tokens=get_max_tokens('combined', model=self.model),
+                    schema=get_response_schema('combined'),
+                )
+                result = parse_combined(text)
+            except Exception as e:
+                if strict:
+                    raise
+                print(f"  ⚠ Verifica ed estrazione LLM fallita: {str(e)[:80]}")
+                return None
+            if result is None:
+                if strict:
+                    raise InvalidResponseError("risposta combinata non interpretabile")
+                return None
+            llm_cache.set('combined', cache_key, result)
+            log_verdict(name, url, snippet, result['is_company'], 'combined')
+
+        if local_contacts is not None:
+            result = dict(result, email=local_contacts['email'] or result['email'], phone=local_contacts['phone'] or result['phone'])
+        return result
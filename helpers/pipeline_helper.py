@@ -0,0 +1,243 @@
+import os
+import time
+import queue
+import threading
+from helpers.telemetry_helper import get_telemetry
+
+# Marcatore di fine flusso passato tra gli stadi
+_STOP = object()
+
+
+def get_pipeline_config():
+    """
+    Legge dalle variabili d'ambiente la concorrenza di ogni stadio della pipeline.
+
+    Con PIPELINE_MODE='combined' il sito viene scaricato prima della verifica
+    e una sola chiamata LLM verifica ed estrae i contatti; i risultati con
+    affidabilità sotto COMBINED_MIN_CONFIDENCE vengono scartati.
+
+    SERP_PREFETCH indica quante pagine di risultati di ricerca possono essere
+    scaricate e non ancora completate (0 o 1 = nessun anticipo: la pagina
+    successiva viene cercata quando la corrente è completata).
+
+    Returns:
+        dict: Modalità, numero di worker per stadio, dimensione delle code, affidabilità minima
+              e pagine di ricerca scaricate in anticipo
+    """
+    return {
+        'mode': os.environ.get("PIPELINE_MODE", "separate").lower(),
+        'verify_workers': int(os.environ.get("PIPELINE_VERIFY_WORKERS", "4")),
+        'fetch_workers': int(os.environ.get("PIPELINE_FETCH_WORKERS", "8")),
+        'extract_workers': int(os.environ.get("PIPELINE_EXTRACT_WORKERS", "4")),
+        'queue_size': int(os.environ.get("PIPELINE_QUEUE_SIZE", "20")),
+        'min_confidence': float(os.environ.get("COMBINED_MIN_CONFIDENCE", "0.5")),
+        'serp_prefetch': int(os.environ.get("SERP_PREFETCH", "2")),
+    }
+
+
+class StageTimings:
+    """Durate di elaborazione di ogni elemento per stadio, raccolte da tutte le pipeline."""
+
+    def __init__(self):
+        self.durations = {}
+        self.lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self.lock:
+            self.durations.setdefault(stage, []).append(seconds)
+
+    def snapshot(self):
+        """Restituisce una copia delle durate (secondi) per stadio."""
+        with self.lock:
+            return {stage: list(values) for stage, values in self.durations.items()}
+
+    def reset(self):
+        with self.lock:
+            self.durations = {}
+
+
+# Tempi condivisi da tutte le pipeline del processo
+stage_timings = StageTimings()
+
+
+class Pipeline:
+    """
+    Pipeline a stadi eseguita su thread, con code limitate tra uno stadio e l'altro.
+
+    Ogni stadio è una tupla (nome, funzione, numero_worker). La funzione riceve
+    un elemento e restituisce l'elemento per lo stadio successivo, None per
+    scartarlo oppure una lista di elementi da inoltrare uno per uno.
+    L'ultimo stadio è tipicamente il salvataggio e usa un solo worker.
+    Se uno stadio solleva un'eccezione, l'elemento viene passato a on_error.
+    Se indicato, initializer viene chiamato all'avvio di ogni worker.
+    La durata di ogni elemento in ogni stadio viene registrata in stage_timings
+    e nella telemetria, insieme agli errori.
+    """
+
+    def __init__(self, stages, queue_size=20, on_error=None, initializer=None):
+        self.stages = stages
+        self.on_error = on_error
+        self.initializer = initializer
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self.threads = []
+        for position, (name, func, workers) in enumerate(stages):
+            stage_threads = []
+            for n in range(max(1, workers)):
+                thread = threading.Thread(
+                    target=self._worker,
+                    args=(position, func),
+                    name=f"{name}-{n}",
+                    daemon=True,
+                )
+                thread.start()
+                stage_threads.append(thread)
+            self.threads.append(stage_threads)
+
+    def _worker(self, position, func):
+        name = self.stages[position][0]
+        telemetry = get_telemetry()
+        input_queue = self.queues[position]
+        output_queue = self.queues[position + 1] if position + 1 < len(self.queues) else None
+        if self.initializer is not None:
+            self.initializer()
+        while True:
+            item = input_queue.get()
+            if item is _STOP:
+                break
+            started = time.perf_counter()
+            try:
+                result = func(item)
+            except Exception as e:
+                print(f"✗ Errore nello stadio '{name}': {e}")
+                telemetry.error(f"stage:{name}", e)
+                if self.on_error is not None:
+                    self.on_error(item)
+                result = None
+            elapsed = time.perf_counter() - started
+            stage_timings.record(name, elapsed)
+            telemetry.observe('stage_seconds', elapsed, stage=name)
+            if result is None or output_queue is None:
+                continue
+            for output in (result if isinstance(result, list) else [result]):
+                output_queue.put(output)
+
+    def submit(self, item):
+        """Inserisce un elemento nel primo stadio (blocca se la coda è piena)."""
+        self.queues[0].put(item)
+
+    def close(self):
+        """Attende che tutti gli elementi inviati abbiano attraversato ogni stadio."""
+        for position, stage_threads in enumerate(self.threads):
+            for _ in stage_threads:
+                self.queues[position].put(_STOP)
+            for thread in stage_threads:
+                thread.join()
+
+
+class PagePrefetcher:
+    """
+    Scarica in un thread separato le pagine di risultati successive, in anticipo.
+
+    Iterando si ottengono le coppie (pagina, valore) nell'ordine, dove valore
+    è il risultato di fetch(pagina). La pagina p viene scaricata solo quando
+    la pagina p - lookahead è completata (vedi advance, chiamata quando i
+    verdetti della pagina sono tutti arrivati) e can_fetch() è vero: le
+    pagine scaricate e non ancora completate non superano mai lookahead
+    (almeno 1, la pagina in elaborazione), così le condizioni di arresto
+    (resa, budget) valgono anche per le pagine in anticipo. Dopo una pagina
+    per cui has_next(valore) è falso non ne vengono chieste altre. Con
+    lookahead 0 o 1 le pagine vengono scaricate nel thread del consumatore,
+    ognuna dopo il completamento della precedente.
+    Le eccezioni di fetch vengono sollevate nel consumatore; close() ferma
+    il thread, lasciando terminare solo la richiesta già in corso.
+    """
+
+    def __init__(self, fetch, first_page, lookahead=1, can_fetch=None, has_next=bool, initializer=None):
+        self.fetch = fetch
+        self.first_page = first_page
+        self.lookahead = max(1, lookahead)
+        self.can_fetch = can_fetch or (lambda: True)
+        self.has_next = has_next
+        self.initializer = initializer
+        self.accounted = first_page - 1
+        self.cancelled = False
+        self.fetched = 0
+        self.consumed = 0
+        self.pages = queue.Queue()
+        self.condition = threading.Condition()
+        self.thread = None
+        if self.lookahead > 1:
+            self.thread = threading.Thread(target=self._produce, name="serp-prefetch", daemon=True)
+            self.thread.start()
+
+    def _produce(self):
+        if self.initializer is not None:
+            self.initializer()
+        page = self.first_page
+        try:
+            while True:
+                if not self._wait_turn(page):
+                    return
+                if not self.can_fetch():
+                    return
+                value = self.fetch(page)
+                self.fetched += 1
+                self.pages.put((page, value))
+                if not self.has_next(value):
+                    return
+                page += 1
+        except Exception as e:
+            self.pages.put(e)
+        finally:
+            self.pages.put(_STOP)
+
+    def _wait_turn(self, page):
+        """Attende che la pagina possa essere scaricata; False se il prefetch è stato fermato."""
+        with self.condition:
+            while not self.cancelled and page > self.accounted + self.lookahead:
+                self.condition.wait()
+            return not self.cancelled
+
+    def _iterate_inline(self):
+        page = self.first_page
+        while self._wait_turn(page) and self.can_fetch():
+            value = self.fetch(page)
+            self.fetched += 1
+            self.consumed += 1
+            yield page, value
+            if not self.has_next(value):
+                return
+            page += 1
+
+    def __iter__(self):
+        if self.thread is None:
+            yield from self._iterate_inline()
+            return
+        telemetry = get_telemetry()
+        while True:
+            started = time.perf_counter()
+            entry = self.pages.get()
+            telemetry.observe('serp_wait_seconds', time.perf_counter() - started)
+            if entry is _STOP:
+                return
+            if isinstance(entry, Exception):
+                raise entry
+            self.consumed += 1
+            yield entry
+
+    def advance(self, page):
+        """Segnala che la pagina è completata (tutti i risultati verificati e salvati o scartati)."""
+        with self.condition:
+            self.accounted = max(self.accounted, page)
+            self.condition.notify_all()
+
+    def close(self):
+        """Ferma il thread e conta le pagine scaricate in anticipo ma mai usate."""
+        with self.condition:
+            self.cancelled = True
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+        unused = self.fetched - self.consumed
+        if unused:
+            get_telemetry().count('serp_prefetch_unused_total', unused)
@@ -0,0 +1,78 @@
+import os
+import re
+from urllib.parse import urlsplit
+from helpers.crawler_helper import SKIPPED_EXTENSIONS
+
+# Domini che non sono siti aziendali: social, elenchi di aziende, enciclopedie,
+# giornali, marketplace, annunci di lavoro e recensioni
+NON_COMPANY_DOMAINS = (
+    'facebook.com', 'instagram.com', 'linkedin.com', 'youtube.com', 'twitter.com', 'x.com', 'tiktok.com', 'pinterest.com',
+    'paginegialle.it', 'paginebianche.it', 'kompass.com', 'europages.it', 'europages.com', 'infobel.com', 'cylex.it',
+    'prontopro.it', 'misterimprese.it', 'reteimprese.it', 'ufficiocamerale.it', 'registroimprese.it', 'atoka.io',
+    'informazione-aziende.it', 'aziende-italia.it', 'virgilio.it', 'wikipedia.org', 'treccani.it',
+    'corriere.it', 'repubblica.it', 'ilsole24ore.com', 'laprovinciadicomo.it', 'ansa.it',
+    'amazon.it', 'amazon.com', 'ebay.it', 'subito.it', 'manomano.it', 'alibaba.com',
+    'indeed.com', 'infojobs.it', 'glassdoor.it', 'tripadvisor.it', 'yelp.it', 'google.com', 'google.it',
+)
+
+# Enti pubblici e scuole
+PUBLIC_HOST_PREFIXES = ('comune.', 'regione.', 'provincia.')
+PUBLIC_HOST_SUFFIXES = ('.gov.it', '.gov', '.edu', '.edu.it')
+
+# Percorsi di pagine di elenco, ricerca o categoria
+LISTING_PATH_RE = re.compile(r'/(elenco|elenchi|categori[ae]|category|categories|tag|tags|search|cerca|ricerca|annunci|forum)(?:[/\-_.]|$)', re.IGNORECASE)
+
+
+def get_prefilter_config():
+    """
+    Legge dalle variabili d'ambiente la configurazione del filtro sugli URL.
+
+    Returns:
+        dict: Attivazione e domini da scartare (predefiniti più PREFILTER_BLOCKED_DOMAINS)
+    """
+    extra = [domain.strip().lower() for domain in os.environ.get("PREFILTER_BLOCKED_DOMAINS", "").split(",") if domain.strip()]
+    return {
+        'enabled': os.environ.get("PREFILTER", "1") == "1",
+        'blocked_domains': NON_COMPANY_DOMAINS + tuple(extra),
+    }
+
+
+def host_in(host, domains):
+    """Indica se l'host è uno dei domini o un loro sottodominio."""
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+def prefilter_reason(url, config=None):
+    """
+    Scarta in base al solo URL i risultati che non sono sicuramente aziende.
+
+    Il controllo non fa richieste di rete: serve a evitare download e
+    chiamate LLM per social, elenchi, enti pubblici, pagine di ricerca e file.
+
+    Args:
+        url (str): URL del risultato di ricerca
+        config (dict, optional): Configurazione (default da get_prefilter_config)
+
+    Returns:
+        str: Motivo dello scarto, o None se il risultato va verificato
+    """
+    if config is None:
+        config = get_prefilter_config()
+    if not config['enabled']:
+        return None
+
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    path = parts.path.lower()
+
+    if host_in(host, config['blocked_domains']):
+        return "portale o social"
+    if host.startswith(PUBLIC_HOST_PREFIXES) or host.endswith(PUBLIC_HOST_SUFFIXES):
+        return "ente pubblico"
+    if path.endswith(SKIPPED_EXTENSIONS):
+        return "file"
+    if LISTING_PATH_RE.search(path):
+        return "pagina di elenco"
+    return None
@@ -0,0 +1,233 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from helpers.budget_helper import get_budget
+from helpers.telemetry_helper import get_telemetry
+
+# Limiti predefiniti per categoria: (richieste al secondo, richieste contemporanee)
+DEFAULT_LIMITS = {
+    'host': (1.0, 2),
+    'serper': (5.0, 5),
+    'serpapi': (2.0, 2),
+    'openai': (5.0, 8),
+    'gemini': (2.0, 4),
+    'ollama': (2.0, 2),
+}
+
+# Codici HTTP che indicano di rallentare
+THROTTLE_STATUS = (429, 503)
+
+# Eccezioni dei client che indicano troppe richieste anche senza codice HTTP
+# (openai.RateLimitError, google.api_core.exceptions.ResourceExhausted/TooManyRequests)
+THROTTLE_EXCEPTIONS = ('RateLimitError', 'ResourceExhausted', 'TooManyRequests')
+
+
+def parse_limits(value):
+    """
+    Interpreta RATE_LIMITS, es. "gemini=1:2,host=0.5:1" (richieste/s : contemporanee).
+
+    Returns:
+        dict: Limiti per categoria, partendo da quelli predefiniti
+    """
+    limits = dict(DEFAULT_LIMITS)
+    for entry in (value or "").split(","):
+        if "=" not in entry:
+            continue
+        name, _, spec = entry.partition("=")
+        rate, _, in_flight = spec.partition(":")
+        default_rate, default_in_flight = limits.get(name.strip(), DEFAULT_LIMITS['host'])
+        limits[name.strip()] = (
+            float(rate) if rate else default_rate,
+            int(in_flight) if in_flight else default_in_flight,
+        )
+    return limits
+
+
+def get_status_code(error):
+    """Ricava il codice HTTP da un'eccezione di requests o di un client LLM."""
+    response = getattr(error, 'response', None)
+    for source in (response, error):
+        for attr in ('status_code', 'code'):
+            value = getattr(source, attr, None)
+            if callable(value):
+                try:
+                    value = value()
+                except Exception:
+                    value = None
+            if isinstance(value, int):
+                return value
+    return None
+
+
+def get_retry_after(error):
+    """Legge l'header Retry-After (in secondi) dalla risposta associata all'eccezione."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_throttled(error):
+    """Indica se l'eccezione è un rifiuto per troppe richieste (429/503)."""
+    status = get_status_code(error)
+    if status is not None:
+        return status in THROTTLE_STATUS
+    return any(cls.__name__ in THROTTLE_EXCEPTIONS for cls in type(error).__mro__)
+
+
+class Limiter:
+    """
+    Token bucket con limite di richieste contemporanee per una singola chiave.
+
+    Dopo un 429/503 la chiave si ferma per il tempo indicato da Retry-After
+    (o con backoff esponenziale) e la velocità si dimezza; poi risale
+    gradualmente a ogni richiesta riuscita.
+    """
+
+    def __init__(self, rate, in_flight):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.factor = 1.0
+        self.backoff_until = 0.0
+        self.failures = 0
+        self.semaphore = threading.Semaphore(max(1, in_flight))
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Attende un posto libero e un token; restituisce i secondi di attesa."""
+        # Controllo prima di occupare il posto, che altrimenti non verrebbe più liberato
+        if self.rate <= 0:
+            raise ValueError(f"velocità non valida: {self.rate} richieste/s (vedi RATE_LIMITS)")
+        start = time.monotonic()
+        self.semaphore.acquire()
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                wait = self.backoff_until - now
+                if wait <= 0:
+                    current_rate = self.rate * self.factor
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * current_rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return now - start
+                    wait = (1 - self.tokens) / current_rate
+            time.sleep(wait)
+
+    def release(self):
+        self.semaphore.release()
+
+    def penalize(self, retry_after=None):
+        """Ferma la chiave e ne dimezza la velocità dopo un 429/503."""
+        with self.lock:
+            self.failures += 1
+            delay = retry_after if retry_after is not None else min(60.0, 2.0 ** self.failures)
+            self.backoff_until = max(self.backoff_until, time.monotonic() + delay)
+            self.factor = max(0.1, self.factor / 2)
+
+    def reward(self):
+        """Recupera gradualmente la velocità dopo una richiesta riuscita."""
+        with self.lock:
+            self.failures = 0
+            self.factor = min(1.0, self.factor * 1.1)
+
+
+class Scheduler:
+    """
+    Limita le richieste verso ogni host e ogni provider esterno.
+
+    Le chiavi hanno la forma "categoria" (es. "gemini", "serper") oppure
+    "categoria:dettaglio" (es. "host:www.rossi.it"); i limiti si configurano
+    per categoria.
+    """
+
+    def __init__(self, limits, max_retries=3):
+        self.limits = limits
+        self.max_retries = max_retries
+        self.limiters = {}
+        self.throttled = {}
+        self.lock = threading.Lock()
+
+    def limiter(self, key):
+        with self.lock:
+            if key not in self.limiters:
+                category = key.split(":", 1)[0]
+                rate, in_flight = self.limits.get(category, DEFAULT_LIMITS['host'])
+                self.limiters[key] = Limiter(rate, in_flight)
+            return self.limiters[key]
+
+    def record_wait(self, key, seconds):
+        category = key.split(":", 1)[0]
+        with self.lock:
+            self.throttled[category] = self.throttled.get(category, 0.0) + seconds
+
+    @contextmanager
+    def slot(self, key):
+        """Context manager che occupa un posto per la chiave indicata."""
+        limiter = self.limiter(key)
+        self.record_wait(key, limiter.acquire())
+        try:
+            yield limiter
+        finally:
+            limiter.release()
+
+    def call(self, key, func, *args, **kwargs):
+        """
+        Esegue una chiamata rispettando i limiti della chiave.
+
+        In caso di 429/503 applica il backoff e riprova fino a max_retries volte;
+        le altre eccezioni vengono propagate subito. Ogni tentativo verso un
+        provider di ricerca o LLM viene addebitato al budget; durata ed errori
+        di ogni tentativo vanno nella telemetria.
+        """
+        category = key.split(":", 1)[0]
+        telemetry = get_telemetry()
+        attempt = 0
+        while True:
+            with self.slot(key) as limiter:
+                get_budget().record_call(category)
+                try:
+                    with telemetry.timer('call_seconds', category=category):
+                        result = func(*args, **kwargs)
+                except Exception as e:
+                    telemetry.error(category, e)
+                    if not is_throttled(e) or attempt >= self.max_retries:
+                        raise
+                    limiter.penalize(get_retry_after(e))
+                    attempt += 1
+                    continue
+                limiter.reward()
+                return result
+
+    def report(self):
+        """Stampa il tempo trascorso in attesa per ogni categoria."""
+        with self.lock:
+            throttled = sorted(self.throttled.items(), key=lambda item: -item[1])
+        waits = [f"{category} {seconds:.1f}s" for category, seconds in throttled if seconds >= 0.05]
+        print(f"Attesa per limiti di velocità: {', '.join(waits) if waits else 'nessuna'}")
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """
+    Restituisce lo scheduler condiviso da ricerche, download e chiamate LLM.
+
+    Returns:
+        Scheduler: Scheduler configurato da RATE_LIMITS e RATE_MAX_RETRIES
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler(
+                parse_limits(os.environ.get("RATE_LIMITS")),
+                max_retries=int(os.environ.get("RATE_MAX_RETRIES", "3")),
+            )
+    return _scheduler
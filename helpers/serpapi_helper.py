@@ -1,10 +1,13 @@
-# Verifica disponibilità SerpApi
-try:
-    from serpapi import GoogleSearch
-    SERPAPI_AVAILABLE = True
-except ImportError:
-    SERPAPI_AVAILABLE = False
+import requests
+from helpers.cache_helper import cached_search
+from helpers.http_helper import get_session, get_timeout
+from helpers.rate_limit_helper import get_scheduler
 
+# Endpoint REST di SerpApi
+SERPAPI_SEARCH_URL = "https://serpapi.com/search.json"
+SERPAPI_ACCOUNT_URL = "https://serpapi.com/account.json"
+
+@cached_search("serpapi")
 def search_google_serpapi(query, api_key, num=10, start=0):
     """
     Esegue una ricerca Google utilizzando SerpApi.
@@ -18,10 +21,6 @@ def search_google_serpapi(query, api_key, num=10, start=0):
     Returns:
         dict: Risultati della ricerca o None se errore
     """
-    if not SERPAPI_AVAILABLE:
-        print("ERRORE: SerpApi non è disponibile. Installalo con: pip install google-search-results")
-        return None
-
     params = {
         "engine": "google",
         "q": query,
@@ -31,12 +30,34 @@ def search_google_serpapi(query, api_key, num=10, start=0):
     }
 
     try:
-        search = GoogleSearch(params)
-        return search.get_dict()
-    except Exception as e:
+        def get():
+            response = get_session().get(SERPAPI_SEARCH_URL, params=params, timeout=get_timeout())
+            response.raise_for_status()
+            return response.json()
+
+        return get_scheduler().call("serpapi", get)
+    except requests.RequestException as e:
         print(f"Errore nella richiesta SerpApi: {e}")
         return None
 
+def check_serpapi(api_key):
+    """
+    Verifica la chiave SerpApi leggendo i dati dell'account (non consuma ricerche).
+
+    Args:
+        api_key (str): La chiave API di SerpApi
+
+    Returns:
+        str: Descrizione dell'esito
+
+    Raises:
+        Exception: Se la chiave non è valida o l'API non risponde
+    """
+    response = get_session().get(SERPAPI_ACCOUNT_URL, params={"api_key": api_key}, timeout=get_timeout())
+    response.raise_for_status()
+    account = response.json()
+    return f"chiave valida, ricerche rimaste questo mese: {account.get('plan_searches_left', 'N/D')}"
+
 def get_organic_results_serpapi(results):
     """
     Estrae i risultati organici dalla risposta di SerpApi.
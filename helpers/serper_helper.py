@@ -1,7 +1,15 @@
 import os
 import requests
 import json
+from helpers.cache_helper import cached_search
+from helpers.http_helper import get_session, get_timeout
+from helpers.rate_limit_helper import get_scheduler
 
+# Paese e lingua della ricerca
+SERPER_GL = "it"
+SERPER_HL = "it"
+
+@cached_search("serper", gl=SERPER_GL, hl=SERPER_HL)
 def search_google_serper(query, api_key, num=10, start=0):
     """
     Esegue una ricerca Google utilizzando SerperDev API.
@@ -15,12 +23,12 @@ def search_google_serper(query, api_key, num=10, start=0):
     Returns:
         dict: Risultati della ricerca o None se errore
     """
-    url = "https://google.serper.dev/search"
+    url = os.environ.get("SERPER_BASE_URL", "https://google.serper.dev").rstrip("/") + "/search"
 
     payload = json.dumps({
         "q": query,
-        "gl": "it",
-        "hl": "it",
+        "gl": SERPER_GL,
+        "hl": SERPER_HL,
         "num": num,
         "start": start
     })
@@ -31,13 +39,36 @@ def search_google_serper(query, api_key, num=10, start=0):
     }
 
     try:
-        response = requests.post(url, headers=headers, data=payload)
-        response.raise_for_status()
-        return response.json()
+        def post():
+            response = get_session().post(url, headers=headers, data=payload, timeout=get_timeout())
+            response.raise_for_status()
+            return response.json()
+
+        return get_scheduler().call("serper", post)
     except requests.RequestException as e:
         print(f"Errore nella richiesta SerperDev: {e}")
         return None
 
+def check_serper(api_key):
+    """
+    Verifica che l'API SerperDev sia raggiungibile.
+
+    SerperDev non offre una verifica gratuita della chiave: per non consumare
+    crediti viene controllato solo l'endpoint.
+
+    Args:
+        api_key (str): La chiave API di SerperDev
+
+    Returns:
+        str: Descrizione dell'esito
+
+    Raises:
+        requests.RequestException: Se l'endpoint non risponde
+    """
+    base_url = os.environ.get("SERPER_BASE_URL", "https://google.serper.dev").rstrip("/")
+    get_session().head(base_url, headers={'X-API-KEY': api_key}, timeout=get_timeout())
+    return "endpoint raggiungibile (chiave non verificata per non consumare crediti)"
+
 def get_organic_results_serper(results):
     """
     Estrae i risultati organici dalla risposta di SerperDev.
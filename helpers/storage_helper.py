@@ -0,0 +1,166 @@
+import os
+import time
+import atexit
+import sqlite3
+import threading
+from collections import namedtuple
+from helpers.dedup_helper import registrable_domain
+
+# Azienda letta dall'archivio: una tupla compatta invece di un dizionario per riga
+CompanyRecord = namedtuple('CompanyRecord', ['name', 'url', 'email', 'phone', 'sector'])
+
+
+def get_storage_backend():
+    """Restituisce il tipo di archivio delle aziende: 'sqlite' o 'excel'."""
+    backend = os.environ.get("STORAGE_BACKEND", "sqlite").lower()
+    return backend if backend in ("sqlite", "excel") else "sqlite"
+
+
+class FlushListeners:
+    """
+    Funzioni da avvisare dopo ogni scrittura su disco delle aziende.
+
+    Vengono chiamate mentre l'archivio tiene il proprio lock: tutte le
+    aziende aggiunte prima dell'avviso sono già su disco.
+    """
+
+    def __init__(self):
+        self.listeners = ()
+
+    def add(self, listener):
+        self.listeners += (listener,)
+
+    def remove(self, listener):
+        self.listeners = tuple(item for item in self.listeners if item is not listener)
+
+    def notify(self):
+        for listener in self.listeners:
+            listener()
+
+
+class CompanyStore:
+    """
+    Archivio delle aziende su SQLite (modalità WAL).
+
+    Le nuove righe vengono accumulate e scritte in un'unica transazione ogni
+    batch_size aziende; il file Excel si ottiene con un'esportazione finale.
+    Dopo ogni scrittura vengono avvisate le funzioni registrate in flushed.
+    """
+
+    def __init__(self, db_path, batch_size=50):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.buffer = []
+        self.flushed = FlushListeners()
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS companies (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT,
+                url TEXT,
+                domain TEXT,
+                email TEXT,
+                phone TEXT,
+                sector TEXT,
+                created_at REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_companies_url ON companies (url)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_companies_domain ON companies (domain)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_companies_sector ON companies (sector)")
+        self.conn.commit()
+
+    def add_company(self, company, sector):
+        """Accoda un'azienda e scrive il blocco quando è pieno."""
+        url = company.get('url')
+        row = (company.get('name'), url, registrable_domain(url) if url else None,
+               company.get('email'), company.get('phone'), sector, time.time())
+        with self.lock:
+            self.buffer.append(row)
+            if len(self.buffer) >= self.batch_size:
+                self._write_buffer()
+
+    def add_companies(self, companies):
+        """Inserisce più aziende (con chiave 'sector'), anche da un generatore; restituisce quante."""
+        added = 0
+        for company in companies:
+            self.add_company(company, company.get('sector'))
+            added += 1
+        self.flush()
+        return added
+
+    def flush(self):
+        """Scrive le aziende ancora in memoria."""
+        with self.lock:
+            self._write_buffer()
+
+    def _write_buffer(self):
+        if self.buffer:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO companies (name, url, domain, email, phone, sector, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    self.buffer
+                )
+            self.buffer = []
+        self.flushed.notify()
+
+    def update_sector(self, url, sector):
+        """Aggiorna i settori di un'azienda già salvata (trovata in più settori)."""
+        with self.lock:
+            self._write_buffer()
+            with self.conn:
+                self.conn.execute("UPDATE companies SET sector = ? WHERE url = ?", (sector, url))
+
+    def count(self):
+        """Restituisce il numero di aziende salvate."""
+        self.flush()
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM companies").fetchone()[0]
+
+    def iter_rows(self):
+        """
+        Scorre le righe (nome, url, email, telefono, settore) in ordine di inserimento.
+
+        Usa una connessione di sola lettura separata, senza caricare tutto in memoria.
+        """
+        self.flush()
+        reader = sqlite3.connect(self.db_path)
+        try:
+            yield from reader.execute("SELECT name, url, email, phone, sector FROM companies ORDER BY id")
+        finally:
+            reader.close()
+
+    def iter_companies(self):
+        """Scorre le aziende come CompanyRecord, senza caricarle tutte in memoria."""
+        return map(CompanyRecord._make, self.iter_rows())
+
+    def close(self):
+        """Scrive le righe rimanenti e chiude il database."""
+        self.flush()
+        with self.lock:
+            self.conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """
+    Restituisce l'archivio SQLite condiviso, creandolo al primo uso.
+
+    Returns:
+        CompanyStore: Archivio configurato da STORAGE_DB e STORAGE_BATCH_SIZE
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CompanyStore(
+                os.environ.get("STORAGE_DB", "lista_aziende.db"),
+                batch_size=int(os.environ.get("STORAGE_BATCH_SIZE", "50")),
+            )
+            atexit.register(_store.flush)
+    return _store
@@ -0,0 +1,267 @@
+import os
+import json
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+from helpers.cache_helper import get_cache_dir
+
+# Limiti superiori dei bucket degli istogrammi, per unità di misura
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float('inf'))
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, float('inf'))
+TOKENS_BUCKETS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float('inf'))
+
+# Istogrammi registrati e relativi bucket
+HISTOGRAMS = {
+    'stage_seconds': SECONDS_BUCKETS,
+    'call_seconds': SECONDS_BUCKETS,
+    'llm_seconds': SECONDS_BUCKETS,
+    'llm_verdict_seconds': SECONDS_BUCKETS,
+    'llm_prompt_tokens': TOKENS_BUCKETS,
+    'llm_completion_tokens': TOKENS_BUCKETS,
+    'site_bytes': BYTES_BUCKETS,
+    'site_seconds': SECONDS_BUCKETS,
+}
+
+
+def get_telemetry_config():
+    """
+    Legge dalle variabili d'ambiente la configurazione della telemetria.
+
+    Returns:
+        dict: Attivazione, file degli eventi JSON-lines e file Prometheus (None = non scritto)
+    """
+    events = os.environ.get("TELEMETRY_EVENTS")
+    return {
+        'enabled': os.environ.get("TELEMETRY", "1") == "1",
+        'events_path': os.path.join(get_cache_dir(), "telemetry.jsonl") if events is None else (events or None),
+        'prometheus_path': os.environ.get("TELEMETRY_PROMETHEUS") or None,
+    }
+
+
+class Histogram:
+    """Istogramma a bucket fissi: conteggio, somma, massimo e stima dei percentili."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[position] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, fraction):
+        """Limite superiore del bucket che contiene il percentile (massimo osservato per l'ultimo)."""
+        target = fraction * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return min(bound, self.max)
+        return self.max
+
+
+def label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def format_labels(key):
+    return ",".join(f'{name}="{value}"' for name, value in key)
+
+
+class Telemetry:
+    """
+    Metriche dell'esecuzione: istogrammi, contatori ed eventi JSON-lines.
+
+    Ogni registrazione costa un lock e poche operazioni, quindi può restare
+    attiva in produzione. Gli eventi vengono aggiunti al file con un buffer,
+    con l'identificativo dell'esecuzione in 'run'; il riepilogo e il file
+    Prometheus si producono a fine esecuzione.
+    """
+
+    def __init__(self, enabled=True, events_path=None, prometheus_path=None):
+        self.enabled = enabled
+        self.events_path = events_path
+        self.prometheus_path = prometheus_path
+        self.run_id = f"{int(time.time())}-{os.getpid()}"
+        self.histograms = {}
+        self.counters = {}
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.events = None
+        if enabled and events_path:
+            os.makedirs(os.path.dirname(os.path.abspath(events_path)), exist_ok=True)
+            self.events = open(events_path, "a", encoding="utf-8", buffering=65536)
+
+    def observe(self, name, value, **labels):
+        """Registra un valore nell'istogramma name con le etichette indicate."""
+        if not self.enabled:
+            return
+        key = (name, label_key(labels))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(HISTOGRAMS.get(name, SECONDS_BUCKETS))
+            histogram.observe(value)
+
+    def count(self, name, amount=1, **labels):
+        """Incrementa il contatore name con le etichette indicate."""
+        if not self.enabled:
+            return
+        key = (name, label_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def event(self, name, **fields):
+        """Scrive un evento strutturato nel file JSON-lines."""
+        if self.events is None:
+            return
+        line = json.dumps(dict(ts=round(time.time(), 3), run=self.run_id, event=name, **fields), ensure_ascii=False, default=str)
+        with self.lock:
+            if not self.events.closed:
+                self.events.write(line + "\n")
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Context manager che registra la durata del blocco nell'istogramma name."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def error(self, source, error):
+        """Conta un errore per origine e tipo e ne registra l'evento."""
+        error_type = type(error).__name__
+        self.count('errors_total', source=source, type=error_type)
+        self.event('error', source=source, type=error_type, message=str(error)[:200])
+
+    def llm_call(self, provider, kind, seconds, prompt_tokens=None, completion_tokens=None):
+        """Registra latenza e token di una chiamata LLM."""
+        self.observe('llm_seconds', seconds, provider=provider, kind=kind)
+        if prompt_tokens is not None:
+            self.observe('llm_prompt_tokens', prompt_tokens, provider=provider)
+            self.count('llm_tokens_total', prompt_tokens, provider=provider, type='prompt')
+        if completion_tokens is not None:
+            self.observe('llm_completion_tokens', completion_tokens, provider=provider)
+            self.count('llm_tokens_total', completion_tokens, provider=provider, type='completion')
+        self.event('llm', provider=provider, kind=kind, seconds=round(seconds, 3),
+                   prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+    def add_download(self, size):
+        """Conta i byte scaricati, anche per il sito in corso nel thread (vedi site_download)."""
+        self.count('download_bytes_total', size)
+        site = getattr(self.local, 'site', None)
+        if site is not None:
+            site['bytes'] += size
+            site['pages'] += 1
+
+    @contextmanager
+    def site_download(self, url):
+        """Raccoglie byte e pagine scaricati per un sito (home page e pagine contatti)."""
+        site = {'bytes': 0, 'pages': 0}
+        self.local.site = site
+        started = time.perf_counter()
+        try:
+            yield site
+        finally:
+            self.local.site = None
+            seconds = time.perf_counter() - started
+            self.observe('site_bytes', site['bytes'])
+            self.observe('site_seconds', seconds)
+            self.event('site', url=url, bytes=site['bytes'], pages=site['pages'], seconds=round(seconds, 3))
+
+    def report(self):
+        """Stampa il riepilogo degli istogrammi e dei contatori."""
+        if not self.enabled:
+            return
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+        print("Telemetria dell'esecuzione:")
+        print(f"  {'metrica':60s} {'n':>7s} {'media':>9s} {'p50':>9s} {'p95':>9s} {'max':>9s}")
+        for (name, key), histogram in histograms:
+            label = f"{name}{{{format_labels(key)}}}" if key else name
+            mean = histogram.sum / histogram.count if histogram.count else 0
+            values = (mean, histogram.percentile(0.5), histogram.percentile(0.95), histogram.max)
+            print(f"  {label[:60]:60s} {histogram.count:7d} " + " ".join(f"{value:9.3f}" for value in values))
+        for (name, key), value in counters:
+            label = f"{name}{{{format_labels(key)}}}" if key else name
+            print(f"  {label[:60]:60s} {value:7d}")
+
+    def write_prometheus(self, path=None):
+        """
+        Salva le metriche nel formato testuale di Prometheus.
+
+        Args:
+            path (str, optional): File di destinazione (default TELEMETRY_PROMETHEUS)
+
+        Returns:
+            str: Il file scritto, o None se non configurato
+        """
+        path = path or self.prometheus_path
+        if not self.enabled or not path:
+            return None
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+        lines = []
+        for name in sorted({name for (name, _), _ in histograms}):
+            lines.append(f"# TYPE contacts_{name} histogram")
+            for (metric, key), histogram in histograms:
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float('inf') else f"{bound:g}"
+                    labels = format_labels(key + (('le', le),))
+                    lines.append(f"contacts_{name}_bucket{{{labels}}} {cumulative}")
+                suffix = f"{{{format_labels(key)}}}" if key else ""
+                lines.append(f"contacts_{name}_sum{suffix} {histogram.sum:g}")
+                lines.append(f"contacts_{name}_count{suffix} {histogram.count}")
+        for name in sorted({name for (name, _), _ in counters}):
+            lines.append(f"# TYPE contacts_{name} counter")
+            for (metric, key), value in counters:
+                if metric == name:
+                    suffix = f"{{{format_labels(key)}}}" if key else ""
+                    lines.append(f"contacts_{name}{suffix} {value}")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as prometheus_file:
+            prometheus_file.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+        return path
+
+    def close(self):
+        """Salva gli eventi rimasti nel buffer e chiude il file."""
+        with self.lock:
+            if self.events is not None and not self.events.closed:
+                self.events.close()
+
+
+_telemetry = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry():
+    """
+    Restituisce la telemetria condivisa, creandola al primo uso.
+
+    Returns:
+        Telemetry: Telemetria configurata da TELEMETRY, TELEMETRY_EVENTS e TELEMETRY_PROMETHEUS
+    """
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is None:
+            config = get_telemetry_config()
+            _telemetry = Telemetry(config['enabled'], config['events_path'], config['prometheus_path'])
+            atexit.register(_telemetry.close)
+    return _telemetry
@@ -1,95 +1,165 @@
 # Import delle librerie necessarie
 import os
-import re
-import json
-import google.generativeai as genai
-
-# Inizializza il client Gemini
-try:
-    genai.configure(api_key=os.environ.get("GOOGLE_API_KEY"))
-    model = genai.GenerativeModel(os.environ.get("GEMINI_MODEL", 'gemini-2.5-flash'))
-except Exception as e:
-    print(f"Errore nell'inizializzazione di Gemini: {e}")
-    model = None
-
-def verify_company(name, url, snippet):
+import time
+import threading
+from helpers.llm_helper import LLMProvider, check_response
+from helpers.rate_limit_helper import get_scheduler, get_status_code
+from helpers.telemetry_helper import get_telemetry
+
+PROVIDER = "gemini"
+GEMINI_MODEL = os.environ.get("GEMINI_MODEL", 'gemini-2.5-flash')
+
+_model = None
+_model_ready = False
+_model_lock = threading.Lock()
+
+# Diventa False se l'API rifiuta lo schema della risposta
+_structured_supported = True
+
+def get_model():
     """
-    Verifica se un risultato di ricerca corrisponde a un'azienda vera usando Gemini.
+    Restituisce il modello Gemini, creandolo al primo uso.
 
-    Args:
-        name (str): Nome del risultato
-        url (str): URL del sito
-        snippet (str): Descrizione del risultato
+    La libreria google.generativeai viene importata solo qui, per non
+    rallentare l'avvio.
 
     Returns:
-        bool: True se è un'azienda, False altrimenti
+        GenerativeModel: Il modello configurato da GOOGLE_API_KEY, o None se l'inizializzazione fallisce
     """
-    if model is None:
-        return False
+    global _model, _model_ready
+    with _model_lock:
+        if not _model_ready:
+            _model_ready = True
+            try:
+                import google.generativeai as genai
+                genai.configure(api_key=os.environ.get("GOOGLE_API_KEY"))
+                _model = genai.GenerativeModel(GEMINI_MODEL)
+            except Exception as e:
+                print(f"Errore nell'inizializzazione di Gemini: {e}")
+                _model = None
+    return _model
+
+def check():
+    """
+    Verifica chiave e modello leggendo le informazioni del modello.
 
-    try:
-        verification = model.generate_content(
-            f"""Sei un assistente esperto che identifica se un risultato di ricerca corrisponde a un'azienda vera e propria.
+    Returns:
+        str: Descrizione dell'esito
+
+    Raises:
+        Exception: Se la chiave non è valida o il modello non esiste
+    """
+    if get_model() is None:
+        raise RuntimeError("inizializzazione di Gemini fallita")
+    import google.generativeai as genai
+    info = genai.get_model(f"models/{GEMINI_MODEL}")
+    return f"modello '{info.display_name or GEMINI_MODEL}' disponibile"
 
-Analizza il titolo, l'URL e la descrizione del risultato.
-Rispondi SOLO con 'SI' se è un'azienda vera, 'NO' in tutti gli altri casi.
+def to_gemini_schema(schema):
+    """
+    Adatta uno schema JSON al sottoinsieme OpenAPI accettato da Gemini.
 
-Analizza questo risultato:
+    I tipi ["string", "null"] diventano "nullable" e additionalProperties,
+    non supportato, viene rimosso.
 
-Titolo: {name}
-URL: {url}
-Descrizione: {snippet}
+    Args:
+        schema (dict): Schema JSON
 
-È un'azienda vera?"""
-        )
+    Returns:
+        dict: Schema per response_schema
+    """
+    converted = {}
+    for key, value in schema.items():
+        if key == 'additionalProperties':
+            continue
+        if key == 'type' and isinstance(value, list):
+            converted['type'] = next(t for t in value if t != 'null')
+            if 'null' in value:
+                converted['nullable'] = True
+        elif key == 'properties':
+            converted[key] = {name: to_gemini_schema(prop) for name, prop in value.items()}
+        elif key == 'items':
+            converted[key] = to_gemini_schema(value)
+        elif key == 'enum':
+            converted[key] = value
+            converted['format'] = 'enum'
+        else:
+            converted[key] = value
+    return converted
+
+def is_truncated(response):
+    """Controlla se Gemini ha interrotto la risposta per il limite di token (finish_reason MAX_TOKENS)."""
+    candidates = getattr(response, 'candidates', None) or []
+    reason = getattr(candidates[0], 'finish_reason', None) if candidates else None
+    return getattr(reason, 'name', reason) == 'MAX_TOKENS'
+
+def response_text(response):
+    """Testo della risposta, None se non ne ha (es. token esauriti durante il ragionamento)."""
+    try:
+        return response.text
+    except ValueError:
+        return None
 
-        is_company = verification.text.strip().upper()
-        return "SI" in is_company
-    except Exception as e:
-        print(f"  ⚠ Verifica LLM fallita: {str(e)[:80]}")
-        return False
+def chunk_text(chunk):
+    """Testo di un frammento dello stream (None se ne è privo) e se la generazione è stata troncata."""
+    return response_text(chunk), is_truncated(chunk)
 
-def extract_contacts(html_content):
+def complete(kind, messages, max_tokens=None, schema=None, reader=None):
     """
-    Estrae email e telefono da contenuto HTML usando Gemini.
+    Chiama Gemini tramite lo scheduler e registra latenza e token.
+
+    I messaggi vengono uniti in un unico prompt. Le risposte hanno
+    temperatura 0; con uno schema Gemini restituisce JSON conforme
+    (response_mime_type application/json). Se l'API rifiuta lo schema
+    (errore 400) la richiesta viene ripetuta senza, e da quel momento lo
+    schema resta affidato alle istruzioni del prompt.
 
     Args:
-        html_content (str): Contenuto HTML della pagina web
+        kind (str): Tipo di richiesta ('verify', 'verify_batch', 'extract' o 'combined')
+        messages (list): Messaggi della conversazione
+        max_tokens (int, optional): Token massimi della risposta
+        schema (dict, optional): Schema JSON della risposta
+        reader (callable, optional): Se indicato la risposta arriva in streaming
+            e viene letta da reader(stream, chunk_text, started) dentro lo scheduler
 
     Returns:
-        dict: Dizionario con 'email' e 'phone', None se non trovati
+        str: Il testo della risposta, o il valore restituito da reader
     """
-    if model is None or not html_content:
-        return {'email': None, 'phone': None}
-
+    global _structured_supported
+    generation_config = {'temperature': 0}
+    if max_tokens:
+        generation_config['max_output_tokens'] = max_tokens
+    if schema is not None and _structured_supported:
+        generation_config['response_mime_type'] = 'application/json'
+        generation_config['response_schema'] = to_gemini_schema(schema)
+
+    prompt = "\n\n".join(message['content'] for message in messages)
+    started = time.perf_counter()
+    generate_content = get_model().generate_content
+
+    def stream_call(*args, **kwargs):
+        sent = time.perf_counter()
+        return reader(generate_content(*args, stream=True, **kwargs), chunk_text, sent)
+    call = stream_call if reader is not None else generate_content
     try:
-        completion = model.generate_content(
-            f"""Sei un assistente esperto che estrae informazioni di contatto da pagine web HTML aziendali. Analizza l'HTML fornito, pulisci il testo rimuovendo script, stili, navigazione, footer, header e contenuti non rilevanti, poi trova l'email aziendale principale e il primo numero di telefono aziendale italiano che incontri nel testo pulito. Rispondi ESCLUSIVAMENTE con un oggetto JSON valido nel formato esatto: {{"email": "email@example.com", "phone": "+39 123 456789"}}. Se non trovi l'email, metti null. Se non trovi il telefono, metti null. Non aggiungere alcun testo, commento o spiegazione prima o dopo il JSON.
-
-Estrai email e numero di telefono (aiutandoti con i prefissi come .como.it e +39) da questo HTML di pagina web aziendale: {html_content}"""
-        )
-
-        result_data = completion.text.strip()
-
-        # Cerca un pattern JSON nella risposta
-        json_match = re.search(r'\{[^}]*"email"\s*:\s*[^}]*"phone"\s*:\s*[^}]*\}', result_data)
-        if not json_match:
-            # Prova pattern più semplice
-            json_match = re.search(r'\{[^}]*\}', result_data)
-
-        if json_match:
-            result_data = json_match.group(0)
-
-        try:
-            extracted = json.loads(result_data)
-            email = extracted.get('email')
-            phone = extracted.get('phone')
-            return {
-                'email': email if email and email not in ["null", "None"] else None,
-                'phone': phone if phone and phone not in ["null", "None"] else None
-            }
-        except json.JSONDecodeError:
-            return {'email': None, 'phone': None}
+        response = get_scheduler().call(PROVIDER, call, prompt, generation_config=generation_config)
     except Exception as e:
-        print(f"  ✗ Errore estrazione contatti: {str(e)[:100]}")
-        return {'email': None, 'phone': None}
+        if 'response_schema' not in generation_config or get_status_code(e) != 400:
+            raise
+        if _structured_supported:
+            _structured_supported = False
+            print(f"  ⚠ Output strutturato non supportato da {GEMINI_MODEL}: uso solo le istruzioni del prompt")
+        del generation_config['response_mime_type'], generation_config['response_schema']
+        response = get_scheduler().call(PROVIDER, call, prompt, generation_config=generation_config)
+    usage = getattr(response, 'usage_metadata', None)
+    get_telemetry().llm_call(PROVIDER, kind, time.perf_counter() - started,
+                             getattr(usage, 'prompt_token_count', None), getattr(usage, 'candidates_token_count', None))
+    if reader is not None:
+        return response
+    return check_response(kind, response_text(response), is_truncated(response))
+
+_llm = LLMProvider(PROVIDER, GEMINI_MODEL, complete, ready=lambda: get_model() is not None)
+verify_company = _llm.verify_company
+verify_companies_batch = _llm.verify_companies_batch
+extract_contacts = _llm.extract_contacts
+verify_and_extract = _llm.verify_and_extract
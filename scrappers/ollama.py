@@ -1,96 +1,117 @@
 # Import delle librerie necessarie
 import os
-import re
-import json
-from ollama import Client
+import time
+import threading
+from helpers.llm_helper import LLMProvider, check_response
+from helpers.rate_limit_helper import get_scheduler, get_status_code
+from helpers.telemetry_helper import get_telemetry
 
 # Configurazione Ollama
+PROVIDER = "ollama"
 OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "llama3.2")
 OLLAMA_API_KEY = os.environ.get("OLLAMA_API_KEY")
 
-# Inizializza il client Ollama
-if OLLAMA_BASE_URL == "http://localhost:11434" and not OLLAMA_API_KEY:
-    client = Client()
-else:
-    headers = {}
-    if OLLAMA_API_KEY:
-        headers['Authorization'] = f'Bearer {OLLAMA_API_KEY}'
-    client = Client(host=OLLAMA_BASE_URL, headers=headers)
+_client = None
+_client_lock = threading.Lock()
 
-def verify_company(name, url, snippet):
+# Diventa False se il server rifiuta gli schemi in format (Ollama precedente alla 0.5)
+_structured_supported = True
+
+def get_client():
     """
-    Verifica se un risultato di ricerca corrisponde a un'azienda vera usando Ollama.
+    Restituisce il client Ollama, creandolo al primo uso.
 
-    Args:
-        name (str): Nome del risultato
-        url (str): URL del sito
-        snippet (str): Descrizione del risultato
+    La libreria ollama viene importata solo qui, per non rallentare l'avvio.
 
     Returns:
-        bool: True se è un'azienda, False altrimenti
+        Client: Il client configurato da OLLAMA_BASE_URL e OLLAMA_API_KEY
     """
-    try:
-        prompt = f"""Sei un assistente esperto che identifica se un risultato di ricerca corrisponde a un'azienda vera e propria.
-
-Analizza il titolo, l'URL e la descrizione del risultato.
-Rispondi SOLO con 'SI' se è un'azienda vera, 'NO' in tutti gli altri casi.
+    global _client
+    with _client_lock:
+        if _client is None:
+            from ollama import Client
+            if OLLAMA_BASE_URL == "http://localhost:11434" and not OLLAMA_API_KEY:
+                _client = Client()
+            else:
+                headers = {}
+                if OLLAMA_API_KEY:
+                    headers['Authorization'] = f'Bearer {OLLAMA_API_KEY}'
+                _client = Client(host=OLLAMA_BASE_URL, headers=headers)
+    return _client
+
+def check():
+    """
+    Verifica che il server Ollama risponda e che il modello sia installato.
 
-Analizza questo risultato:
+    Returns:
+        str: Descrizione dell'esito
 
-Titolo: {name}
-URL: {url}
-Descrizione: {snippet}
+    Raises:
+        Exception: Se il server non risponde o il modello non esiste
+    """
+    get_client().show(OLLAMA_MODEL)
+    return f"modello '{OLLAMA_MODEL}' disponibile su {OLLAMA_BASE_URL}"
 
-È un'azienda vera?"""
-        messages = [{'role': 'user', 'content': prompt}]
-        result = client.chat(model=OLLAMA_MODEL, messages=messages, stream=False)
-        is_company = result['message']['content'].strip().upper()
-        return "SI" in is_company
-    except Exception as e:
-        print(f"  ⚠ Verifica LLM fallita: {str(e)[:80]}")
-        return False
+def chunk_text(part):
+    """Testo di un frammento dello stream e se la generazione è stata troncata (done_reason 'length')."""
+    return part['message']['content'], part.get('done_reason') == 'length'
 
-def extract_contacts(html_content):
+def complete(kind, messages, max_tokens=None, schema=None, reader=None):
     """
-    Estrae email e telefono da contenuto HTML usando Ollama.
+    Chiama l'API chat di Ollama tramite lo scheduler e registra latenza e token.
+
+    Le risposte hanno temperatura 0; con uno schema Ollama vincola l'output
+    al JSON conforme tramite format. Se il server o la libreria non
+    accettano lo schema (errore 400 o di validazione) la richiesta viene
+    ripetuta con format="json".
 
     Args:
-        html_content (str): Contenuto HTML della pagina web
+        kind (str): Tipo di richiesta ('verify', 'verify_batch', 'extract' o 'combined')
+        messages (list): Messaggi della conversazione
+        max_tokens (int, optional): Token massimi della risposta
+        schema (dict, optional): Schema JSON della risposta
+        reader (callable, optional): Se indicato la risposta arriva in streaming
+            e viene letta da reader(stream, chunk_text, started) dentro lo scheduler
 
     Returns:
-        dict: Dizionario con 'email' e 'phone', None se non trovati
+        str: Il testo della risposta, o il valore restituito da reader
     """
-    if not html_content:
-        return {'email': None, 'phone': None}
-
+    global _structured_supported
+    options = {'temperature': 0}
+    if max_tokens:
+        options['num_predict'] = max_tokens
+    response_format = ''
+    if schema is not None:
+        response_format = schema if _structured_supported else 'json'
+
+    started = time.perf_counter()
+    client = get_client()
+
+    def stream_call(**kwargs):
+        sent = time.perf_counter()
+        return reader(client.chat(**dict(kwargs, stream=True)), chunk_text, sent)
+    call = stream_call if reader is not None else client.chat
     try:
-        prompt = f"""Sei un assistente esperto che estrae informazioni di contatto da pagine web HTML aziendali. Analizza l'HTML fornito, pulisci il testo rimuovendo script, stili, navigazione, footer, header e contenuti non rilevanti, poi trova l'email aziendale principale e il primo numero di telefono aziendale italiano che incontri nel testo pulito. Rispondi ESCLUSIVAMENTE con un oggetto JSON valido nel formato esatto: {{"email": "email@example.com", "phone": "+39 123 456789"}}. Se non trovi l'email, metti null. Se non trovi il telefono, metti null. Non aggiungere alcun testo, commento o spiegazione prima o dopo il JSON.
-
-Estrai email e numero di telefono (aiutandoti con i prefissi come .como.it e +39) da questo HTML di pagina web aziendale: {html_content}"""
-        messages = [{'role': 'user', 'content': prompt}]
-        result = client.chat(model=OLLAMA_MODEL, messages=messages, stream=False)
-        result_data = result['message']['content'].strip()
-
-        # Cerca un pattern JSON nella risposta
-        json_match = re.search(r'\{[^}]*"email"\s*:\s*[^}]*"phone"\s*:\s*[^}]*\}', result_data)
-        if not json_match:
-            # Prova pattern più semplice
-            json_match = re.search(r'\{[^}]*\}', result_data)
-
-        if json_match:
-            result_data = json_match.group(0)
-
-        try:
-            extracted = json.loads(result_data)
-            email = extracted.get('email')
-            phone = extracted.get('phone')
-            return {
-                'email': email if email and email not in ["null", "None"] else None,
-                'phone': phone if phone and phone not in ["null", "None"] else None
-            }
-        except json.JSONDecodeError:
-            return {'email': None, 'phone': None}
+        result = get_scheduler().call(PROVIDER, call, model=OLLAMA_MODEL, messages=messages, stream=False,
+                                      format=response_format, options=options)
     except Exception as e:
-        print(f"  ✗ Errore estrazione contatti: {str(e)[:100]}")
-        return {'email': None, 'phone': None}
\ No newline at end of file
+        if not isinstance(response_format, dict) or not (get_status_code(e) == 400 or isinstance(e, ValueError)):
+            raise
+        if _structured_supported:
+            _structured_supported = False
+            print("  ⚠ Schema JSON non supportato da Ollama: uso format=\"json\"")
+        result = get_scheduler().call(PROVIDER, call, model=OLLAMA_MODEL, messages=messages, stream=False,
+                                      format='json', options=options)
+    if reader is not None:
+        get_telemetry().llm_call(PROVIDER, kind, time.perf_counter() - started, None, None)
+        return result
+    get_telemetry().llm_call(PROVIDER, kind, time.perf_counter() - started,
+                             result.get('prompt_eval_count'), result.get('eval_count'))
+    return check_response(kind, result['message']['content'], result.get('done_reason') == 'length')
+
+_llm = LLMProvider(PROVIDER, OLLAMA_MODEL, complete)
+verify_company = _llm.verify_company
+verify_companies_batch = _llm.verify_companies_batch
+extract_contacts = _llm.extract_contacts
+verify_and_extract = _llm.verify_and_extract
@@ -1,88 +1,115 @@
 # Import delle librerie necessarie
 import os
-import re
-import json
+import time
+import threading
+from helpers.llm_helper import LLMProvider, check_response
+from helpers.rate_limit_helper import get_scheduler, get_status_code
+from helpers.telemetry_helper import get_telemetry
 
-# Inizializza il client OpenAI
-from openai import OpenAI
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY", 'llamacpp'), base_url=os.environ.get("OPENAI_BASE_URL", 'https://models.ai.duckpage.net/v1'))
+PROVIDER = "openai"
+OPENAI_MODEL = os.environ.get("OPENAI_MODEL", "DuckAi-General")
 
-def verify_company(name, url, snippet):
+_client = None
+_client_lock = threading.Lock()
+
+# Diventa False se il server rifiuta response_format (vecchi server compatibili OpenAI)
+_structured_supported = True
+
+def get_client():
     """
-    Verifica se un risultato di ricerca corrisponde a un'azienda vera usando OpenAI.
+    Restituisce il client OpenAI, creandolo al primo uso.
 
-    Args:
-        name (str): Nome del risultato
-        url (str): URL del sito
-        snippet (str): Descrizione del risultato
+    La libreria openai viene importata solo qui, per non rallentare l'avvio.
 
     Returns:
-        bool: True se è un'azienda, False altrimenti
+        OpenAI: Il client configurato da OPENAI_API_KEY e OPENAI_BASE_URL
     """
-    if client is None:
-        return False
+    global _client
+    with _client_lock:
+        if _client is None:
+            from openai import OpenAI
+            _client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY", 'llamacpp'), base_url=os.environ.get("OPENAI_BASE_URL", 'https://models.ai.duckpage.net/v1'))
+    return _client
 
-    try:
-        verification = client.chat.completions.create(
-            model=os.environ.get("OPENAI_MODEL", "DuckAi-General"),
-            messages=[
-                {"role": "system", "content": """Sei un assistente esperto che identifica se un risultato di ricerca corrisponde a un'azienda vera e propria.
-
-Analizza il titolo, l'URL e la descrizione del risultato.
-Rispondi SOLO con 'SI' se è un'azienda vera, 'NO' in tutti gli altri casi."""},
-                {"role": "user", "content": f"Analizza questo risultato:\n\nTitolo: {name}\nURL: {url}\nDescrizione: {snippet}\n\nÈ un'azienda vera?"},
-            ]
-        )
-
-        is_company = verification.choices[0].message.content.strip().upper()
-        return "SI" in is_company
-    except Exception as e:
-        print(f"  ⚠ Verifica LLM fallita: {str(e)[:80]}")
-        return False
+def check():
+    """
+    Verifica credenziali e endpoint elencando i modelli disponibili.
+
+    Returns:
+        str: Descrizione dell'esito
+
+    Raises:
+        Exception: Se l'endpoint non risponde o la chiave non è valida
+    """
+    models = [model.id for model in get_client().models.list()]
+    if models and OPENAI_MODEL not in models:
+        return f"endpoint raggiungibile, ma il modello '{OPENAI_MODEL}' non è tra i {len(models)} disponibili"
+    return f"modello '{OPENAI_MODEL}' disponibile"
+
+def chunk_text(chunk):
+    """Testo di un frammento dello stream e se la generazione è stata troncata (finish_reason 'length')."""
+    if not chunk.choices:
+        return None, False
+    choice = chunk.choices[0]
+    return choice.delta.content, choice.finish_reason == 'length'
 
-def extract_contacts(html_content):
+def complete(kind, messages, max_tokens=None, schema=None, reader=None):
     """
-    Estrae email e telefono da contenuto HTML usando OpenAI.
+    Chiama l'API chat di OpenAI tramite lo scheduler e registra latenza e token.
+
+    Le risposte hanno temperatura 0; con uno schema il server restituisce
+    JSON conforme tramite response_format. Se il server non lo supporta
+    (errore 400) la richiesta viene ripetuta senza, e da quel momento lo
+    schema resta affidato alle istruzioni del prompt.
 
     Args:
-        html_content (str): Contenuto HTML della pagina web
+        kind (str): Tipo di richiesta ('verify', 'verify_batch', 'extract' o 'combined')
+        messages (list): Messaggi della conversazione
+        max_tokens (int, optional): Token massimi della risposta
+        schema (dict, optional): Schema JSON della risposta
+        reader (callable, optional): Se indicato la risposta arriva in streaming
+            e viene letta da reader(stream, chunk_text, started) dentro lo scheduler
 
     Returns:
-        dict: Dizionario con 'email' e 'phone', None se non trovati
+        str: Il testo della risposta, o il valore restituito da reader
     """
-    if client is None or not html_content:
-        return {'email': None, 'phone': None}
+    global _structured_supported
+    options = {'temperature': 0}
+    if max_tokens:
+        options['max_tokens'] = max_tokens
+    if schema is not None and _structured_supported:
+        options['response_format'] = {
+            "type": "json_schema",
+            "json_schema": {"name": f"risposta_{kind}", "schema": schema, "strict": True},
+        }
+
+    started = time.perf_counter()
+    create = get_client().chat.completions.create
 
+    def stream_call(**kwargs):
+        sent = time.perf_counter()
+        return reader(create(stream=True, **kwargs), chunk_text, sent)
+    call = stream_call if reader is not None else create
     try:
-        completion = client.chat.completions.create(
-            model=os.environ.get("OPENAI_MODEL", "DuckAi-General"),
-            messages=[
-                {"role": "system", "content": "Sei un assistente esperto che estrae informazioni di contatto da pagine web HTML aziendali. Analizza l'HTML fornito, pulisci il testo rimuovendo script, stili, navigazione, footer, header e contenuti non rilevanti, poi trova l'email aziendale principale e il primo numero di telefono aziendale italiano che incontri nel testo pulito. Rispondi ESCLUSIVAMENTE con un oggetto JSON valido nel formato esatto: {\"email\": \"email@example.com\", \"phone\": \"+39 123 456789\"}. Se non trovi l'email, metti null. Se non trovi il telefono, metti null. Non aggiungere alcun testo, commento o spiegazione prima o dopo il JSON."},
-                {"role": "user", "content": f"Estrai email e numero di telefono (aiutandoti con i prefissi come .como.it e +39) da questo HTML di pagina web aziendale: {html_content}"},
-            ]
-        )
-
-        result_data = completion.choices[0].message.content.strip()
-
-        # Cerca un pattern JSON nella risposta
-        json_match = re.search(r'\{[^}]*"email"\s*:\s*[^}]*"phone"\s*:\s*[^}]*\}', result_data)
-        if not json_match:
-            # Prova pattern più semplice
-            json_match = re.search(r'\{[^}]*\}', result_data)
-
-        if json_match:
-            result_data = json_match.group(0)
-
-        try:
-            extracted = json.loads(result_data)
-            email = extracted.get('email')
-            phone = extracted.get('phone')
-            return {
-                'email': email if email and email not in ["null", "None"] else None,
-                'phone': phone if phone and phone not in ["null", "None"] else None
-            }
-        except json.JSONDecodeError:
-            return {'email': None, 'phone': None}
+        completion = get_scheduler().call(PROVIDER, call, model=OPENAI_MODEL, messages=messages, **options)
     except Exception as e:
-        print(f"  ✗ Errore estrazione contatti: {str(e)[:100]}")
-        return {'email': None, 'phone': None}
+        if 'response_format' not in options or get_status_code(e) != 400:
+            raise
+        if _structured_supported:
+            _structured_supported = False
+            print(f"  ⚠ Output strutturato non supportato da {OPENAI_MODEL}: uso solo le istruzioni del prompt")
+        del options['response_format']
+        completion = get_scheduler().call(PROVIDER, call, model=OPENAI_MODEL, messages=messages, **options)
+    usage = getattr(completion, 'usage', None)
+    get_telemetry().llm_call(PROVIDER, kind, time.perf_counter() - started,
+                             getattr(usage, 'prompt_tokens', None), getattr(usage, 'completion_tokens', None))
+    if reader is not None:
+        return completion
+    choice = completion.choices[0]
+    return check_response(kind, choice.message.content, choice.finish_reason == 'length')
+
+_llm = LLMProvider(PROVIDER, OPENAI_MODEL, complete)
+verify_company = _llm.verify_company
+verify_companies_batch = _llm.verify_companies_batch
+extract_contacts = _llm.extract_contacts
+verify_and_extract = _llm.verify_and_extract
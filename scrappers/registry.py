@@ -0,0 +1,195 @@
+import os
+import importlib
+from importlib.util import find_spec
+from concurrent.futures import ThreadPoolExecutor
+
+# Provider LLM: modulo, libreria richiesta, variabili obbligatorie e modello (variabile, default)
+LLM_PROVIDERS = {
+    'openai': {
+        'label': 'OpenAI',
+        'module': 'scrappers.openai',
+        'library': 'openai',
+        'required_env': (),
+        'model_env': ('OPENAI_MODEL', 'DuckAi-General'),
+    },
+    'gemini': {
+        'label': 'Gemini',
+        'module': 'scrappers.gemini',
+        'library': 'google.generativeai',
+        'required_env': ('GOOGLE_API_KEY',),
+        'model_env': ('GEMINI_MODEL', 'gemini-2.5-flash'),
+    },
+    'ollama': {
+        'label': 'Ollama',
+        'module': 'scrappers.ollama',
+        'library': 'ollama',
+        'required_env': (),
+        'model_env': ('OLLAMA_MODEL', 'llama3.2'),
+    },
+}
+
+# Router con failover su più provider LLM (vedi scrappers/router.py)
+ROUTER = 'router'
+ROUTER_MODULE = 'scrappers.router'
+
+# Provider di ricerca: modulo, libreria richiesta, funzioni e variabile della chiave API
+SEARCH_PROVIDERS = {
+    'serpapi': {
+        'label': 'SerpApi',
+        'module': 'helpers.serpapi_helper',
+        'library': None,
+        'search': 'search_google_serpapi',
+        'organic': 'get_organic_results_serpapi',
+        'check': 'check_serpapi',
+        'api_key_env': 'SERPAPI_API_KEY',
+    },
+    'serper': {
+        'label': 'SerperDev',
+        'module': 'helpers.serper_helper',
+        'library': None,
+        'search': 'search_google_serper',
+        'organic': 'get_organic_results_serper',
+        'check': 'check_serper',
+        'api_key_env': 'SERPER_API_KEY',
+    },
+}
+
+
+def library_available(name):
+    """Controlla se una libreria è installata, senza importarla."""
+    try:
+        return find_spec(name) is not None
+    except ModuleNotFoundError:
+        # Manca il pacchetto padre (es. 'google' per 'google.generativeai')
+        return False
+
+
+def get_model_name(name):
+    """Restituisce il modello configurato per un provider LLM."""
+    env_name, default = LLM_PROVIDERS[name]['model_env']
+    return os.environ.get(env_name, default)
+
+
+def configuration_problems(kind, name):
+    """
+    Controlla la configurazione di un provider senza importare librerie pesanti.
+
+    Args:
+        kind (str): 'llm' o 'search'
+        name (str): Nome del provider
+
+    Returns:
+        list: Problemi trovati (vuota se la configurazione è completa)
+    """
+    spec = (LLM_PROVIDERS if kind == 'llm' else SEARCH_PROVIDERS)[name]
+    problems = []
+    if spec['library'] and not library_available(spec['library']):
+        problems.append(f"libreria '{spec['library']}' non installata")
+    required = spec['required_env'] if kind == 'llm' else (spec['api_key_env'],)
+    for env_name in required:
+        if not os.environ.get(env_name):
+            problems.append(f"{env_name} non configurata")
+    return problems
+
+
+def get_llm_provider(name):
+    """
+    Importa il modulo di un provider LLM; il client viene creato al primo uso.
+
+    Args:
+        name (str): 'openai', 'gemini', 'ollama' o 'router' (failover tra i provider di LLM_ROUTER)
+
+    Returns:
+        module: Modulo con verify_company, verify_companies_batch ed extract_contacts
+
+    Raises:
+        ValueError: Se il provider non esiste
+    """
+    if name == ROUTER:
+        return importlib.import_module(ROUTER_MODULE)
+    if name not in LLM_PROVIDERS:
+        raise ValueError(f"Provider LLM non valido: {name}. Usa {', '.join(repr(n) for n in (*LLM_PROVIDERS, ROUTER))}.")
+    return importlib.import_module(LLM_PROVIDERS[name]['module'])
+
+
+def get_search_provider(name):
+    """
+    Restituisce funzioni e impostazioni di un provider di ricerca.
+
+    Args:
+        name (str): 'serpapi' o 'serper'
+
+    Returns:
+        dict: 'search', 'organic', 'check' (funzioni), 'api_key_env' e 'label'
+
+    Raises:
+        ValueError: Se il provider non esiste
+    """
+    if name not in SEARCH_PROVIDERS:
+        raise ValueError(f"Provider di ricerca non valido: {name}. Usa {', '.join(repr(n) for n in SEARCH_PROVIDERS)}.")
+    spec = SEARCH_PROVIDERS[name]
+    module = importlib.import_module(spec['module'])
+    return {
+        'search': getattr(module, spec['search']),
+        'organic': getattr(module, spec['organic']),
+        'check': getattr(module, spec['check']),
+        'api_key_env': spec['api_key_env'],
+        'label': spec['label'],
+    }
+
+
+def check_provider(kind, name):
+    """
+    Verifica credenziali ed endpoint di un provider con una chiamata leggera.
+
+    Returns:
+        tuple: (esito, descrizione)
+    """
+    problems = configuration_problems(kind, name)
+    if problems:
+        return False, "; ".join(problems)
+    try:
+        if kind == 'llm':
+            return True, get_llm_provider(name).check()
+        provider = get_search_provider(name)
+        return True, provider['check'](os.environ.get(provider['api_key_env']))
+    except Exception as e:
+        return False, str(e)[:150]
+
+
+def run_checks(llm_provider=None, search_provider=None):
+    """
+    Verifica in parallelo tutti i provider e stampa l'esito.
+
+    Args:
+        llm_provider (str, optional): Provider LLM in uso
+        search_provider (str, optional): Provider di ricerca in uso
+
+    Returns:
+        bool: True se i provider in uso funzionano
+    """
+    checks = [('llm', name) for name in LLM_PROVIDERS] + [('search', name) for name in SEARCH_PROVIDERS]
+    with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+        results = list(executor.map(lambda check: check_provider(*check), checks))
+
+    # Con il router basta che risponda almeno un provider del gruppo
+    in_use = {('llm', llm_provider), ('search', search_provider)}
+    router_pool = set()
+    all_ok = True
+    if llm_provider == ROUTER:
+        try:
+            router_pool = {name for name, _ in importlib.import_module(ROUTER_MODULE).get_router_config()['pool']}
+        except ValueError as e:
+            print(f"✗ Router LLM: {e}")
+            all_ok = False
+        in_use |= {('llm', name) for name in router_pool}
+
+    for (kind, name), (ok, message) in zip(checks, results):
+        spec = (LLM_PROVIDERS if kind == 'llm' else SEARCH_PROVIDERS)[name]
+        used = (kind, name) in in_use
+        if used and not ok and name not in router_pool:
+            all_ok = False
+        print(f"{'✓' if ok else '✗'} {spec['label']:10s}{' (in uso)' if used else '         '}  {message}")
+    if router_pool and not any(ok for (kind, name), (ok, _) in zip(checks, results) if kind == 'llm' and name in router_pool):
+        all_ok = False
+    return all_ok
@@ -0,0 +1,371 @@
+import os
+import time
+import random
+import threading
+from helpers.contacts_helper import resolve_local_contacts
+from helpers.telemetry_helper import get_telemetry
+from scrappers.registry import LLM_PROVIDERS, get_llm_provider, get_model_name, configuration_problems, check_provider
+
+PROVIDER = "router"
+
+# Latenza presunta (secondi) di un provider non ancora misurato
+DEFAULT_LATENCY = 1.0
+
+# Quanto pesa il tasso di errore nel costo atteso di un provider
+ERROR_PENALTY = 4.0
+
+# Attesa massima del breaker dopo prove fallite ripetute (secondi)
+MAX_COOLDOWN = 600.0
+
+
+def parse_pool(value):
+    """
+    Interpreta LLM_ROUTER, es. "openai:3,ollama:1" (provider:peso).
+
+    Senza valore usa, con peso 1, tutti i provider configurati.
+
+    Returns:
+        list: Coppie (provider, peso) nell'ordine indicato
+
+    Raises:
+        ValueError: Se un provider non esiste, un peso non è positivo o il gruppo è vuoto
+    """
+    if not (value or "").strip():
+        pool = [(name, 1.0) for name in LLM_PROVIDERS if not configuration_problems('llm', name)]
+    else:
+        pool = []
+        for entry in value.split(","):
+            name, _, weight = entry.partition(":")
+            name = name.strip().lower()
+            if not name:
+                continue
+            if name not in LLM_PROVIDERS:
+                raise ValueError(f"Provider LLM non valido in LLM_ROUTER: {name}. Usa {', '.join(repr(n) for n in LLM_PROVIDERS)}.")
+            weight = float(weight) if weight.strip() else 1.0
+            if weight <= 0:
+                raise ValueError(f"Peso non valido in LLM_ROUTER per {name}: deve essere positivo.")
+            pool.append((name, weight))
+    if not pool:
+        raise ValueError("Nessun provider per il router: configura LLM_ROUTER, es. \"openai:3,ollama:1\".")
+    return pool
+
+
+def get_router_config():
+    """
+    Legge dalle variabili d'ambiente la configurazione del router LLM.
+
+    Returns:
+        dict: Gruppo di provider con i pesi, parametri della media mobile e del circuit breaker
+    """
+    return {
+        'pool': parse_pool(os.environ.get("LLM_ROUTER")),
+        'alpha': float(os.environ.get("LLM_ROUTER_EWMA_ALPHA", "0.2")),
+        'breaker_failures': int(os.environ.get("LLM_ROUTER_BREAKER_FAILURES", "3")),
+        'breaker_cooldown': float(os.environ.get("LLM_ROUTER_BREAKER_COOLDOWN", "30")),
+        'max_attempts': int(os.environ.get("LLM_ROUTER_MAX_ATTEMPTS", "0")),
+        'max_wait': float(os.environ.get("LLM_ROUTER_MAX_WAIT", "60")),
+        'explore': float(os.environ.get("LLM_ROUTER_EXPLORE", "0.05")),
+    }
+
+
+class ProviderState:
+    """
+    Stato di un provider nel router: latenza e tasso di errore medi e circuit breaker.
+
+    Latenza ed errori sono medie mobili esponenziali (EWMA). Dopo
+    breaker_failures errori consecutivi il breaker si apre e il provider
+    non riceve richieste per il tempo di attesa; poi passa una sola
+    richiesta di prova (semi-aperto): se riesce il breaker si chiude,
+    altrimenti si riapre con attesa doppia.
+    """
+
+    def __init__(self, name, module, weight, alpha, breaker_failures, breaker_cooldown):
+        self.name = name
+        self.module = module
+        self.weight = weight
+        self.alpha = alpha
+        self.breaker_failures = max(1, breaker_failures)
+        self.base_cooldown = breaker_cooldown
+        self.cooldown = breaker_cooldown
+        self.latency = None
+        self.error_rate = 0.0
+        self.in_flight = 0
+        self.failures = 0
+        self.open_until = 0.0
+        self.probing = False
+        self.calls = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def state(self, now):
+        """'closed', 'open' o 'half_open'."""
+        if self.failures < self.breaker_failures:
+            return 'closed'
+        return 'open' if now < self.open_until else 'half_open'
+
+    def score(self):
+        """Costo atteso di una richiesta: latenza media per richieste in corso e errori, diviso il peso."""
+        latency = self.latency if self.latency is not None else DEFAULT_LATENCY
+        return latency * (1 + self.in_flight) * (1 + ERROR_PENALTY * self.error_rate) / self.weight
+
+    def try_acquire(self, now):
+        """Prenota una richiesta se il breaker lo consente; in semi-aperto passa una sola prova."""
+        with self.lock:
+            state = self.state(now)
+            if state == 'open' or (state == 'half_open' and self.probing):
+                return False
+            if state == 'half_open':
+                self.probing = True
+            self.in_flight += 1
+            return True
+
+    def record(self, success, seconds):
+        """
+        Aggiorna medie e breaker con l'esito di una richiesta.
+
+        Returns:
+            str: Nuovo stato del breaker se è cambiato ('open' o 'closed'), altrimenti None
+        """
+        with self.lock:
+            self.in_flight -= 1
+            self.calls += 1
+            self.error_rate += self.alpha * ((0.0 if success else 1.0) - self.error_rate)
+            was_probing = self.probing
+            self.probing = False
+            if success:
+                self.latency = seconds if self.latency is None else self.latency + self.alpha * (seconds - self.latency)
+                changed = self.failures >= self.breaker_failures
+                self.failures = 0
+                self.cooldown = self.base_cooldown
+                return 'closed' if changed else None
+            self.errors += 1
+            self.failures += 1
+            if was_probing:
+                self.cooldown = min(MAX_COOLDOWN, self.cooldown * 2)
+            if was_probing or self.failures == self.breaker_failures:
+                self.open_until = time.monotonic() + self.cooldown
+                return 'open'
+            return None
+
+
+class Router:
+    """
+    Distribuisce le chiamate LLM su un gruppo di provider con failover.
+
+    Ogni chiamata va al provider con il breaker chiuso e il costo atteso
+    più basso (latenza media per richieste in corso, penalizzata dagli
+    errori, diviso il peso): il più veloce riceve il traffico finché le
+    richieste in corso non lo rendono più costoso di un altro. Una piccola
+    quota (explore) va a caso a un altro provider, per tenerne aggiornata
+    la latenza. Se la chiamata fallisce viene ripetuta su un
+    altro provider invece di perdere il risultato. I provider sono chiamati in
+    modalità strict, così gli errori arrivano al router.
+    """
+
+    def __init__(self, config):
+        self.providers = [
+            ProviderState(name, get_llm_provider(name), weight, config['alpha'],
+                          config['breaker_failures'], config['breaker_cooldown'])
+            for name, weight in config['pool']
+        ]
+        self.max_attempts = config['max_attempts'] or len(self.providers)
+        self.max_wait = config['max_wait']
+        self.explore = config['explore']
+
+    def describe(self):
+        """Descrizione del gruppo di provider, es. "OpenAI (gpt-4o-mini, peso 3)"."""
+        return ", ".join(f"{LLM_PROVIDERS[p.name]['label']} ({get_model_name(p.name)}, peso {p.weight:g})" for p in self.providers)
+
+    def acquire(self, tried):
+        """
+        Sceglie e prenota il provider più conveniente tra quelli non ancora provati.
+
+        Se tutti hanno il breaker aperto attende la prima riapertura, fino a
+        max_wait secondi, invece di scartare il risultato.
+
+        Returns:
+            ProviderState: Il provider scelto, o None se non ce n'è uno disponibile
+        """
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            candidates = [p for p in self.providers if p.name not in tried]
+            if not candidates:
+                return None
+            now = time.monotonic()
+            # Prima il provider con il costo atteso più basso, poi gli altri in ordine di costo;
+            # con probabilità explore si prova prima un altro provider, per misurarne la latenza
+            ordered = sorted(candidates, key=lambda p: p.score())
+            if len(ordered) > 1 and random.random() < self.explore:
+                ordered.insert(0, ordered.pop(random.randrange(1, len(ordered))))
+            for provider in ordered:
+                if provider.try_acquire(now):
+                    return provider
+            if now >= deadline:
+                return None
+            reopen = min(p.open_until for p in candidates)
+            time.sleep(min(max(0.05, reopen - now), deadline - now, 1.0))
+
+    def call(self, method, default, *args, **kwargs):
+        """
+        Esegue una funzione del provider con failover sugli altri del gruppo.
+
+        Args:
+            method (str): Nome della funzione del provider (es. 'verify_company')
+            default: Valore restituito se nessun provider risponde
+
+        Returns:
+            Il risultato del primo provider che risponde, o default
+        """
+        telemetry = get_telemetry()
+        tried = set()
+        last_error = None
+        for attempt in range(self.max_attempts):
+            provider = self.acquire(tried)
+            if provider is None:
+                break
+            tried.add(provider.name)
+            started = time.perf_counter()
+            try:
+                result = getattr(provider.module, method)(*args, strict=True, **kwargs)
+            except Exception as e:
+                last_error = e
+                self.record(provider, False, time.perf_counter() - started, method)
+                continue
+            self.record(provider, True, time.perf_counter() - started, method)
+            if attempt:
+                telemetry.count('router_failover_total', provider=provider.name, method=method)
+            return result
+
+        telemetry.count('router_exhausted_total', method=method)
+        reason = str(last_error)[:80] if last_error is not None else "circuit breaker aperto"
+        print(f"  ⚠ Nessun provider LLM disponibile ({method}): {reason}")
+        return default
+
+    def record(self, provider, success, seconds, method):
+        """Registra l'esito di una chiamata e gli eventuali cambi di stato del breaker."""
+        telemetry = get_telemetry()
+        telemetry.count('router_calls_total', provider=provider.name, method=method, result='ok' if success else 'error')
+        changed = provider.record(success, seconds)
+        if changed is not None:
+            telemetry.event('router_breaker', provider=provider.name, state=changed)
+            if changed == 'open':
+                print(f"  ⚠ {LLM_PROVIDERS[provider.name]['label']} escluso per {provider.cooldown:.0f}s dopo {provider.failures} errori consecutivi")
+            else:
+                print(f"  ✓ {LLM_PROVIDERS[provider.name]['label']} di nuovo disponibile")
+
+    def report(self):
+        """Stampa chiamate, errori, latenza media e stato del breaker di ogni provider."""
+        now = time.monotonic()
+        print("Router LLM:")
+        for p in self.providers:
+            latency = f"{p.latency * 1000:.0f} ms" if p.latency is not None else "n/d"
+            print(f"  {LLM_PROVIDERS[p.name]['label']:8s} chiamate {p.calls:5d}  errori {p.errors:4d}  latenza media {latency:>8s}  breaker {p.state(now)}")
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """
+    Restituisce il router condiviso, creandolo al primo uso.
+
+    Returns:
+        Router: Router configurato da LLM_ROUTER e dalle variabili LLM_ROUTER_*
+
+    Raises:
+        ValueError: Se LLM_ROUTER non è valida
+    """
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = Router(get_router_config())
+    return _router
+
+
+def check():
+    """
+    Verifica tutti i provider del gruppo.
+
+    Returns:
+        str: Esito per provider
+
+    Raises:
+        RuntimeError: Se nessun provider del gruppo risponde
+    """
+    results = [(name, check_provider('llm', name)) for name, _ in get_router_config()['pool']]
+    if not any(ok for _, (ok, _) in results):
+        raise RuntimeError("nessun provider del gruppo risponde")
+    return "; ".join(f"{name} {'ok' if ok else 'non disponibile'}" for name, (ok, _) in results)
+
+
+def verify_company(name, url, snippet):
+    """
+    Verifica se un risultato di ricerca è un'azienda, con failover tra i provider.
+
+    Args:
+        name (str): Nome del risultato
+        url (str): URL del sito
+        snippet (str): Descrizione del risultato
+
+    Returns:
+        bool: True se è un'azienda, False altrimenti o se nessun provider risponde
+    """
+    return get_router().call('verify_company', False, name, url, snippet)
+
+
+def verify_companies_batch(results):
+    """
+    Verifica una pagina di risultati con una sola chiamata, con failover tra i provider.
+
+    Args:
+        results (list): Lista di dizionari con 'title', 'link' e 'snippet'
+
+    Returns:
+        list: Un booleano per ogni risultato, nello stesso ordine
+    """
+    if not results:
+        return []
+    return get_router().call('verify_companies_batch', [False] * len(results), results)
+
+
+def extract_contacts(html_content, url=None):
+    """
+    Estrae email e telefono in locale o, se serve, con failover tra i provider.
+
+    Args:
+        html_content (str): Contenuto HTML della pagina web
+        url (str, optional): URL della pagina, usato come chiave di cache
+
+    Returns:
+        dict: Dizionario con 'email' e 'phone', None se non trovati
+    """
+    # I contatti trovati in locale non passano dal router (non misurano la latenza dei provider)
+    local_contacts = resolve_local_contacts(html_content)
+    if local_contacts is not None:
+        return local_contacts
+    if not html_content:
+        return {'email': None, 'phone': None}
+    return get_router().call('extract_contacts', {'email': None, 'phone': None}, html_content, url=url)
+
+
+def verify_and_extract(name, url, snippet, html_content=None):
+    """
+    Verifica un risultato ed estrae i contatti con una sola chiamata, con failover tra i provider.
+
+    Args:
+        name (str): Nome del risultato
+        url (str): URL del sito
+        snippet (str): Descrizione del risultato
+        html_content (str, optional): Contenuto HTML del sito, None se il download è fallito
+
+    Returns:
+        dict: 'is_company', 'email', 'phone' e 'confidence', None se nessun provider risponde
+    """
+    return get_router().call('verify_and_extract', None, name, url, snippet, html_content=html_content)
+
+
+def report():
+    """Stampa il riepilogo del router, se è stato usato."""
+    if _router is not None:
+        _router.report()
@@ -0,0 +1,35 @@
+from helpers.budget_helper import YieldWindow
+
+
+def test_archive_only_pages_are_left_out_of_the_window():
+    window = YieldWindow(window=3, min_yield=0.05)
+    for page in range(1, 6):
+        window.page_submitted(page, 0, 10, archived=10)
+    assert window.rolling() is None
+    assert not window.should_stop()
+
+
+def test_duplicates_found_during_the_run_count_as_zero_yield():
+    window = YieldWindow(window=2, min_yield=0.2)
+    for page in (1, 2):
+        # 9 duplicati trovati in questa esecuzione e una sola azienda nuova
+        window.page_submitted(page, 1, 10)
+        window.page_completed(page, 1)
+    assert window.rolling() == 0.1
+    assert window.should_stop()
+
+
+def test_yield_ignores_archived_companies():
+    window = YieldWindow(window=2, min_yield=0.05)
+    for page in (1, 2):
+        window.page_submitted(page, 2, 10, archived=8)
+        window.page_completed(page, 1)
+    assert window.rolling() == 0.5
+    assert not window.should_stop()
+
+
+def test_low_yield_stops_the_sector():
+    window = YieldWindow(window=2, min_yield=0.05)
+    for page in (1, 2):
+        window.page_submitted(page, 0, 10)
+    assert window.should_stop()
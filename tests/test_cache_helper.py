@@ -0,0 +1,40 @@
+from helpers import cache_helper
+from helpers.cache_helper import LLMCache, SerpCache, cached_search
+
+
+def test_eviction_keeps_the_cache_under_the_limit(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.sqlite"), ttl=3600, max_entries=50)
+    for index in range(120):
+        cache.set('verify', str(index), True)
+    rows = cache.conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+    assert rows <= 50
+    assert cache.count == rows
+    assert cache.get('verify', '119') is True
+
+
+def test_hits_are_written_in_batches(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.sqlite"), ttl=3600, max_entries=50)
+    cache.set('verify', 'rossi', True)
+    assert cache.get('verify', 'rossi') is True
+    assert ('verify', 'rossi') in cache.touched
+    cache.flush()
+    assert not cache.touched
+
+
+def test_search_cache_hit_and_offline_miss_skip_the_api(tmp_path, monkeypatch):
+    calls = []
+
+    @cached_search('serper', gl='it', hl='it')
+    def search(query, api_key, num=10, start=0):
+        calls.append((query, start))
+        return {'organic': [{'link': f"https://{query}.it"}]}
+
+    monkeypatch.setattr(cache_helper, '_serp_cache', SerpCache(str(tmp_path / "serp"), ttl=3600))
+    assert search("rossi", "chiave") == {'organic': [{'link': "https://rossi.it"}]}
+    assert search("rossi", "altra chiave") == {'organic': [{'link': "https://rossi.it"}]}
+    assert calls == [("rossi", 0)]
+
+    monkeypatch.setattr(cache_helper, '_serp_cache', SerpCache(str(tmp_path / "serp"), ttl=3600, offline=True))
+    assert search("rossi", "chiave") is not None
+    assert search("rossi", "chiave", start=10) is None
+    assert calls == [("rossi", 0)]
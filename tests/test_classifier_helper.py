@@ -0,0 +1,38 @@
+import sqlite3
+
+from helpers.classifier_helper import FEATURE_BITS, LocalClassifier, VerdictLog
+
+
+def classifier(bias, **config):
+    # Senza pesi la probabilità dipende solo dal bias
+    model = {'bits': FEATURE_BITS, 'idf': {}, 'weights': {}, 'bias': bias}
+    return LocalClassifier(model, dict({
+        'enabled': True, 'low': 0.05, 'high': 0.95, 'audit_rate': 0.0, 'allowlist': (), 'blocklist': (),
+    }, **config))
+
+
+def test_thresholds_decide_only_clear_cases():
+    assert classifier(5).decide("Rossi srl", "https://rossi.it", "")[0] is True
+    assert classifier(-5).decide("Elenco aziende", "https://elenco.it", "")[0] is False
+    assert classifier(0).decide("Rossi srl", "https://rossi.it", "") == (None, "incerto")
+
+
+def test_classifier_abstains_without_model_or_when_disabled():
+    no_model = LocalClassifier(None, {'enabled': True, 'low': 0.05, 'high': 0.95, 'allowlist': (), 'blocklist': ()})
+    assert no_model.decide("Rossi srl", "https://rossi.it", "") == (None, "incerto")
+    assert classifier(5, enabled=False).decide("Rossi srl", "https://rossi.it", "") == (None, None)
+    assert classifier(0, blocklist=("paginegialle.it",)).decide("Rossi", "https://www.paginegialle.it/rossi", "")[0] is False
+
+
+def test_verdicts_are_committed_in_batches(tmp_path):
+    path = str(tmp_path / "verdicts.sqlite")
+    log = VerdictLog(path)
+    log.add("Rossi srl", "https://rossi.it", "", True, 'verify')
+
+    def stored():
+        with sqlite3.connect(path) as reader:
+            return reader.execute("SELECT COUNT(*) FROM verdict_log").fetchone()[0]
+    assert stored() == 0
+    log.flush()
+    assert stored() == 1
+    assert [record['url'] for record in log.records()] == ["https://rossi.it"]
@@ -0,0 +1,20 @@
+from helpers.contacts_helper import resolve_local_contacts
+
+
+def page(text):
+    return f"<html><body><p>{text}</p></body></html>"
+
+
+def test_vat_number_with_it_prefix_is_not_a_phone():
+    for text in ("P.IVA IT01234567890", "Partita IVA: IT 01234567890", "VAT IT01234567890", "Reg. Imprese 03312345678"):
+        assert resolve_local_contacts(page(text)) is None, text
+
+
+def test_phone_next_to_vat_number():
+    contacts = resolve_local_contacts(page("Tel. 031 123456 - P.IVA IT01234567890"))
+    assert contacts == {'email': None, 'phone': '031 123456'}
+
+
+def test_phone_and_email_from_text():
+    contacts = resolve_local_contacts(page("Telefono: +39 02 1234567 - info@rossi.it"))
+    assert contacts == {'email': 'info@rossi.it', 'phone': '+39 02 1234567'}
@@ -0,0 +1,27 @@
+from helpers import crawler_helper
+from helpers.crawler_helper import rank_contact_links, contact_coverage
+
+
+def test_malformed_link_is_skipped():
+    html = '<a href="http://[broken/contatti">x</a><a href="/contatti">Contatti</a>'
+    assert rank_contact_links("https://www.rossi.it/", html) == ["https://www.rossi.it/contatti"]
+
+
+def test_vat_number_does_not_count_as_phone():
+    assert contact_coverage("<p>info@rossi.it - P.IVA IT01234567890</p>") == (True, False)
+
+
+def test_sitemap_counts_toward_the_page_limit(monkeypatch):
+    fetched = []
+
+    def fetch_page(url, allowed_types=None, timeout=None):
+        fetched.append((url, timeout))
+        if url.endswith('sitemap.xml'):
+            return '<loc>https://rossi.it/contatti</loc><loc>https://rossi.it/chi-siamo</loc><loc>https://rossi.it/sede</loc>'
+        return '<p>niente</p>'
+    monkeypatch.setattr(crawler_helper, 'fetch_page', fetch_page)
+    monkeypatch.setattr(crawler_helper, 'get_timeout', lambda: (5.0, 10.0))
+
+    crawler_helper.crawl_contact_pages("https://rossi.it/", "<p>home</p>", max_pages=3, time_budget=4)
+    assert [url for url, _ in fetched] == ["https://rossi.it/sitemap.xml", "https://rossi.it/contatti", "https://rossi.it/chi-siamo"]
+    assert all(0 < limit <= 4 for _, timeout in fetched for limit in timeout)
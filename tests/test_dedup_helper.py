@@ -0,0 +1,59 @@
+import threading
+
+from helpers.dedup_helper import CompanyIndex, registrable_domain
+from helpers.storage_helper import CompanyRecord
+
+
+def test_save_runs_outside_the_lock_and_merges_later_sectors():
+    index = CompanyIndex(mode="domain")
+    assert index.claim("https://www.rossi.it", "Edilizia")
+    saving = threading.Event()
+    resume = threading.Event()
+    saved, updated = [], []
+
+    def save(sectors):
+        saved.append(sectors)
+        saving.set()
+        resume.wait(5)
+
+    worker = threading.Thread(target=index.add, args=("https://www.rossi.it", "Edilizia"),
+                              kwargs={'save': save, 'update': lambda url, sectors: updated.append((url, sectors))})
+    worker.start()
+    assert saving.wait(5)
+
+    # Durante il salvataggio l'indice resta utilizzabile e il sito è ancora prenotato
+    assert not index.claim("https://rossi.it/chi-siamo", "Impianti")
+    index.merge_sector("https://rossi.it/chi-siamo", "Impianti", lambda url, sectors: updated.append(('merge', sectors)))
+    assert index.claim("https://www.bianchi.it", "Impianti")
+
+    resume.set()
+    worker.join(5)
+    assert saved == ["Edilizia"]
+    assert updated == [('merge', "Edilizia; Impianti")]
+    assert "https://rossi.it" in index
+    assert not index.writing
+
+
+def test_merge_sector_updates_saved_site_once_per_sector():
+    index = CompanyIndex(mode="url")
+    index.add("https://rossi.it", "Edilizia")
+    updated = []
+    index.merge_sector("https://rossi.it/", "Impianti", lambda url, sectors: updated.append((url, sectors)))
+    index.merge_sector("https://rossi.it/", "Impianti", lambda url, sectors: updated.append((url, sectors)))
+    assert updated == [("https://rossi.it", "Edilizia; Impianti")]
+
+
+def test_registrable_domain():
+    assert registrable_domain("https://shop.rossi.it/contatti") == "rossi.it"
+    assert registrable_domain("http://192.168.1.1:8080/") == "192.168.1.1"
+    assert registrable_domain("http://10.0.0.1") != registrable_domain("http://192.168.0.1")
+    assert registrable_domain("https://www.rossi.como.it") == "rossi.como.it"
+    assert registrable_domain("https://bianchi.mi.it") == "bianchi.mi.it"
+    assert registrable_domain("https://shop.rossi.co.uk") == "rossi.co.uk"
+
+
+def test_only_startup_companies_are_archived():
+    index = CompanyIndex.from_companies([CompanyRecord("Rossi srl", "https://rossi.it", None, None, "Edilizia")], mode="domain")
+    index.add("https://bianchi.it", "Edilizia")
+    assert index.in_archive("https://www.rossi.it/contatti")
+    assert not index.in_archive("https://bianchi.it")
@@ -0,0 +1,19 @@
+import openpyxl
+
+from helpers.excel_helper import HEADERS, load_existing_companies, iter_existing_companies, count_existing_companies
+
+
+def test_existing_companies_are_read_from_the_workbook(tmp_path, monkeypatch):
+    monkeypatch.setenv("STORAGE_BACKEND", "excel")
+    path = str(tmp_path / "lista_aziende.xlsx")
+    wb = openpyxl.Workbook()
+    wb.active.append(HEADERS)
+    wb.active.append(["Rossi srl", "https://rossi.it", "info@rossi.it", "031 123456", "Edilizia"])
+    wb.active.append(["Bianchi spa", "https://bianchi.it", None, None, None])
+    wb.save(path)
+
+    assert count_existing_companies(path) == 2
+    assert [company.url for company in iter_existing_companies(path)] == ["https://rossi.it", "https://bianchi.it"]
+    assert load_existing_companies(path)[0] == {
+        'name': "Rossi srl", 'url': "https://rossi.it", 'email': "info@rossi.it", 'phone': "031 123456", 'sector': "Edilizia",
+    }
@@ -0,0 +1,25 @@
+from helpers.journal_helper import RunJournal, PageTracker
+from helpers.storage_helper import CompanyStore
+
+
+def test_journal_advances_only_after_the_store_writes_the_batch(tmp_path):
+    journal = RunJournal(None, 'serper')
+    store = CompanyStore(str(tmp_path / "aziende.db"), batch_size=3)
+    completed = []
+    tracker = PageTracker(journal, 'edilizia', 1, on_complete=lambda page, saved: completed.append((page, saved)))
+    store.flushed.add(tracker.persisted)
+
+    tracker.page_submitted(1, 1, 10)
+    store.add_company({'name': "Rossi srl", 'url': "https://rossi.it"}, 'edilizia')
+    tracker.item_done(1, saved=True)
+    tracker.page_submitted(2, 1, 20)
+    store.add_company({'name': "Bianchi spa", 'url': "https://bianchi.it"}, 'edilizia')
+    tracker.item_done(2, saved=True)
+    # Pagine completate, ma le aziende sono ancora nel blocco in memoria
+    assert completed == [(1, 1), (2, 1)]
+    assert journal.get('edilizia')['page'] == 0
+
+    store.add_company({'name': "Verdi snc", 'url': "https://verdi.it"}, 'edilizia')
+    assert journal.get('edilizia')['page'] == 2
+    assert journal.get('edilizia')['processed'] == 20
+    store.close()
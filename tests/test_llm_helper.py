@@ -0,0 +1,97 @@
+import pytest
+
+from helpers import cache_helper, classifier_helper
+from helpers.llm_helper import LLMProvider, InvalidResponseError, TruncatedResponseError, check_response, get_max_tokens
+from helpers.llm_helper import read_verdict_stream
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(cache_helper, '_llm_cache', cache_helper.DisabledCache())
+    monkeypatch.setattr(classifier_helper, '_verdict_log', classifier_helper.VerdictLog(str(tmp_path / "verdicts.sqlite")))
+
+
+def provider(*responses):
+    calls = []
+
+    def complete(kind, messages, max_tokens=None, schema=None, reader=None):
+        calls.append(kind)
+        response = responses[len(calls) - 1]
+        if isinstance(response, Exception):
+            raise response
+        return response
+    return LLMProvider('test', 'modello', complete), calls
+
+
+def test_invalid_batch_falls_back_to_single_verification():
+    llm, calls = provider("non so", '{"azienda": "SI"}', '{"azienda": "NO"}')
+    results = [{'title': 'Rossi srl', 'link': 'https://rossi.it'}, {'title': 'Elenco', 'link': 'https://elenco.it'}]
+    assert llm.verify_companies_batch(results) == [True, False]
+    assert calls == ['verify_batch', 'verify', 'verify']
+
+
+def test_strict_raises_on_unreadable_verdict():
+    llm, _ = provider("forse")
+    with pytest.raises(InvalidResponseError):
+        llm.verify_company("Rossi srl", "https://rossi.it", "", strict=True)
+
+
+def test_local_contacts_skip_the_model():
+    llm, calls = provider()
+    html = '<a href="mailto:info@rossi.it">Email</a> <a href="tel:+39021234567">Tel</a>'
+    assert llm.extract_contacts(html) == {'email': 'info@rossi.it', 'phone': '+39021234567'}
+    assert calls == []
+
+
+def test_truncated_or_empty_response_is_rejected():
+    with pytest.raises(TruncatedResponseError):
+        check_response('verify', '{"azienda": "N', truncated=True)
+    with pytest.raises(TruncatedResponseError):
+        check_response('verify', '  ')
+    assert check_response('verify', '{"azienda": "SI"}') == '{"azienda": "SI"}'
+
+
+def test_truncated_verdict_is_not_cached(monkeypatch, tmp_path):
+    cache = cache_helper.LLMCache(str(tmp_path / "cache.sqlite"), ttl=3600, max_entries=100)
+    monkeypatch.setattr(cache_helper, '_llm_cache', cache)
+    llm, calls = provider(TruncatedResponseError("risposta troncata"), '{"azienda": "SI"}')
+    assert llm.verify_company("Rossi srl", "https://rossi.it", "") is False
+    assert llm.verify_company("Rossi srl", "https://rossi.it", "") is True
+    assert calls == ['verify', 'verify']
+
+
+def test_reasoning_budget_only_for_reasoning_models(monkeypatch):
+    monkeypatch.delenv("LLM_REASONING_MODELS", raising=False)
+    monkeypatch.setenv("LLM_REASONING_TOKENS", "1024")
+    monkeypatch.setenv("LLM_MAX_TOKENS_VERIFY", "16")
+    assert get_max_tokens('verify', model="llama3.2") == 16
+    assert get_max_tokens('verify', model="gemini-2.5-flash") == 16 + 1024
+    assert get_max_tokens('verify', model="openai/gpt-oss-20b") == 16 + 1024
+
+
+class Stream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.read = 0
+        self.closed = False
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+
+def test_stream_stops_at_the_verdict_and_closes():
+    stream = Stream([('{"azienda": ', False), ('"SI"', False), ('}', False), (' altro testo', False)])
+    assert read_verdict_stream(stream, lambda chunk: chunk, 'test', 0.0) is True
+    assert stream.read == 2 and stream.closed
+
+
+def test_truncated_stream_without_verdict_is_rejected():
+    stream = Stream([('{"azienda": "N', True)])
+    with pytest.raises(TruncatedResponseError):
+        read_verdict_stream(stream, lambda chunk: chunk, 'test', 0.0)
+    assert stream.closed
@@ -0,0 +1,85 @@
+import threading
+import time
+
+from helpers.pipeline_helper import Pipeline, PagePrefetcher
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_pipeline_keeps_order_and_drains_on_close():
+    saved = []
+    stages = [
+        ('double', lambda item: item * 2, 1),
+        ('split', lambda item: [item, item + 1] if item % 4 == 0 else item, 1),
+        ('save', saved.append, 1),
+    ]
+    pipeline = Pipeline(stages, queue_size=2)
+    for item in range(20):
+        pipeline.submit(item)
+    pipeline.close()
+    expected = []
+    for item in range(20):
+        expected += [item * 2, item * 2 + 1] if item * 2 % 4 == 0 else [item * 2]
+    assert saved == expected
+    assert not any(thread.is_alive() for threads in pipeline.threads for thread in threads)
+
+
+def test_pipeline_passes_failed_items_to_on_error():
+    failed, saved = [], []
+
+    def check(item):
+        if item == 3:
+            raise ValueError("risultato non valido")
+        return item
+
+    pipeline = Pipeline([('check', check, 2), ('save', saved.append, 1)], queue_size=1, on_error=failed.append)
+    for item in range(6):
+        pipeline.submit(item)
+    pipeline.close()
+    assert failed == [3]
+    assert sorted(saved) == [0, 1, 2, 4, 5]
+
+
+def test_prefetch_waits_for_completed_pages():
+    fetched = []
+    lock = threading.Lock()
+
+    def fetch(page):
+        with lock:
+            fetched.append(page)
+        return page
+
+    prefetcher = PagePrefetcher(fetch, 1, lookahead=2, has_next=lambda page: page < 10)
+    pages = iter(prefetcher)
+    try:
+        assert next(pages) == (1, 1)
+        assert next(pages) == (2, 2)
+        # Nessuna pagina completata: al più lookahead pagine scaricate
+        time.sleep(0.1)
+        assert fetched == [1, 2]
+
+        prefetcher.advance(1)
+        assert next(pages) == (3, 3)
+        time.sleep(0.1)
+        assert fetched == [1, 2, 3]
+    finally:
+        prefetcher.close()
+
+
+def test_inline_prefetch_fetches_after_completion():
+    fetched = []
+    prefetcher = PagePrefetcher(lambda page: fetched.append(page) or page, 1, lookahead=0, has_next=lambda page: page < 3)
+    pages = iter(prefetcher)
+    assert next(pages) == (1, 1)
+    threading.Timer(0.1, prefetcher.advance, args=(1,)).start()
+    started = time.monotonic()
+    assert next(pages) == (2, 2)
+    assert time.monotonic() - started >= 0.05
+    prefetcher.advance(2)
+    assert next(pages) == (3, 3)
+    assert wait_until(lambda: fetched == [1, 2, 3])
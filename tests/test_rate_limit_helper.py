@@ -0,0 +1,27 @@
+import pytest
+
+from helpers.rate_limit_helper import Limiter, is_throttled
+
+
+class ResourceExhausted(Exception):
+    pass
+
+
+class HTTPError(Exception):
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def test_throttling_is_read_from_status_or_exception_type():
+    assert is_throttled(HTTPError("Too Many Requests", 429))
+    assert not is_throttled(HTTPError("pagina 429 non trovata", 404))
+    assert not is_throttled(ValueError("ordine n. 429 non valido"))
+    assert is_throttled(ResourceExhausted("quota esaurita"))
+
+
+def test_invalid_rate_does_not_hold_the_slot():
+    limiter = Limiter(0, 1)
+    with pytest.raises(ValueError):
+        limiter.acquire()
+    assert limiter.semaphore.acquire(blocking=False)
@@ -0,0 +1,35 @@
+import random
+
+from scrappers.router import Router, ProviderState
+
+
+def router(explore, *latencies):
+    instance = Router.__new__(Router)
+    instance.max_wait = 1
+    instance.explore = explore
+    instance.providers = []
+    for index, latency in enumerate(latencies):
+        provider = ProviderState(f"p{index}", None, 1.0, 0.2, 3, 30)
+        provider.latency = latency
+        instance.providers.append(provider)
+    return instance
+
+
+def shares(instance, calls=2000):
+    counts = {p.name: 0 for p in instance.providers}
+    for _ in range(calls):
+        provider = instance.acquire(set())
+        counts[provider.name] += 1
+        provider.in_flight -= 1
+    return counts
+
+
+def test_fastest_provider_gets_the_traffic():
+    random.seed(1)
+    assert shares(router(0.0, 1.0, 1.2)) == {'p0': 2000, 'p1': 0}
+
+
+def test_exploration_share_goes_to_the_slower_provider():
+    random.seed(1)
+    counts = shares(router(0.05, 1.0, 1.2))
+    assert 40 < counts['p1'] < 200